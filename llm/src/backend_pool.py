@@ -0,0 +1,284 @@
+"""
+Ollama 백엔드 풀
+여러 Ollama 서버의 상태(/api/tags, /api/ps)를 백그라운드에서 주기적으로 확인하고,
+요청마다 진행 중인 요청이 가장 적은 서버를 고르되 모델이 이미 로드된 서버를 우선합니다.
+연속으로 실패한 서버는 일정 시간 제외하고, 제외 시간이 끝나거나 그 전에 상태 확인이 성공하면 다시 넣습니다.
+
+OLLAMA_URLS에 쉼표로 구분한 주소를 두 개 이상 지정하면 공유 클라이언트가 자동으로 사용합니다.
+
+사용법:
+    OLLAMA_URLS=http://gpu1:11434,http://gpu2:11434 python src/chat_ui.py
+    python -m src.backend_pool --urls http://gpu1:11434,http://gpu2:11434   # 상태 확인
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import requests
+
+from .metrics import get_registry
+
+CHECK_INTERVAL = 10     # 상태 확인 주기 (초)
+CHECK_TIMEOUT = 2       # 상태 확인 요청 타임아웃 (초)
+EJECT_AFTER = 2         # 이 횟수만큼 연속 실패하면 제외
+EJECT_TIME = 10         # 첫 제외 시간 (초), 다시 제외될 때마다 두 배
+MAX_EJECT_TIME = 120
+# 모델이 로드되지 않은 서버로 보낼 때 더하는 가상 요청 수 (콜드 로딩 비용).
+# 상주 서버가 이만큼 더 바빠지면 다른 서버에 모델을 올려 분산한다.
+COLD_PENALTY = 1
+
+
+def parse_urls(value: Optional[str]) -> List[str]:
+    """쉼표로 구분한 서버 주소 목록 (중복/빈 값 제거)"""
+    urls: List[str] = []
+    for url in (value or "").split(","):
+        url = url.strip().rstrip("/")
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+class Backend:
+    """백엔드 서버 한 대의 상태"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0                 # 진행 중인 요청 수
+        self.failures = 0                    # 연속 실패 횟수
+        self.ejections = 0                   # 연속 제외 횟수 (제외 시간 계산용)
+        self.ejected_until = 0.0             # time.monotonic() 기준, 이 시각까지 제외
+        self.available: Optional[Set[str]] = None  # 다운로드된 모델 (/api/tags, 아직 모르면 None)
+        self.resident: Set[str] = set()      # 메모리에 로드된 모델 (/api/ps)
+        self.last_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def ejected(self) -> bool:
+        """제외 중인지 (상태 확인이 성공하면 BackendPool이 ejected_until을 지워 바로 복귀)"""
+        return time.monotonic() < self.ejected_until
+
+    def has_model(self, model: str) -> Optional[bool]:
+        """모델 다운로드 여부 (/api/tags를 아직 못 받았으면 None)"""
+        return None if self.available is None else model in self.available
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": not self.ejected,
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "resident": sorted(self.resident),
+            "available": None if self.available is None else sorted(self.available),
+            "last_error": self.last_error,
+        }
+
+
+def _model_names(entries: List[Dict[str, Any]]) -> Set[str]:
+    names = set()
+    for entry in entries:
+        names.update(name for name in (entry.get("name"), entry.get("model")) if name)
+    return names
+
+
+class BackendPool:
+    """상태 확인과 최소 부하 + 모델 상주 기반 라우팅"""
+
+    def __init__(self, urls: Sequence[str], check_interval: float = CHECK_INTERVAL,
+                 eject_after: int = EJECT_AFTER, eject_time: float = EJECT_TIME):
+        """
+        Args:
+            urls: 서버 주소 목록
+            check_interval: 상태 확인 주기 (초)
+            eject_after: 연속 실패 몇 번이면 제외할지
+            eject_time: 첫 제외 시간 (초)
+        """
+        if not urls:
+            raise ValueError("백엔드 주소가 하나 이상 필요합니다")
+        self.backends = [Backend(url.rstrip("/")) for url in urls]
+        self.check_interval = check_interval
+        self.eject_after = eject_after
+        self.eject_time = eject_time
+
+        self._lock = threading.Lock()
+        self._turn = 0  # 조건이 같은 서버끼리 돌아가며 고르기 위한 카운터
+        self._session = requests.Session()
+        self._stop = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+
+        registry = get_registry()
+        self._up = registry.gauge("ollama_backend_up", "백엔드 정상 여부 (1: 정상, 0: 제외됨)", labels=("backend",))
+        self._outstanding = registry.gauge("ollama_backend_outstanding", "백엔드별 진행 중인 요청 수",
+                                           labels=("backend",))
+        self._routed = registry.counter("ollama_backend_requests_total", "백엔드별 라우팅된 요청 수",
+                                        labels=("backend", "resident"))
+        self._ejections = registry.counter("ollama_backend_ejections_total", "백엔드 제외 횟수", labels=("backend",))
+        for backend in self.backends:
+            self._up.set(backend.url, value=1)
+            self._outstanding.set(backend.url, value=0)
+
+    @property
+    def urls(self) -> List[str]:
+        return [backend.url for backend in self.backends]
+
+    def healthy(self) -> List[Backend]:
+        return [backend for backend in self.backends if not backend.ejected]
+
+    def _rank(self, backend: Backend, model: Optional[str]):
+        """
+        작을수록 우선
+
+        모델이 없는 서버는 마지막, 그다음 진행 중인 요청 수 (모델이 로드되지 않았으면 COLD_PENALTY 추가),
+        같으면 모델이 로드된 서버 우선.
+        """
+        if model is None or model in backend.resident:
+            return False, backend.outstanding, 0
+        return backend.has_model(model) is False, backend.outstanding + COLD_PENALTY, 1
+
+    def acquire(self, model: Optional[str] = None, exclude: Sequence[Backend] = ()) -> Backend:
+        """
+        요청을 보낼 서버를 고르고 진행 중인 요청 수를 올림 (끝나면 release 호출)
+
+        정상인 서버가 없으면 제외 시간이 가장 먼저 끝나는 서버를 고른다 (오류를 호출자에게 그대로 전달).
+
+        Args:
+            model: 요청할 모델 (None이면 모델과 무관한 요청)
+            exclude: 이번 요청에서 이미 실패한 서버
+        """
+        self.start()
+        with self._lock:
+            candidates = [b for b in self.backends if not b.ejected and b not in exclude]
+            if not candidates:
+                remaining = [b for b in self.backends if b not in exclude] or self.backends
+                candidates = [min(remaining, key=lambda b: b.ejected_until)]
+            best = min(self._rank(b, model) for b in candidates)
+            tied = [b for b in candidates if self._rank(b, model) == best]
+            backend = tied[self._turn % len(tied)]
+            self._turn += 1
+            backend.outstanding += 1
+        self._outstanding.set(backend.url, value=backend.outstanding)
+        self._routed.inc(backend.url, "yes" if model in backend.resident else "no")
+        return backend
+
+    def release(self, backend: Backend, model: Optional[str] = None, ok: bool = True,
+                error: Optional[str] = None):
+        """
+        요청 종료 기록
+
+        Args:
+            backend: acquire로 받은 서버
+            model: 성공한 요청의 모델 (다음 상태 확인 전까지 상주 중으로 간주)
+            ok: False면 서버 장애(연결 실패, 5xx)로 보고 실패 횟수를 올림
+            error: 실패 내용
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            outstanding = backend.outstanding
+            if ok:
+                backend.failures = 0
+                if model:
+                    backend.resident.add(model)
+        self._outstanding.set(backend.url, value=outstanding)
+        if not ok:
+            self.mark_failure(backend, error or "request failed")
+
+    def mark_failure(self, backend: Backend, error: str, eject: bool = False):
+        """실패 기록 (연속 eject_after회면, 또는 eject=True면 바로 제외)"""
+        with self._lock:
+            backend.failures += 1
+            backend.last_error = error
+            if backend.ejected or (backend.failures < self.eject_after and not eject):
+                return
+            backend.ejected_until = time.monotonic() + min(self.eject_time * 2 ** backend.ejections, MAX_EJECT_TIME)
+            backend.ejections += 1
+        self._up.set(backend.url, value=0)
+        self._ejections.inc(backend.url)
+
+    def _mark_healthy(self, backend: Backend):
+        """상태 확인 성공: 제외 시간이 남아 있어도 바로 다시 넣음"""
+        with self._lock:
+            backend.failures = 0
+            backend.ejections = 0
+            backend.ejected_until = 0.0
+            backend.last_error = None
+        self._up.set(backend.url, value=1)
+
+    def check(self, backend: Backend) -> bool:
+        """/api/tags와 /api/ps로 상태와 모델 목록 갱신"""
+        try:
+            responses = [self._session.get(f"{backend.url}{path}", timeout=CHECK_TIMEOUT)
+                         for path in ("/api/tags", "/api/ps")]
+            for response in responses:
+                response.raise_for_status()
+            available = _model_names(responses[0].json().get("models", []))
+            resident = _model_names(responses[1].json().get("models", []))
+        except (requests.RequestException, ValueError) as e:
+            backend.last_check = time.time()
+            # 상태 확인은 가볍고 타임아웃이 짧으므로 한 번 실패해도 바로 제외 (다음 확인에서 복귀)
+            self.mark_failure(backend, f"health check: {type(e).__name__}", eject=True)
+            return False
+
+        with self._lock:
+            backend.available = available
+            backend.resident = resident
+            backend.last_check = time.time()
+        self._mark_healthy(backend)
+        return True
+
+    def check_all(self) -> int:
+        """모든 서버를 동시에 확인하고 정상인 서버 수 반환"""
+        with ThreadPoolExecutor(max_workers=len(self.backends)) as executor:
+            return sum(executor.map(self.check, self.backends))
+
+    def _run_checks(self):
+        while True:
+            self.check_all()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def start(self):
+        """상태 확인 스레드 시작 (처음 요청할 때 자동으로 호출됨)"""
+        if self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._run_checks, daemon=True)
+                self._checker.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def describe(self) -> str:
+        """상태 요약 한 줄 (예: '2/3 정상 · gpu1 2건, gpu2 0건')"""
+        healthy = self.healthy()
+        loads = ", ".join(
+            f"{backend.url.split('://')[-1]} {backend.outstanding}건" + ("" if not backend.ejected else " (제외됨)")
+            for backend in self.backends
+        )
+        return f"{len(healthy)}/{len(self.backends)} 정상 · {loads}"
+
+
+def main():
+    """메인 함수"""
+    from .ollama_client import OLLAMA_URL, OLLAMA_URLS
+
+    parser = argparse.ArgumentParser(description="Ollama 백엔드 상태 확인")
+    parser.add_argument("--urls", default=OLLAMA_URLS or OLLAMA_URL,
+                        help="쉼표로 구분한 서버 주소 (기본값: OLLAMA_URLS 또는 OLLAMA_URL)")
+    args = parser.parse_args()
+
+    pool = BackendPool(parse_urls(args.urls))
+    healthy = pool.check_all()
+    print(f"\n🔀 백엔드 {healthy}/{len(pool.backends)} 정상")
+    for backend in pool.backends:
+        if backend.last_error is None:
+            resident = ", ".join(sorted(backend.resident)) or "없음"
+            print(f"  ✅ {backend.url} · 모델 {len(backend.available or ())}개 · 로드됨: {resident}")
+        else:
+            print(f"  ❌ {backend.url} · {backend.last_error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+레이턴시/처리량 벤치마크
+프롬프트 묶음을 고정 시드로 N회 실행하고 TTFT, 토큰 간 지연, 처리 속도의 백분위를 기록합니다.
+
+사용법:
+    python -m src.benchmark --runs 10 --warmup 2 --json bench.json --csv bench.csv
+"""
+
+import argparse
+import csv
+import json
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from .metrics import add_metrics_arguments, configure_metrics
+from .ollama_client import OllamaClient, get_client
+from .stream_events import DoneEvent, ErrorEvent, TokenEvent, stream_events
+
+DEFAULT_PROMPTS = [
+    "What is Python?",
+    "Explain machine learning in one sentence.",
+    "2 + 2는 얼마인가요?",
+    "9 + 7 = ?\n\n답만 작성해주세요.",
+]
+
+# 요약에 포함할 지표 (샘플 dict의 키, 표시 이름, 단위)
+METRICS = [
+    ("ttft", "TTFT", "s"),
+    ("itl_mean", "토큰 간 지연(평균)", "s"),
+    ("total_time", "총 소요 시간", "s"),
+    ("load_duration", "모델 로딩", "s"),
+    ("prompt_eval_rate", "프롬프트 처리 속도", "tok/s"),
+    ("eval_rate", "토큰 생성 속도", "tok/s"),
+]
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """선형 보간 백분위 (값이 없으면 None)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def measure_stream(client: OllamaClient, prompt: str,
+                   options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    스트리밍 요청 한 번을 실행하고 클라이언트/서버 측 지표 측정
+
+    Returns:
+        ttft, 토큰 간 지연 목록, 총 소요 시간과 완료 이벤트의 서버 측 시간 정보
+        (요청이 실패하면 원래 예외를 다시 발생)
+    """
+    last_token_at = None
+    gaps = []
+    done = None
+
+    for event in stream_events(prompt, client=client, options=options):
+        if isinstance(event, TokenEvent):
+            now = time.perf_counter()
+            if last_token_at is not None:
+                gaps.append(now - last_token_at)
+            last_token_at = now
+        elif isinstance(event, DoneEvent):
+            done = event
+        elif isinstance(event, ErrorEvent):
+            event.raise_error()
+
+    return {
+        "ttft": done.ttft,
+        "itl": gaps,
+        "itl_mean": sum(gaps) / len(gaps) if gaps else None,
+        "total_time": done.wall_time,
+        "load_duration": (done.load_duration or 0) / 1e9,
+        "prompt_eval_count": done.prompt_eval_count,
+        "prompt_eval_rate": done.prompt_eval_rate,
+        "eval_count": done.eval_count,
+        "eval_rate": done.eval_rate,
+    }
+
+
+def load_prompts(path: Optional[Path]) -> List[str]:
+    """프롬프트 파일 읽기 (.jsonl이면 각 줄의 "prompt" 필드, 아니면 한 줄에 하나)"""
+    if path is None:
+        return list(DEFAULT_PROMPTS)
+
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            prompts.append(json.loads(line)["prompt"] if path.suffix == ".jsonl" else line)
+    return prompts
+
+
+def summarize(samples: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Optional[float]]]:
+    """지표별 p50/p90/p99와 평균 (성공한 요청만), 요청 수와 오류/타임아웃 수"""
+    samples = list(samples)
+    errors = sum(1 for s in samples if s.get("error") == "error")
+    timeouts = sum(1 for s in samples if s.get("error") == "timeout")
+    summary = {
+        "requests": {
+            "total": len(samples),
+            "ok": len(samples) - errors - timeouts,
+            "errors": errors,
+            "timeouts": timeouts,
+        },
+    }
+    for key, _, _ in METRICS:
+        values = [s[key] for s in samples if s.get(key) is not None]
+        summary[key] = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+        summary[key]["mean"] = sum(values) / len(values) if values else None
+
+    # 토큰 간 지연은 모든 토큰 간격을 모아서 별도로 계산
+    gaps = [gap for s in samples for gap in s.get("itl", [])]
+    summary["itl"] = {f"p{p}": percentile(gaps, p) for p in PERCENTILES}
+    summary["itl"]["mean"] = sum(gaps) / len(gaps) if gaps else None
+    return summary
+
+
+def model_info(client: OllamaClient) -> Dict[str, Any]:
+    """비교용 모델 정보 (digest, 양자화 수준)"""
+    try:
+        for model in client.get_tags().get("models", []):
+            if model.get("name") == client.model:
+                details = model.get("details", {})
+                return {
+                    "digest": model.get("digest"),
+                    "size": model.get("size"),
+                    "quantization_level": details.get("quantization_level"),
+                    "parameter_size": details.get("parameter_size"),
+                }
+    except Exception:
+        pass
+    return {}
+
+
+def error_sample(e: Exception) -> Dict[str, Any]:
+    """실패한 요청을 기록할 샘플 (error: timeout/error, 지표 값은 없음)"""
+    return {
+        "error": "timeout" if isinstance(e, requests.Timeout) else "error",
+        "error_message": f"{type(e).__name__}: {e}",
+    }
+
+
+def run_benchmark(client: OllamaClient, prompts: List[str], runs: int, warmup: int,
+                  options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    워밍업 후 각 프롬프트를 runs회 실행
+
+    요청 하나가 실패해도 멈추지 않고 오류 샘플로 기록한 뒤 계속한다.
+    """
+    for i in range(warmup):
+        print(f"🔥 워밍업 {i + 1}/{warmup}")
+        for prompt in prompts:
+            try:
+                measure_stream(client, prompt, options)
+            except Exception as e:
+                print(f"  ⚠️ 워밍업 요청 실패: {type(e).__name__}: {e}")
+
+    samples = []
+    for run in range(runs):
+        for index, prompt in enumerate(prompts):
+            try:
+                sample = measure_stream(client, prompt, options)
+            except Exception as e:
+                sample = error_sample(e)
+            sample.update({"run": run, "prompt_index": index, "prompt": prompt})
+            samples.append(sample)
+            if sample.get("error"):
+                print(f"  [{run + 1}/{runs}] #{index} ❌ {sample['error_message']}")
+                continue
+            ttft = f"{sample['ttft']:.3f}s" if sample["ttft"] is not None else "N/A"
+            print(f"  [{run + 1}/{runs}] #{index} TTFT {ttft} · 총 {sample['total_time']:.2f}s")
+    return samples
+
+
+def _fmt(value: Optional[float]) -> str:
+    return f"{value:.3f}" if value is not None else "N/A"
+
+
+def print_summary(summary: Dict[str, Dict[str, Optional[float]]]):
+    """요약 표 출력"""
+    print(f"\n{'='*72}")
+    print(f"{'지표':<20}{'p50':>12}{'p90':>12}{'p99':>12}{'평균':>12}")
+    print(f"{'─'*72}")
+    rows = [(key, name, unit) for key, name, unit in METRICS] + [("itl", "토큰 간 지연(전체)", "s")]
+    for key, name, unit in rows:
+        stats = summary[key]
+        label = f"{name} ({unit})"
+        print(f"{label:<20}{_fmt(stats['p50']):>12}{_fmt(stats['p90']):>12}"
+              f"{_fmt(stats['p99']):>12}{_fmt(stats['mean']):>12}")
+    counts = summary["requests"]
+    if counts["errors"] or counts["timeouts"]:
+        print(f"⚠️ 요청 {counts['total']}개 중 오류 {counts['errors']}개, "
+              f"타임아웃 {counts['timeouts']}개 (지표는 성공한 {counts['ok']}개 기준)")
+    print(f"{'='*72}")
+
+
+def write_json(path: Path, meta: Dict[str, Any], samples: List[Dict[str, Any]], summary: Dict):
+    """메타데이터, 요약, 전체 샘플을 JSON으로 저장"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "summary": summary, "samples": samples}, f, ensure_ascii=False, indent=2)
+
+
+def write_csv(path: Path, meta: Dict[str, Any], samples: List[Dict[str, Any]]):
+    """샘플 한 건당 한 행으로 CSV 저장"""
+    columns = ["run", "prompt_index", "ttft", "itl_mean", "total_time", "load_duration",
+               "prompt_eval_count", "prompt_eval_rate", "eval_count", "eval_rate", "error", "error_message"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["model", "host", "timestamp"] + columns)
+        for sample in samples:
+            writer.writerow([meta["model"], meta["host"], meta["timestamp"]] +
+                            [sample.get(column) for column in columns])
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="Ollama 레이턴시/처리량 벤치마크")
+    parser.add_argument("--prompts", type=Path, default=None,
+                        help="프롬프트 파일 (.txt: 한 줄에 하나, .jsonl: prompt 필드)")
+    parser.add_argument("--runs", type=int, default=5, help="프롬프트별 측정 횟수 (기본값: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="기록하지 않는 워밍업 횟수 (기본값: 1)")
+    parser.add_argument("--seed", type=int, default=42, help="고정 시드 (기본값: 42)")
+    parser.add_argument("--temperature", type=float, default=0.0, help="temperature (기본값: 0)")
+    parser.add_argument("--max-tokens", type=int, default=128, help="최대 생성 토큰 수 (기본값: 128)")
+    parser.add_argument("--model", default=None, help="모델 이름 (기본값: OLLAMA_MODEL)")
+    parser.add_argument("--json", type=Path, default=None, help="JSON 결과 파일")
+    parser.add_argument("--csv", type=Path, default=None, help="CSV 결과 파일")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics(args, call_site="benchmark")
+
+    client = get_client()
+    if args.model:
+        client.model = args.model
+
+    prompts = load_prompts(args.prompts)
+    options = {"seed": args.seed, "temperature": args.temperature, "num_predict": args.max_tokens}
+    meta = {
+        "model": client.model,
+        "model_info": model_info(client),
+        "host": client.base_url,
+        "client_node": platform.node(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "runs": args.runs,
+        "warmup": args.warmup,
+        "options": options,
+        "prompt_count": len(prompts),
+    }
+
+    print(f"\n📏 벤치마크: {client.model} @ {client.base_url}")
+    print(f"   프롬프트 {len(prompts)}개 × {args.runs}회 (워밍업 {args.warmup}회, seed={args.seed})\n")
+
+    samples = run_benchmark(client, prompts, args.runs, args.warmup, options)
+    summary = summarize(samples)
+    print_summary(summary)
+
+    if args.json:
+        write_json(args.json, meta, samples, summary)
+        print(f"💾 JSON 저장: {args.json}")
+    if args.csv:
+        write_csv(args.csv, meta, samples)
+        print(f"💾 CSV 저장: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,15 @@ ChatGPT 스타일 터미널 UI
 Rich 라이브러리를 사용한 인터랙티브 채팅 인터페이스
 """
 
-import requests
-import json
+import argparse
+import sys
 import time
 from datetime import datetime
-from typing import Optional, List, Dict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 
-from rich.console import Console
+import requests
+from rich.console import Console, RenderableType
 from rich.panel import Panel
 from rich.markdown import Markdown
 from rich.live import Live
@@ -21,28 +23,149 @@ from rich.layout import Layout
 from rich.text import Text
 from rich import box
 
-# Ollama API 설정
-OLLAMA_URL = "http://localhost:11434"
-MODEL_NAME = "llama2:7b-chat-q4_0"
+# `python src/chat_ui.py`로 실행해도 src 패키지를 찾을 수 있도록 경로 추가
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.context_window import DEFAULT_BUDGET_TOKENS, ContextWindow
+from src.markdown_stream import StreamingMarkdown
+from src.metrics import add_metrics_arguments, configure_metrics
+from src.model_residency import DEFAULT_KEEP_ALIVE, ModelResidency
+from src.ollama_client import OllamaError, get_client
+from src.rag import SearchResult, add_rag_arguments, configure_rag, get_retriever
+from src.scheduler import INTERACTIVE, add_scheduler_arguments, configure_scheduler
+from src.semantic_cache import CacheHit, SemanticCache, add_semantic_cache_arguments, configure_semantic_cache
+from src.session_store import DEFAULT_SESSION_DIR, Message, SessionStats, SessionStore
+from src.stream_events import CancelToken, DoneEvent, ErrorEvent, StreamEvent, TokenEvent, stream_events
+from src.stream_renderer import StreamRenderer
 
 console = Console()
 
+DISPLAY_MESSAGES = 5  # /history에 표시하는 최근 메시지 수
+
 
 class ChatSession:
     """채팅 세션 관리"""
 
-    def __init__(self):
-        self.history: List[Dict[str, str]] = []
+    def __init__(self, context_budget: int = DEFAULT_BUDGET_TOKENS,
+                 residency: Optional[ModelResidency] = None,
+                 store: Optional[SessionStore] = None, model_digest: Optional[str] = None,
+                 semantic_cache: Optional[SemanticCache] = None):
+        # 요약되지 않은 메시지와 표시용 최근 메시지만 메모리에 유지 (전체 기록은 세션 파일)
+        self.history: List[Message] = []
+        self.offset = 0  # history[0]의 세션 전체 기준 인덱스
+        self.stats = SessionStats()
         self.start_time = datetime.now()
-
-    def add_message(self, role: str, content: str, tokens: Optional[int] = None):
-        """메시지 추가"""
-        self.history.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now(),
-            "tokens": tokens
-        })
+        # 서버가 마지막 응답에 돌려준 KV 컨텍스트 토큰 (다음 턴에 그대로 전달)
+        self.context: Optional[List[int]] = None
+        self.window = ContextWindow(budget_tokens=context_budget)
+        self.residency = residency
+        self.store = store
+        self.semantic_cache = semantic_cache
+        self.model = get_client().model
+        self.model_digest = model_digest  # KV 컨텍스트 스냅샷이 같은 모델에서 만들어졌는지 확인용
+        self._saved_upto = 0  # 세션 파일에 기록한 요약의 summarized_upto (전체 기준)
+
+    def resume(self) -> str:
+        """
+        세션 파일 끝부분에서 최근 메시지, 누적 카운터, 요약 상태, KV 컨텍스트 복원
+
+        Returns:
+            KV 컨텍스트 스냅샷 복원 결과 (화면 표시용)
+        """
+        self.history, self.offset, self.stats, summary = self.store.load_tail(DISPLAY_MESSAGES, self.window.budget_tokens)
+        if summary:
+            self.window.restore(summary["summary"], summary["summarized_upto"] - self.offset)
+            self._saved_upto = summary["summarized_upto"]
+        return self._restore_context()
+
+    def _restore_context(self) -> str:
+        """스냅샷이 현재 모델/대화와 맞을 때만 KV 컨텍스트 사용 (아니면 요약 + 최근 턴으로 재구성)"""
+        snapshot = self.store.load_context()
+        if snapshot is None:
+            return "KV 컨텍스트 스냅샷 없음 (요약 + 최근 턴으로 재구성)"
+
+        reason = None
+        if snapshot.get("model") != self.model:
+            reason = f"모델 변경 ({snapshot.get('model')} → {self.model})"
+        elif self.model_digest is None or snapshot.get("digest") != self.model_digest:
+            # digest를 확인할 수 없으면 같은 모델인지 보장할 수 없으므로 사용하지 않는다
+            reason = "모델 digest 변경" if self.model_digest else "모델 digest 확인 불가"
+        elif snapshot.get("message_count") != self.stats.messages:
+            reason = "스냅샷 이후 대화가 더 진행됨"
+
+        if reason is not None:
+            self.store.discard_context()
+            return f"KV 컨텍스트 스냅샷 무효화: {reason} (요약 + 최근 턴으로 재구성)"
+
+        self.context = snapshot["context"]
+        return f"KV 컨텍스트 {len(self.context)} 토큰 복원 (새 입력만 프리필)"
+
+    def add_message(self, role: str, content: str, done: Optional[DoneEvent] = None):
+        """메시지 추가 (어시스턴트 응답이면 완료 이벤트의 토큰 수/시간 정보도 기록)"""
+        message = Message(
+            role,
+            content,
+            tokens=done.eval_count if done else None,
+            prompt_eval_count=done.prompt_eval_count if done else None,
+            timings=done.timings() if done else None,
+            truncated=done.truncated if done else False,
+        )
+        self.history.append(message)
+        self.stats.add(message)
+        if self.store is not None:
+            self.store.append_message(self.offset + len(self.history) - 1, message, self.stats)
+
+    def update_context(self, context: Optional[List[int]]):
+        """다음 턴에서 재사용할 KV 컨텍스트 저장 (세션 파일 옆에 스냅샷도 기록)"""
+        if context:
+            self.context = context
+            if self.store is not None:
+                self.store.save_context(context, self.model, self.model_digest, self.stats.messages)
+
+    def discard_context(self):
+        """
+        중단된 턴 이후에는 서버 KV 컨텍스트를 쓰지 않음
+
+        서버 컨텍스트에는 중단된 질문/부분 응답이 없으므로, 다음 턴은 기록에서 다시 구성한다.
+        """
+        self.context = None
+        if self.store is not None:
+            self.store.discard_context()
+
+    def prepare_turn(self, user_input: str) -> tuple[str, Optional[List[int]]]:
+        """
+        이번 턴에 보낼 프롬프트와 KV 컨텍스트 결정
+
+        서버 컨텍스트가 예산 안이면 새 입력만 보내고, 예산을 넘으면 컨텍스트를 버리고
+        요약 + 최근 턴으로 다시 구성한다. 어느 쪽이든 프리필은 예산 이하로 유지된다.
+        """
+        if not self.history:
+            return user_input, None
+        if self.context and self.window.fits(len(self.context), user_input):
+            return user_input, self.context
+
+        self.context = None
+        return self.window.build_prompt(self.history, user_input), None
+
+    def finish_turn(self):
+        """턴 종료 후 예산을 벗어난 오래된 턴을 백그라운드에서 요약"""
+        summary, summarized_upto = self.window.summary_state()
+        summarized_upto += self.offset
+        if self.store is not None and summary and summarized_upto > self._saved_upto:
+            # 지난 턴 이후 끝난 요약을 세션 파일에 기록 (이어서 시작할 때 요약 이전 메시지는 읽지 않음)
+            self.store.append_summary(summary, summarized_upto)
+            self._saved_upto = summarized_upto
+        self.offset += self.window.discard_summarized(self.history, keep=DISPLAY_MESSAGES)
+        self.window.compact_in_background(self.history)
+
+    def context_size(self) -> int:
+        """현재 컨텍스트 크기 (서버 토큰 수, 없으면 추정치)"""
+        if self.context:
+            return len(self.context)
+        window = self.window.stats()
+        return window["summary_tokens"] + sum(
+            msg.est_tokens for msg in self.history[window["summarized_messages"]:]
+        )
 
     def get_history_text(self) -> str:
         """히스토리를 텍스트로 변환"""
@@ -50,14 +173,16 @@ class ChatSession:
             return "[dim]대화 기록이 없습니다.[/dim]"
 
         text = ""
-        for msg in self.history[-5:]:  # 최근 5개만 표시
-            time_str = msg["timestamp"].strftime("%H:%M:%S")
-            role_emoji = "👤" if msg["role"] == "user" else "🤖"
+        for msg in self.history[-DISPLAY_MESSAGES:]:  # 최근 5개만 표시
+            time_str = msg.datetime.strftime("%H:%M:%S")
+            role_emoji = "👤" if msg.role == "user" else "🤖"
             text += f"[dim]{time_str}[/dim] {role_emoji} "
-            if msg["role"] == "user":
-                text += f"[cyan]{msg['content'][:50]}...[/cyan]\n" if len(msg['content']) > 50 else f"[cyan]{msg['content']}[/cyan]\n"
+            if msg.truncated:
+                text += "[yellow](중단됨)[/yellow] "
+            if msg.role == "user":
+                text += f"[cyan]{msg.content[:50]}...[/cyan]\n" if len(msg.content) > 50 else f"[cyan]{msg.content}[/cyan]\n"
             else:
-                text += f"[green]{msg['content'][:50]}...[/green]\n" if len(msg['content']) > 50 else f"[green]{msg['content']}[/green]\n"
+                text += f"[green]{msg.content[:50]}...[/green]\n" if len(msg.content) > 50 else f"[green]{msg.content}[/green]\n"
 
         return text
 
@@ -68,62 +193,66 @@ class ChatSession:
         table.add_column(style="green")
 
         duration = datetime.now() - self.start_time
-        total_tokens = sum(msg.get("tokens", 0) for msg in self.history)
+        stats = self.stats
+        # 최근 턴 지표는 메모리에 있는 마지막 메시지들에서만 계산
+        recent = self.history[-2 * DISPLAY_MESSAGES:]
+        prefill_counts = [msg.prompt_eval_count for msg in recent if msg.prompt_eval_count is not None]
+        ttfts = [msg.timings["ttft"] for msg in recent if msg.timings and msg.timings["ttft"] is not None]
 
-        table.add_row("💬 총 메시지", str(len(self.history)))
+        table.add_row("💬 총 메시지", str(stats.messages))
         table.add_row("⏱️  세션 시간", f"{duration.seconds // 60}분 {duration.seconds % 60}초")
-        table.add_row("🎯 토큰 수", str(total_tokens) if total_tokens > 0 else "N/A")
+        table.add_row("🎯 토큰 수", str(stats.tokens) if stats.tokens > 0 else "N/A")
+        table.add_row(
+            "📥 프리필 토큰 (최근 턴)",
+            " → ".join(str(n) for n in prefill_counts[-5:]) if prefill_counts else "N/A"
+        )
+        table.add_row(
+            "⚡ 생성 속도 (평균)",
+            f"{stats.eval_rate:.1f} tok/s" if stats.eval_rate is not None else "N/A"
+        )
+        table.add_row(
+            "⏳ 첫 토큰 지연 (최근 턴)",
+            " → ".join(f"{t:.2f}초" for t in ttfts[-5:]) if ttfts else "N/A"
+        )
+        window = self.window.stats()
+        table.add_row(
+            "🧠 컨텍스트 크기",
+            f"{self.context_size()} / {window['budget_tokens']} 토큰"
+            f" (요약된 메시지 {window['summarized_messages']}개)"
+        )
+        if self.residency is not None:
+            table.add_row("🧊 모델 상주", self.residency.describe())
+        if get_client().pool is not None:
+            table.add_row("🔀 백엔드", get_client().pool.describe())
+        if self.semantic_cache is not None:
+            cache = self.semantic_cache.stats()
+            table.add_row("⚡ 시맨틱 캐시", f"히트 {cache['hits']} / 미스 {cache['misses']} · 항목 {cache['entries']}개")
+        retriever = get_retriever()
+        if retriever is not None:
+            latency = f" · 마지막 검색 {retriever.last_latency * 1000:.0f}ms" if retriever.last_latency is not None else ""
+            table.add_row("📚 RAG", f"청크 {len(retriever.index)}개 · top {retriever.k} ({retriever.mode}){latency}")
 
         return table
 
 
 def check_ollama_connection() -> bool:
-    """Ollama 서버 연결 확인"""
-    try:
-        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
-
-
-def stream_response(prompt: str) -> tuple[str, Dict]:
-    """스트리밍 방식으로 응답 받기"""
-    url = f"{OLLAMA_URL}/api/generate"
+    """Ollama 서버 연결 확인 (OLLAMA_URLS로 여러 서버를 지정했으면 하나라도 정상이면 됨)"""
+    return get_client().is_available(timeout=5)
 
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": True
-    }
 
-    full_response = ""
-    metadata = {}
+def stream_response(prompt: str, context: Optional[List[int]] = None,
+                    cancel: Optional[CancelToken] = None) -> Iterator[StreamEvent]:
+    """
+    스트리밍 방식으로 응답 받기 (토큰/진행/완료/오류 이벤트)
 
-    try:
-        response = requests.post(url, json=payload, stream=True, timeout=120)
-
-        if response.status_code == 200:
-            for line in response.iter_lines():
-                if line:
-                    chunk = json.loads(line)
-                    if 'response' in chunk:
-                        text = chunk['response']
-                        full_response += text
-                        yield text
-
-                    if chunk.get('done', False):
-                        metadata = {
-                            'eval_count': chunk.get('eval_count'),
-                            'total_duration': chunk.get('total_duration'),
-                        }
-                        break
-        else:
-            yield f"[red]Error: {response.status_code}[/red]"
-
-    except Exception as e:
-        yield f"[red]Exception: {str(e)}[/red]"
-
-    return full_response, metadata
+    Args:
+        prompt: 이번 턴의 사용자 입력
+        context: 이전 턴이 돌려준 KV 컨텍스트. 서버는 이 토큰들을 다시 계산하지 않고
+            새로 입력된 토큰만 프리필한다.
+        cancel: 취소 토큰 (Ctrl+C 시 연결을 끊어 서버의 생성도 멈춤)
+    """
+    extra = {"context": context} if context else {}
+    return stream_events(prompt, cancel=cancel, timeout=120, **extra)
 
 
 def display_welcome():
@@ -175,9 +304,61 @@ def display_assistant_message(message: str):
     console.print(panel)
 
 
-def display_streaming_message(prompt: str):
-    """스트리밍 메시지 표시"""
-    full_text = ""
+def assistant_panel(content: RenderableType, truncated: bool = False, badge: Optional[str] = None) -> Panel:
+    """스트리밍 중인 어시스턴트 응답 패널 (badge: 하단 표시)"""
+    return Panel(
+        content,
+        title="[green]🤖 Assistant[/green]",
+        subtitle="[yellow]⏹️  중단됨[/yellow]" if truncated else badge,
+        border_style="green",
+        box=box.ROUNDED,
+        padding=(1, 2)
+    )
+
+
+def lookup_semantic_cache(cache: SemanticCache, question: str, model: str):
+    """시맨틱 캐시 조회 (임베딩 요청이 실패하면 캐시 없이 진행)"""
+    try:
+        return cache.lookup(question, model)
+    except (requests.RequestException, OllamaError):
+        return None, None
+
+
+def display_sources(results: List[SearchResult], latency: float):
+    """프롬프트에 붙인 참고 문서 표시"""
+    if not results:
+        console.print(f"[dim]📚 관련 문서 없음 ({latency * 1000:.0f}ms)[/dim]")
+        return
+    sources = ", ".join(dict.fromkeys(Path(r.source).name for r in results))
+    console.print(f"[dim]📚 참고: {sources} (청크 {len(results)}개 · {latency * 1000:.0f}ms)[/dim]")
+
+
+def display_cached_message(hit: CacheHit):
+    """캐시된 답변 표시"""
+    badge = f"[cyan]⚡ 캐시됨 · 유사도 {hit.similarity:.2f}[/cyan]"
+    console.print(assistant_panel(Markdown(hit.response), badge=badge))
+
+
+def display_streaming_message(prompt: str,
+                              context: Optional[List[int]] = None) -> Optional[tuple[DoneEvent, Dict]]:
+    """
+    스트리밍 메시지 표시 (완료 이벤트와 렌더 통계 반환)
+
+    토큰은 수신 스레드가 버퍼에 쌓고 화면은 고정 프레임 레이트로 갱신하므로,
+    렌더링이 느려도 네트워크 수신이 밀리지 않는다. 수신 중 Ctrl+C를 누르면 연결을 끊고
+    받은 부분까지를 truncated 완료 이벤트로 돌려준다.
+    """
+    result: Dict[str, Optional[StreamEvent]] = {"done": None, "error": None}
+    cancel = CancelToken()
+
+    def tokens():
+        for event in stream_response(prompt, context, cancel=cancel):
+            if isinstance(event, TokenEvent):
+                yield event.text
+            elif isinstance(event, DoneEvent):
+                result["done"] = event
+            elif isinstance(event, ErrorEvent):
+                result["error"] = event
 
     with Live(
         Panel(
@@ -186,36 +367,38 @@ def display_streaming_message(prompt: str):
             border_style="green",
             box=box.ROUNDED
         ),
-        refresh_per_second=10,
+        auto_refresh=False,
         console=console
     ) as live:
-
-        for chunk in stream_response(prompt):
-            if isinstance(chunk, str) and not chunk.startswith("[red]"):
-                full_text += chunk
-                # 실시간으로 텍스트 업데이트
-                live.update(
-                    Panel(
-                        full_text,
-                        title="[green]🤖 Assistant[/green]",
-                        border_style="green",
-                        box=box.ROUNDED,
-                        padding=(1, 2)
-                    )
-                )
-            else:
-                # 에러 메시지
-                live.update(
-                    Panel(
-                        chunk,
-                        title="[red]❌ Error[/red]",
-                        border_style="red",
-                        box=box.ROUNDED
-                    )
-                )
-                return None
-
-    return full_text
+        # 완성된 블록은 캐시하고 마지막 블록만 다시 파싱
+        markdown = StreamingMarkdown()
+        renderer = StreamRenderer(live, lambda text: assistant_panel(markdown.update(text)),
+                                  on_cancel=cancel.cancel)
+        full_text = renderer.run(tokens())
+
+        done = result["done"]
+        if renderer.cancelled and (done is None or done.truncated):
+            # 화면에 그린 부분까지를 응답으로 남긴다 (수신 스레드가 아직 끝나지 않았을 수 있음)
+            stats = renderer.stats()
+            done = DoneEvent(text=full_text, ttft=stats["first_token_time"],
+                             wall_time=stats["network_time"], truncated=True)
+            live.update(assistant_panel(markdown.update(full_text), truncated=True), refresh=True)
+            return done, stats
+
+        if result["error"]:
+            # 에러 메시지
+            live.update(
+                Panel(
+                    Text(result["error"].message, style="red"),
+                    title="[red]❌ Error[/red]",
+                    border_style="red",
+                    box=box.ROUNDED
+                ),
+                refresh=True
+            )
+            return None
+
+    return done, renderer.stats()
 
 
 def handle_command(command: str, session: ChatSession) -> bool:
@@ -254,8 +437,39 @@ def handle_command(command: str, session: ChatSession) -> bool:
     return True
 
 
-def main():
+def parse_args() -> argparse.Namespace:
+    """CLI 인자 파싱"""
+    parser = argparse.ArgumentParser(description="ChatGPT 스타일 터미널 UI")
+    parser.add_argument(
+        "--context-budget", type=int, default=DEFAULT_BUDGET_TOKENS,
+        help=f"한 턴에 보낼 최대 컨텍스트 토큰 수 (기본값: {DEFAULT_BUDGET_TOKENS})"
+    )
+    parser.add_argument(
+        "--keep-alive", default=DEFAULT_KEEP_ALIVE,
+        help=f"마지막 요청 후 모델을 메모리에 유지할 시간 (기본값: {DEFAULT_KEEP_ALIVE})"
+    )
+    parser.add_argument(
+        "--resume", nargs="?", const="", default=None, metavar="SESSION_ID",
+        help="저장된 세션을 이어서 시작 (ID를 생략하면 가장 최근 세션)"
+    )
+    parser.add_argument(
+        "--session-dir", type=Path, default=DEFAULT_SESSION_DIR,
+        help="세션 파일 디렉토리 (기본값: llm/.sessions)"
+    )
+    parser.add_argument("--no-save", action="store_true", help="대화를 세션 파일에 저장하지 않음")
+    add_metrics_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_semantic_cache_arguments(parser)
+    add_rag_arguments(parser)
+    return parser.parse_args()
+
+
+def main(args: argparse.Namespace):
     """메인 함수"""
+    configure_metrics(args, call_site="chat_ui")
+    # 채팅 턴은 같은 서버를 쓰는 평가 배치보다 먼저 처리 (백그라운드 요약은 batch)
+    configure_scheduler(args, priority=INTERACTIVE)
+    configure_rag(args)
     console.clear()
 
     # 연결 확인
@@ -270,13 +484,48 @@ def main():
             ))
             return
 
-    console.print("[green]✓[/green] Ollama 서버 연결됨\n")
+    console.print("[green]✓[/green] Ollama 서버 연결됨")
+    if get_client().pool is not None:
+        console.print(f"[dim]🔀 백엔드 {get_client().pool.describe()}[/dim]")
+    if get_retriever() is not None:
+        console.print(f"[dim]📚 RAG 색인 {args.rag_index} (청크 {len(get_retriever().index)}개)[/dim]")
+    console.print()
+
+    # 환영 화면을 그리는 동안 모델을 미리 로드 (첫 질문의 cold start 제거)
+    residency = ModelResidency(keep_alive=args.keep_alive)
+    residency.preload_async()
+    residency.start_watcher()
 
     # 환영 메시지
     display_welcome()
 
-    # 세션 시작
-    session = ChatSession()
+    # 세션 시작 (이어서 시작하면 파일 끝부분만 읽음)
+    if args.resume is not None:
+        try:
+            store = SessionStore.find(args.resume or None, args.session_dir)
+        except FileNotFoundError as e:
+            console.print(f"[red]{e}[/red]")
+            residency.stop()
+            return
+    else:
+        store = None if args.no_save else SessionStore.create(args.session_dir, model=get_client().model)
+
+    try:
+        digest = get_client().get_digest(timeout=5)
+    except Exception:
+        digest = None
+
+    session = ChatSession(context_budget=args.context_budget, residency=residency, store=store,
+                          model_digest=digest, semantic_cache=configure_semantic_cache(args))
+    if args.resume is not None:
+        context_status = session.resume()
+        if args.no_save:
+            session.store = None
+        console.print(f"[green]↩️  세션 {store.session_id} 이어서 시작 (메시지 {session.stats.messages}개)[/green]")
+        console.print(f"[dim]🧠 {context_status}[/dim]")
+        console.print(Panel(session.get_history_text(), title="📜 대화 기록 (최근 5개)", border_style="blue"))
+    elif store is not None:
+        console.print(f"[dim]💾 세션 저장: {store.path}[/dim]")
 
     try:
         while True:
@@ -296,27 +545,74 @@ def main():
                     break
                 continue
 
+            # RAG: 관련 문서를 붙인 입력으로 프롬프트 구성 (기록에는 원래 질문만 저장)
+            turn_input, sources = user_input, None
+            if get_retriever() is not None:
+                turn_input, sources = get_retriever().augment(user_input)
+
+            # 이번 턴에 보낼 프롬프트/컨텍스트 결정 (토큰 예산 적용)
+            prompt, context = session.prepare_turn(turn_input)
+            # 시맨틱 캐시는 대화의 첫 질문에만 적용 (이후 질문의 답은 앞선 대화에 따라 달라짐)
+            cacheable = session.semantic_cache is not None and not session.history
+
             # 사용자 메시지 표시
             display_user_message(user_input)
             session.add_message("user", user_input)
+            if sources is not None:
+                display_sources(sources, get_retriever().last_latency)
 
-            # AI 응답 (스트리밍)
             console.print()  # 빈 줄
             start_time = time.time()
-            response = display_streaming_message(user_input)
+            vector = None
+            if cacheable:
+                hit, vector = lookup_semantic_cache(session.semantic_cache, user_input, session.model)
+                if hit is not None:
+                    display_cached_message(hit)
+                    session.add_message("assistant", hit.response)
+                    session.finish_turn()
+                    console.print(
+                        f"\n[dim]⚡ 캐시 응답 {(time.time() - start_time) * 1000:.0f}ms"
+                        f" · 저장된 질문: {hit.prompt[:40]}[/dim]"
+                    )
+                    continue
+
+            # AI 응답 (스트리밍)
+            result = display_streaming_message(prompt, context)
             elapsed = time.time() - start_time
 
-            if response:
-                session.add_message("assistant", response)
+            if result:
+                done, render = result
+                session.add_message("assistant", done.text, done=done)
+                if done.truncated:
+                    session.discard_context()
+                else:
+                    session.update_context(done.context)
+                    if vector is not None:
+                        session.semantic_cache.put(vector, user_input, done.text, session.model)
+                session.finish_turn()
+
+                if done.truncated:
+                    console.print("\n[yellow]⏹️  응답 생성을 중단했습니다. 받은 부분까지 '중단됨'으로 기록했습니다.[/yellow]")
+                    continue
 
                 # 성능 메트릭 표시
-                console.print(f"\n[dim]⏱️  {elapsed:.2f}초[/dim]")
+                prefill_text = f" · 프리필 {done.prompt_eval_count} 토큰" if done.prompt_eval_count is not None else ""
+                rate_text = f" · {done.eval_rate:.1f} tok/s" if done.eval_rate is not None else ""
+                console.print(
+                    f"\n[dim]⏱️  {elapsed:.2f}초{prefill_text}{rate_text}"
+                    f" · 수신 {render['network_time']:.2f}초"
+                    f" · 렌더 {render['render_time']:.2f}초/{render['frames']}프레임[/dim]"
+                )
 
     except KeyboardInterrupt:
         console.print("\n\n[yellow]👋 Ctrl+C로 종료합니다.[/yellow]\n")
     except Exception as e:
         console.print(f"\n[red]오류 발생: {str(e)}[/red]\n")
+    finally:
+        if session.semantic_cache is not None:
+            session.semantic_cache.flush()
+        residency.stop()
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_args())
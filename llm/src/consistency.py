@@ -0,0 +1,354 @@
+"""
+여러 샘플 응답의 일관성 점수
+같은 프롬프트를 N번 생성한 응답들이 얼마나 서로 같은지 세 가지로 잽니다.
+    similarity  응답 벡터(문자 n-gram 해시 또는 Ollama 임베딩)의 쌍별 코사인 유사도 평균
+    agreement   응답에서 뽑은 답(마지막 숫자, 없으면 첫 줄)이 가장 많이 나온 답과 같은 비율
+    entropy     뽑은 답 분포의 엔트로피 (비트, 모두 같으면 0)
+
+프롬프트 수천 개 × 샘플 20개도 수 초 안에 계산하도록 프롬프트를 블록 단위로 묶어
+n-gram 집계는 np.bincount, 쌍별 유사도는 배치 행렬 곱, 답 분포는 np.unique로 한 번에 처리합니다.
+
+사용법:
+    python -m src.consistency .runs/phase2_hallucination-20250101-120000.jsonl
+    python -m src.consistency phase2_hallucination-20250101-120000 --vectors embed
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import requests
+
+from .ollama_client import OllamaClient, OllamaError, get_client
+
+VECTOR_KINDS = ("ngram", "embed")
+DEFAULT_SAMPLES = 3
+NGRAM_SIZES = (1, 2, 3)   # 문자 n-gram 길이 (한국어는 형태소 분석 없이도 2~3글자 조각이 잘 맞음)
+NGRAM_DIM = 2048          # 해시 버킷 수 (2의 거듭제곱)
+BLOCK_TEXTS = 4096        # 한 번에 벡터로 만들 응답 수 (NGRAM_DIM × 8바이트 × 이 값만큼 메모리 사용)
+
+_NUMBER = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+_PUNCT = re.compile(r"[^\w]+")
+
+
+def sample_options(sample: int, temperature: Any, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    샘플 번호별 생성 옵션
+
+    Args:
+        sample: 샘플 번호 (0부터)
+        temperature: 온도 하나 또는 목록 (목록이면 샘플 번호 순서대로 돌아가며 사용, None이면 서버 기본값)
+        seed: 기준 시드 (샘플 i는 seed + i, None이면 시드를 고정하지 않음)
+    """
+    if isinstance(temperature, (list, tuple)):
+        temperature = temperature[sample % len(temperature)]
+    options: Dict[str, Any] = {}
+    if temperature is not None:
+        options["temperature"] = temperature
+    if seed is not None:
+        options["seed"] = seed + sample
+    return options
+
+
+def extract_answer(text: str, pattern: Optional[str] = None) -> str:
+    """
+    응답에서 비교할 답 추출
+
+    pattern이 있으면 첫 매치(그룹이 있으면 첫 그룹), 없으면 마지막 숫자, 숫자도 없으면
+    첫 줄을 소문자로 바꾸고 문장 부호를 뺀 값 (앞 50글자).
+    """
+    if pattern:
+        match = re.search(pattern, text)
+        if match:
+            return (match.group(1) if match.groups() else match.group(0)).strip().lower()
+    numbers = _NUMBER.findall(text)
+    if numbers:
+        number = numbers[-1].replace(",", "")
+        return number.rstrip("0").rstrip(".") if "." in number else number
+    for line in text.strip().splitlines():
+        line = _PUNCT.sub(" ", line).strip().lower()
+        if line:
+            return line[:50]
+    return ""
+
+
+def ngram_vectors(texts: Sequence[str], sizes: Sequence[int] = NGRAM_SIZES, dim: int = NGRAM_DIM) -> np.ndarray:
+    """
+    문자 n-gram 해시 빈도 벡터 (행마다 L2 정규화, 빈 문자열은 0 벡터)
+
+    모든 텍스트를 구분자(0)로 이어 붙인 코드 포인트 배열에서 n-gram 해시를 한 번에 계산하고
+    (행 번호 × dim + 버킷)을 np.bincount 한 번으로 세므로 텍스트 수만큼 도는 NumPy 호출이 없다.
+    dim은 2의 거듭제곱이어야 한다 (버킷을 나머지 대신 비트 마스크로 계산).
+    """
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+    joined = "\0".join(" ".join(text.lower().split()) for text in texts) + "\0"
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+    separator = codes == 0
+    rows = np.cumsum(separator) - separator  # 구분자는 앞 텍스트에 속함
+
+    keys = []
+    hashes = np.zeros(len(codes), dtype=np.uint32)
+    with np.errstate(over="ignore"):  # uint32 곱셈 오버플로는 해시라 의도한 것
+        for n in range(1, max(sizes) + 1):
+            # 길이 n인 n-gram의 해시: 길이 n-1 해시 × 홀수 상수 + 다음 글자
+            hashes = hashes[:len(codes) - n + 1] * np.uint32(0x01000193) + codes[n - 1:]
+            if n not in sizes:
+                continue
+            # 구분자로 끝나거나 두 텍스트에 걸친 n-gram은 제외
+            valid = ~separator[n - 1:]
+            if n > 1:
+                valid &= rows[:len(hashes)] == rows[n - 1:]
+            buckets = ((hashes[valid] ^ np.uint32(n * 0x9E3779B9 & 0xFFFFFFFF)) * np.uint32(0x85EBCA6B)) >> np.uint32(16)
+            keys.append(rows[:len(hashes)][valid] * dim + (buckets & np.uint32(dim - 1)))
+    counts = np.bincount(np.concatenate(keys), minlength=len(texts) * dim)
+    vectors = counts.reshape(len(texts), dim).astype(np.float32)
+    norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))[:, None]
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def embed_vectors(texts: Sequence[str], client: Optional[OllamaClient] = None,
+                  batch_size: int = 64) -> np.ndarray:
+    """Ollama /api/embed 임베딩 (행마다 L2 정규화)"""
+    client = client or get_client()
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(client.embed([text or " " for text in texts[start:start + batch_size]]))
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def pairwise_similarity(vectors: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    프롬프트별 샘플 쌍 코사인 유사도 평균
+
+    Args:
+        vectors: (프롬프트, 샘플, 차원) 정규화된 벡터 (없는 샘플은 0 벡터)
+        mask: (프롬프트, 샘플) 샘플이 있으면 True
+
+    Returns:
+        (프롬프트,) 유사도 평균 (샘플이 2개 미만이면 nan)
+    """
+    vectors = vectors * mask[:, :, None]
+    sims = np.matmul(vectors, vectors.transpose(0, 2, 1))  # (P, S, S)
+    k = mask.sum(axis=1)
+    pairs = k * (k - 1)
+    off_diagonal = sims.sum(axis=(1, 2)) - np.einsum("pii->p", sims)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(pairs > 0, off_diagonal / np.maximum(pairs, 1), np.nan)
+
+
+def answer_agreement(answers: Sequence[Sequence[str]]) -> Dict[str, Any]:
+    """
+    프롬프트별 답 일치율, 엔트로피, 최다 답
+
+    Args:
+        answers: 프롬프트별 추출한 답 목록 (샘플 수가 달라도 됨)
+
+    Returns:
+        {"agreement": (P,), "entropy": (P,), "majority": [str]}
+    """
+    lengths = np.array([len(a) for a in answers], dtype=np.int64)
+    flat = [answer for group in answers for answer in group]
+    if not flat:
+        empty = np.full(len(answers), np.nan)
+        return {"agreement": empty, "entropy": empty.copy(), "majority": [""] * len(answers)}
+    prompts = np.repeat(np.arange(len(answers)), lengths)
+    vocab, ids = np.unique(np.array(flat, dtype=str), return_inverse=True)
+    # (프롬프트, 답) 조합별 빈도를 한 번에 셈
+    pairs, counts = np.unique(prompts * len(vocab) + ids, return_counts=True)
+    pair_prompts = pairs // len(vocab)
+    p = counts / lengths[pair_prompts]
+
+    entropy = np.bincount(pair_prompts, weights=-p * np.log2(p), minlength=len(answers))
+    top = np.zeros(len(answers), dtype=np.int64)
+    np.maximum.at(top, pair_prompts, counts)
+    # 프롬프트별 최다 답 (동률이면 사전순으로 앞선 답)
+    order = np.lexsort((pairs % len(vocab), -counts, pair_prompts))
+    first = order[np.r_[True, pair_prompts[order][1:] != pair_prompts[order][:-1]]]
+    majority = [""] * len(answers)
+    for index in first:
+        majority[pair_prompts[index]] = str(vocab[pairs[index] % len(vocab)])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        agreement = np.where(lengths > 0, top / np.maximum(lengths, 1), np.nan)
+    entropy[lengths == 0] = np.nan
+    return {"agreement": agreement, "entropy": entropy, "majority": majority}
+
+
+def score_consistency(samples: Sequence[Sequence[str]], vectors: str = "ngram",
+                      patterns: Optional[Sequence[Optional[str]]] = None,
+                      client: Optional[OllamaClient] = None) -> Dict[str, Any]:
+    """
+    프롬프트별 샘플 응답의 일관성 점수
+
+    Args:
+        samples: 프롬프트별 응답 목록 (실패한 샘플은 빼고 넘김)
+        vectors: "ngram" (문자 n-gram 해시) 또는 "embed" (Ollama 임베딩, 요청이 실패하면 n-gram으로 계산)
+        patterns: 프롬프트별 답 추출 정규식 (None이면 기본 규칙)
+        client: vectors="embed"일 때 임베딩을 요청할 클라이언트
+
+    Returns:
+        {"similarity": (P,), "agreement": (P,), "entropy": (P,), "majority": [str], "samples": (P,),
+         "vectors": 실제로 쓴 벡터 종류}
+    """
+    if vectors not in VECTOR_KINDS:
+        raise ValueError(f"알 수 없는 벡터 종류: {vectors} ({', '.join(VECTOR_KINDS)})")
+    patterns = patterns or [None] * len(samples)
+    answers = [[extract_answer(text, pattern) for text in group] for group, pattern in zip(samples, patterns)]
+    result = answer_agreement(answers)
+
+    similarity = np.full(len(samples), np.nan)
+    width = max((len(group) for group in samples), default=0)
+    block = max(1, BLOCK_TEXTS // max(width, 1))
+    for start in range(0, len(samples), block):
+        groups = samples[start:start + block]
+        texts = [text for group in groups for text in group]
+        if not texts:
+            continue
+        if vectors == "embed":
+            try:
+                flat = embed_vectors(texts, client)
+            except (requests.RequestException, OllamaError) as e:
+                print(f"⚠️  임베딩 요청 실패 ({e}), 문자 n-gram으로 계산합니다.")
+                return score_consistency(samples, "ngram", patterns)
+        else:
+            flat = ngram_vectors(texts)
+        # 샘플 수가 다른 프롬프트는 0 벡터로 채워 (블록, 최대 샘플 수, 차원) 배열로 만듦
+        mask = np.arange(width)[None, :] < np.array([len(g) for g in groups])[:, None]
+        padded = np.zeros((len(groups), width, flat.shape[1]), dtype=np.float32)
+        padded[mask] = flat
+        similarity[start:start + len(groups)] = pairwise_similarity(padded, mask)
+
+    result["similarity"] = similarity
+    result["samples"] = np.array([len(group) for group in samples], dtype=np.int64)
+    result["vectors"] = vectors
+    return result
+
+
+def read_sample_groups(paths: Iterable[Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    실행 기록에서 여러 샘플을 생성한 케이스의 성공한 응답을 모음 (같은 샘플은 나중 기록 사용)
+
+    Returns:
+        케이스 ID → {"case": 마지막 기록, "responses": {샘플 번호: 응답}}
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 쓰다가 끊긴 줄
+                if "type" in record or record.get("samples", 1) < 2 or not record.get("success"):
+                    continue
+                group = groups.setdefault(record["id"], {"case": record, "responses": {}})
+                group["case"] = {key: value for key, value in record.items() if key != "response"}
+                group["responses"][record["sample"]] = record.get("response", "")
+    return groups
+
+
+def score_groups(groups: Dict[str, Dict[str, Any]], vectors: str = "ngram",
+                 client: Optional[OllamaClient] = None) -> List[Dict[str, Any]]:
+    """read_sample_groups 결과의 케이스별 일관성 기록 (결과 파일에 덧붙일 형태)"""
+    ids = list(groups)
+    samples = [[groups[i]["responses"][s] for s in sorted(groups[i]["responses"])] for i in ids]
+    patterns = [groups[i]["case"].get("answer_pattern") for i in ids]
+    scores = score_consistency(samples, vectors=vectors, patterns=patterns, client=client)
+    records = []
+    for row, case_id in enumerate(ids):
+        case = groups[case_id]["case"]
+        records.append({
+            "type": "consistency", "id": case_id, "category": case.get("category"), "name": case.get("name"),
+            "samples": int(scores["samples"][row]), "requested": case.get("samples"), "vectors": scores["vectors"],
+            "similarity": _round(scores["similarity"][row]), "agreement": _round(scores["agreement"][row]),
+            "entropy": _round(scores["entropy"][row]), "answer": scores["majority"][row],
+        })
+    return records
+
+
+def _round(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def print_consistency(records: List[Dict[str, Any]], limit: int = 20):
+    """일관성 기록 출력 (많으면 평균과 가장 일관성이 낮은 케이스만)"""
+    if not records:
+        return
+    print(f"\n🔁 일관성 ({len(records)}개 케이스, 벡터: {records[0]['vectors']}):")
+    shown = records
+    if len(records) > limit:
+        for key, label in (("similarity", "유사도"), ("agreement", "답 일치율"), ("entropy", "엔트로피")):
+            values = [r[key] for r in records if r[key] is not None]
+            print(f"   - 평균 {label}: {np.mean(values):.3f}" if values else f"   - 평균 {label}: -")
+        shown = sorted(records, key=lambda r: (r["agreement"] is None, r["agreement"] or 0, r["similarity"] or 0))[:5]
+        print("   가장 일관성이 낮은 케이스:")
+    for r in shown:
+        mark = "✅" if r["agreement"] == 1.0 else "⚠️ "
+        similarity = "-" if r["similarity"] is None else f"{r['similarity']:.3f}"
+        entropy = "-" if r["entropy"] is None else f"{r['entropy']:.2f}비트"
+        count = r["samples"] if r.get("requested") in (None, r["samples"]) else f"{r['samples']}/{r['requested']}"
+        print(f"   {mark} {r['name']}: 유사도 {similarity} · 답 일치율 {r['agreement']:.2f} ('{r['answer']}') "
+              f"· 엔트로피 {entropy} (샘플 {count}개)")
+
+
+def score_journals(paths: Iterable[Path], vectors: str = "ngram",
+                   client: Optional[OllamaClient] = None) -> List[Dict[str, Any]]:
+    """실행 기록의 여러 샘플 케이스 일관성 점수"""
+    groups = read_sample_groups(paths)
+    return score_groups(groups, vectors=vectors, client=client) if groups else []
+
+
+def add_consistency_arguments(parser: argparse.ArgumentParser):
+    """여러 샘플 일관성 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--samples", type=int, default=None,
+        help="일관성 테스트 샘플 수 (샘플을 여러 개 생성하는 케이스에만 적용, 기본값: 케이스 설정)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="기준 시드 (샘플 i는 seed + i로 생성해 재현 가능, 기본값: 고정하지 않음)"
+    )
+    parser.add_argument(
+        "--temperatures", type=lambda value: [float(t) for t in value.split(",")], default=None,
+        help="샘플별 온도 (쉼표로 구분, 샘플 번호 순서대로 돌아가며 사용, 예: 0.2,0.7,1.0)"
+    )
+    parser.add_argument(
+        "--consistency-vectors", choices=VECTOR_KINDS, default="ngram",
+        help="응답 유사도에 쓸 벡터 (ngram: 문자 n-gram 해시, embed: Ollama 임베딩, 기본값: ngram)"
+    )
+
+
+def main():
+    """메인 함수"""
+    from .eval_harness import parse_run
+
+    parser = argparse.ArgumentParser(description="실행 기록의 여러 샘플 케이스 일관성 점수 계산")
+    parser.add_argument("runs", nargs="+", type=parse_run, help="실행 ID 또는 실행 기록 경로 (샤드별 기록을 함께 줄 수 있음)")
+    parser.add_argument("--vectors", choices=VECTOR_KINDS, default="ngram", help="응답 유사도에 쓸 벡터 (기본값: ngram)")
+    parser.add_argument("--output", type=Path, default=None, help="일관성 기록을 JSONL로 저장")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = score_journals(args.runs, vectors=args.vectors)
+    elapsed = time.perf_counter() - start
+    if not records:
+        print("여러 샘플을 생성한 케이스가 없습니다.")
+        return
+    print_consistency(records)
+    print(f"\n⏱️  {len(records)}개 케이스 계산: {elapsed:.2f}초")
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"💾 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+토큰 예산 기반 대화 컨텍스트 관리
+최근 턴은 예산 안에서 그대로 보내고, 오래된 턴은 백그라운드에서 요약합니다.
+"""
+
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from .ollama_client import get_client
+from .scheduler import BATCH
+
+if TYPE_CHECKING:
+    from .session_store import Message
+
+DEFAULT_BUDGET_TOKENS = 1024
+
+SUMMARY_PROMPT = """다음은 지금까지의 대화 요약과 그 이후에 이어진 대화입니다.
+사용자의 요청, 중요한 사실, 결정된 내용을 유지하면서 한국어 5문장 이내로 다시 요약하세요.
+
+[기존 요약]
+{summary}
+
+[이어진 대화]
+{transcript}
+
+요약:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정 (Llama 2 토크나이저 근사치)
+
+    한글은 대부분 바이트 단위로 쪼개져 글자당 약 2토큰,
+    영문/숫자는 약 4글자당 1토큰으로 계산한다.
+    """
+    wide = sum(1 for ch in text if ord(ch) >= 0x1100)
+    return int(wide * 2 + (len(text) - wide) / 4) + 1
+
+
+def format_transcript(messages: List["Message"]) -> str:
+    """메시지 목록을 프롬프트용 대화록으로 변환"""
+    lines = []
+    for msg in messages:
+        speaker = "User" if msg.role == "user" else "Assistant"
+        lines.append(f"{speaker}: {msg.content}")
+    return "\n\n".join(lines)
+
+
+def summarize_with_llm(summary: str, transcript: str) -> str:
+    """기본 요약 함수 (Ollama로 요약 생성)"""
+    result = get_client().generate(
+        SUMMARY_PROMPT.format(summary=summary or "(없음)", transcript=transcript),
+        options={"temperature": 0, "num_predict": 256},
+        priority=BATCH,  # 백그라운드 작업이므로 채팅 턴을 앞지르지 않게
+    )
+    return result.get("response", "").strip()
+
+
+class ContextWindow:
+    """토큰 예산 안에서 최근 턴 + 요약으로 프롬프트를 구성"""
+
+    def __init__(self, budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+                 summarizer: Optional[Callable[[str, str], str]] = summarize_with_llm,
+                 summary_ratio: float = 0.25):
+        """
+        Args:
+            budget_tokens: 한 번에 프리필할 최대 토큰 수
+            summarizer: (기존 요약, 대화록) -> 새 요약. None이면 오래된 턴은 버린다.
+            summary_ratio: 예산 중 요약에 할당할 비율
+        """
+        self.budget_tokens = budget_tokens
+        self.summarizer = summarizer
+        self.summary_budget = int(budget_tokens * summary_ratio)
+
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_upto = 0  # history에서 요약에 반영된 메시지 수
+
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def recent_budget(self) -> int:
+        return self.budget_tokens - min(self.summary_tokens, self.summary_budget)
+
+    def fits(self, context_tokens: int, new_input: str) -> bool:
+        """서버 KV 컨텍스트를 이어 써도 예산 안에 드는지"""
+        return context_tokens + estimate_tokens(new_input) <= self.budget_tokens
+
+    def _window_start(self, history: List["Message"], budget: int) -> int:
+        """최신 메시지부터 예산 안에 드는 첫 메시지 인덱스 (턴 단위로 맞춤)"""
+        used = 0
+        start = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            used += history[i].est_tokens
+            if used > budget:
+                break
+            start = i
+        # 답변만 남고 질문이 잘리지 않도록 사용자 메시지에서 시작
+        while start < len(history) and history[start].role != "user":
+            start += 1
+        return start
+
+    def build_prompt(self, history: List["Message"], new_input: str) -> str:
+        """요약 + 예산 안에 드는 최근 턴 + 새 입력으로 프롬프트 구성"""
+        budget = self.recent_budget - estimate_tokens(new_input)
+        with self._lock:
+            summary = self.summary
+            start = max(self._window_start(history, budget), self.summarized_upto)
+
+        parts = []
+        if summary:
+            parts.append(f"[이전 대화 요약]\n{summary}")
+        recent = history[start:]
+        if recent:
+            parts.append(format_transcript(recent))
+        parts.append(f"User: {new_input}")
+        return "\n\n".join(parts)
+
+    def compact_in_background(self, history: List["Message"]):
+        """최근 예산을 벗어난 턴을 백그라운드 스레드에서 요약에 합침"""
+        if self.summarizer is None:
+            return
+        if self._worker is not None and self._worker.is_alive():
+            return  # 이전 요약이 아직 진행 중이면 다음 턴에 다시 시도
+
+        end = self._window_start(history, self.recent_budget)
+        if end <= self.summarized_upto:
+            return
+
+        pending = list(history[self.summarized_upto:end])
+        self._worker = threading.Thread(
+            target=self._compact, args=(pending, end), daemon=True
+        )
+        self._worker.start()
+
+    def _compact(self, pending: List["Message"], end: int):
+        try:
+            summary = self.summarizer(self.summary, format_transcript(pending))
+        except Exception:
+            return  # 요약 실패 시 다음 턴에 다시 시도
+
+        with self._lock:
+            self.summary = summary
+            self.summary_tokens = estimate_tokens(summary)
+            self.summarized_upto = end
+
+    def discard_summarized(self, history: List["Message"], keep: int = 0) -> int:
+        """
+        요약에 반영된 오래된 메시지를 history 앞에서 제거 (최근 keep개는 유지)
+
+        요약 작업이 진행 중이면 인덱스가 바뀌지 않도록 건너뛴다.
+
+        Returns:
+            제거한 메시지 수
+        """
+        if self._worker is not None and self._worker.is_alive():
+            return 0
+        with self._lock:
+            count = min(self.summarized_upto, len(history) - keep)
+            if count <= 0:
+                return 0
+            del history[:count]
+            self.summarized_upto -= count
+            return count
+
+    def summary_state(self) -> tuple[str, int]:
+        """(요약, 요약에 반영된 메시지 수)를 함께 조회"""
+        with self._lock:
+            return self.summary, self.summarized_upto
+
+    def restore(self, summary: str, summarized_upto: int):
+        """저장된 요약 상태 복원 (summarized_upto는 현재 history 기준 인덱스)"""
+        with self._lock:
+            self.summary = summary
+            self.summary_tokens = estimate_tokens(summary)
+            self.summarized_upto = max(0, summarized_upto)
+
+    def stats(self) -> Dict[str, int]:
+        """요약 상태"""
+        with self._lock:
+            return {
+                "budget_tokens": self.budget_tokens,
+                "summary_tokens": self.summary_tokens if self.summary else 0,
+                "summarized_messages": self.summarized_upto,
+            }
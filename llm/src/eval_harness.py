@@ -0,0 +1,441 @@
+"""
+데이터 기반 평가 하네스
+테스트 케이스를 JSONL/YAML 파일에서 하나씩 읽어 실행하고, 결과를 끝나는 대로 JSONL 파일에 한 줄씩 기록합니다.
+--shard i/N으로 케이스를 여러 프로세스/머신에 나눠 실행할 수 있습니다.
+
+케이스 형식 (JSONL 한 줄 = 케이스 하나, '#'으로 시작하는 줄은 주석):
+    {"id": "culture-1", "category": "culture", "name": "한국 역사",
+     "prompt": "세종대왕의 업적 중 가장 중요한 것은 무엇인가요?",
+     "expected": "훈민정음(한글) 창제", "analysis": "한국 역사에 대한 지식"}
+
+선택 필드:
+    temperature  생성 온도 (기본값: 0.7, 목록이면 샘플 번호 순서대로 돌아가며 사용)
+    samples      같은 프롬프트를 여러 번 생성 (샘플 번호별로 따로 캐시, 끝나면 샘플 간 일관성 점수 계산)
+    seed         기준 시드 (샘플 i는 seed + i로 생성)
+    answer_pattern  일관성 비교용 답 추출 정규식 (기본값: 마지막 숫자, 없으면 첫 줄)
+    turns        prompt 대신 순서대로 보낼 프롬프트 목록 (앞 턴이 끝난 뒤 다음 턴 전송)
+
+id를 생략하면 "파일 이름:줄 번호"를 쓰지만, 샤드 배정과 이어서 실행이 ID 기준이므로 케이스를 자주 고치는 파일은 id를 적어 두세요.
+
+실행 기록 (.runs/<실행 ID>.jsonl, 덧붙이기 전용):
+    첫 줄은 실행 정보 {"type": "run", "run_id", "suite", "cases", "shard", "samples", "seed", "temperatures", "started_at"},
+    이후 케이스가 끝날 때마다 결과 한 줄, 실행이 끝나면 여러 샘플 케이스의 일관성 점수 {"type": "consistency", ...}.
+    --resume <실행 ID>로 같은 파일에 이어서 기록하며
+    이미 성공한 (케이스, 샘플)은 건너뛰고 실패했거나 끝나지 않은 것만 다시 실행합니다.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import requests
+
+try:
+    import yaml
+except ImportError:  # 선택 의존성 (YAML 케이스 파일용)
+    yaml = None
+
+from .consistency import add_consistency_arguments, print_consistency, sample_options, score_journals
+from .eval_runner import EvalRunner
+from .ollama_client import OllamaClient, OllamaError
+
+DEFAULT_RUN_DIR = Path(__file__).resolve().parent.parent / ".runs"
+DEFAULT_TEMPERATURE = 0.7
+
+Case = Dict[str, Any]
+Task = Tuple[Case, int]  # (케이스, 샘플 번호)
+# generate_response(prompt, temperature=..., client=..., sample=..., seed=...) -> 결과 dict
+GenerateFn = Callable[..., Dict[str, Any]]
+
+
+def load_cases(paths: Iterable[Path]) -> Iterator[Case]:
+    """케이스 파일에서 케이스를 하나씩 읽음 (JSONL은 한 줄씩, YAML은 파일 단위로 읽음)"""
+    for path in map(Path, paths):
+        if path.suffix.lower() in (".yaml", ".yml"):
+            yield from _load_yaml(path)
+        else:
+            yield from _load_jsonl(path)
+
+
+def _load_jsonl(path: Path) -> Iterator[Case]:
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                case = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: 잘못된 JSON ({e})") from None
+            yield _normalize(case, path, lineno)
+
+
+def _load_yaml(path: Path) -> Iterator[Case]:
+    if yaml is None:
+        raise RuntimeError(f"YAML 케이스 파일을 읽으려면 PyYAML이 필요합니다: pip install pyyaml ({path})")
+    with open(path, encoding="utf-8") as f:
+        data = yaml.safe_load(f) or []
+    if isinstance(data, dict):
+        data = data.get("cases", [])
+    for position, case in enumerate(data, 1):
+        yield _normalize(case, path, position)
+
+
+def _normalize(case: Case, path: Path, position: int) -> Case:
+    if "prompt" not in case and "turns" not in case:
+        raise ValueError(f"{path}:{position}: prompt 또는 turns가 필요합니다")
+    case.setdefault("id", f"{path.stem}:{position}")
+    case.setdefault("category", path.stem)
+    case.setdefault("name", case["id"])
+    return case
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """--shard 값 파싱 ('2/4' → (2, 4), 샤드 번호는 1부터)"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"샤드는 i/N 형식이어야 합니다: {value}") from None
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"샤드 번호는 1부터 {count}까지입니다: {value}")
+    return index, count
+
+
+def shard_of(case_id: str, count: int) -> int:
+    """케이스 ID 해시로 정한 샤드 번호 (파일 순서나 케이스 추가/삭제와 관계없이 같은 케이스는 같은 샤드)"""
+    digest = hashlib.sha256(case_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(cases: Iterable[Case], shard: Optional[Tuple[int, int]]) -> Iterator[Case]:
+    """shard=(i, N)에 배정된 케이스만 반환 (None이면 전체)"""
+    for case in cases:
+        if shard is None or shard_of(case["id"], shard[1]) == shard[0]:
+            yield case
+
+
+def iter_tasks(cases: Iterable[Case], done: Optional[Set[Tuple[str, int]]] = None) -> Iterator[Task]:
+    """케이스를 실행 단위로 펼침 (samples가 있으면 샘플마다 하나, done에 있는 (ID, 샘플)은 제외)"""
+    for case in cases:
+        for sample in range(case.get("samples", 1)):
+            if done is None or (case["id"], sample) not in done:
+                yield case, sample
+
+
+def run_task(generate: GenerateFn, task: Task, client: OllamaClient) -> Dict[str, Any]:
+    """케이스 하나 실행 (turns가 있으면 순서대로 보내고 턴별 결과를 묶어 반환)"""
+    case, sample = task
+    options = sample_options(sample, case.get("temperature", DEFAULT_TEMPERATURE), case.get("seed"))
+    if "turns" not in case:
+        return _generate_safely(generate, case["prompt"], options, client, sample)
+    turns = [_generate_safely(generate, prompt, options, client, sample) for prompt in case["turns"]]
+    return {
+        "success": all(turn["success"] for turn in turns),
+        "turns": turns,
+        "elapsed_time": sum(turn["elapsed_time"] for turn in turns),
+    }
+
+
+def _generate_safely(generate: GenerateFn, prompt: str, options: Dict[str, Any],
+                     client: OllamaClient, sample: int) -> Dict[str, Any]:
+    """타임아웃/연결 오류도 실패 결과로 바꿈 (케이스 하나의 오류로 실행 전체가 끝나지 않도록)"""
+    start_time = time.time()
+    try:
+        return generate(prompt, temperature=options["temperature"], client=client, sample=sample,
+                        seed=options.get("seed"))
+    except (requests.RequestException, OllamaError) as e:
+        return {"success": False, "error": f"{type(e).__name__}: {e}", "elapsed_time": time.time() - start_time}
+
+
+class ResultWriter:
+    """결과를 한 줄씩 덧붙이는 JSONL 파일 (줄마다 flush하므로 중간에 종료돼도 끝난 결과는 남음)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        torn = self.path.exists() and self.path.stat().st_size > 0 and not _ends_with_newline(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if torn:
+            self._file.write("\n")  # 쓰다가 끊긴 마지막 줄은 읽을 때 건너뛰고 새 줄부터 기록
+        self.count = 0
+
+    def write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, 2)
+        return f.read(1) == b"\n"
+
+
+def read_journal(path: Path) -> Tuple[Dict[str, Any], Set[Tuple[str, int]]]:
+    """
+    실행 기록 읽기
+
+    Returns:
+        (실행 정보, 성공한 (케이스 ID, 샘플 번호) 집합)
+    """
+    header: Dict[str, Any] = {}
+    done: Set[Tuple[str, int]] = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 쓰다가 끊긴 줄
+            if record.get("type") == "run":
+                header = header or record
+            elif record.get("success"):
+                done.add((record["id"], record.get("sample", 0)))
+    return header, done
+
+
+def parse_run(value: str) -> Path:
+    """--resume 값 파싱 (실행 ID 또는 실행 기록 경로)"""
+    path = Path(value)
+    if not path.is_file():
+        path = DEFAULT_RUN_DIR / f"{value}.jsonl"
+    if not path.is_file():
+        raise argparse.ArgumentTypeError(f"실행 기록이 없습니다: {value} ({DEFAULT_RUN_DIR})")
+    return path
+
+
+def make_record(case: Case, sample: int, result: Dict[str, Any]) -> Dict[str, Any]:
+    """결과 파일에 기록할 한 줄"""
+    record = {"id": case["id"], "category": case["category"], "name": case["name"], "sample": sample}
+    if case.get("samples", 1) > 1:
+        record["samples"] = case["samples"]
+        record.update(sample_options(sample, case.get("temperature", DEFAULT_TEMPERATURE), case.get("seed")))
+    for key in ("prompt", "expected", "analysis", "answer_pattern"):
+        if key in case:
+            record[key] = case[key]
+    record.update(result)
+    if "turns" in case:
+        record["turns"] = [{"prompt": prompt, **turn} for prompt, turn in zip(case["turns"], result["turns"])]
+    record["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    return record
+
+
+def print_section(title: str):
+    """섹션 헤더 출력"""
+    print("\n" + "="*80)
+    print(f"  {title}")
+    print("="*80 + "\n")
+
+
+def print_test_result(test_name: str, prompt: str, result: dict, analysis: str = ""):
+    """테스트 결과 출력"""
+    print(f"📝 테스트: {test_name}")
+    print(f"   질문: {prompt}")
+    cached_mark = " (캐시)" if result.get('cached') else ""
+    print(f"   응답 시간: {result['elapsed_time']:.2f}초{cached_mark}")
+    if result.get('sources') is not None:
+        print(f"   📚 참고 문서: {', '.join(dict.fromkeys(Path(s).name for s in result['sources'])) or '없음'}")
+
+    if result['success']:
+        print(f"\n   응답:")
+        print(f"   {'-'*70}")
+        # 응답을 줄바꿈하여 출력
+        response_lines = result['response'].strip().split('\n')
+        for line in response_lines:
+            print(f"   {line}")
+        print(f"   {'-'*70}")
+
+        if analysis:
+            print(f"\n   분석: {analysis}")
+    else:
+        print(f"   ❌ 오류: {result['error']}")
+
+    print()
+
+
+def print_case_result(case: Case, sample: int, result: Dict[str, Any]):
+    """케이스 결과 출력 (기대 답변, 샘플 번호, 멀티턴 포함)"""
+    analysis = case.get("analysis", "")
+    if case.get("expected"):
+        analysis = f"{analysis} (기대: {case['expected']})"
+    name = case["name"] + (f" (시도 {sample + 1})" if case.get("samples", 1) > 1 else "")
+
+    if "turns" not in case:
+        print_test_result(name, case["prompt"], result, analysis)
+        return
+    print(f"📝 테스트: {name}")
+    for i, (prompt, turn) in enumerate(zip(case["turns"], result["turns"]), 1):
+        print(f"   질문 {i}: {prompt}")
+        if turn["success"]:
+            print(f"   응답 {i}: {turn['response'].strip()[:200]}...")
+            print(f"   응답 시간: {turn['elapsed_time']:.2f}초\n")
+        else:
+            print(f"   ❌ 오류: {turn['error']}\n")
+    if analysis:
+        print(f"   분석: {analysis}\n")
+
+
+class EvalHarness:
+    """케이스 로딩 + 샤드 선택 + 결과 스트리밍 기록 + 중단된 실행 이어서 하기"""
+
+    def __init__(self, suite: str, case_paths: List[Path], output: Optional[Path] = None,
+                 shard: Optional[Tuple[int, int]] = None, titles: Optional[Dict[str, str]] = None,
+                 quiet: bool = False, resume: Optional[Path] = None, samples: Optional[int] = None,
+                 seed: Optional[int] = None, temperatures: Optional[List[float]] = None,
+                 vectors: str = "ngram"):
+        """
+        Args:
+            suite: 스위트 이름 (실행 ID에 사용)
+            case_paths: 케이스 파일 목록
+            output: 실행 기록 경로 (기본값: .runs/<스위트>-<시각>[-shard-i-of-N].jsonl)
+            shard: (i, N)이면 N개로 나눈 케이스 중 i번째만 실행
+            titles: 카테고리별 섹션 제목 (없는 카테고리는 이름 그대로)
+            quiet: 응답 본문 대신 진행 상황만 출력
+            resume: 이어서 실행할 실행 기록 (처음 실행의 케이스 파일, 샤드, 샘플 설정을 그대로 사용)
+            samples: 여러 샘플을 생성하는 케이스의 샘플 수 (None이면 케이스 설정)
+            seed: 시드가 없는 케이스의 기준 시드
+            temperatures: 여러 샘플을 생성하는 케이스의 샘플별 온도 (None이면 케이스 설정)
+            vectors: 일관성 유사도에 쓸 벡터 ("ngram" 또는 "embed")
+        """
+        self.suite = suite
+        self.titles = titles or {}
+        self.quiet = quiet
+        self.vectors = vectors
+        self.consistency: List[Dict[str, Any]] = []
+        self.done: Set[Tuple[str, int]] = set()  # 이전 실행에서 성공한 (케이스 ID, 샘플)
+        if resume is not None:
+            header, self.done = read_journal(resume)
+            if header.get("suite", suite) != suite:
+                raise ValueError(f"다른 스위트의 실행 기록입니다: {header['suite']} ({resume})")
+            case_paths = [Path(p) for p in header.get("cases", case_paths)]
+            shard = tuple(header["shard"]) if header.get("shard") else None
+            samples, seed, temperatures = header.get("samples"), header.get("seed"), header.get("temperatures")
+            output = resume
+        elif output is None:
+            name = f"{suite}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            if shard is not None:
+                name += f"-shard-{shard[0]}-of-{shard[1]}"
+            output = DEFAULT_RUN_DIR / f"{name}.jsonl"
+        elif Path(output).exists() and Path(output).stat().st_size > 0:
+            raise ValueError(f"이미 있는 실행 기록입니다 (이어서 실행하려면 --resume {output}): {output}")
+        self.case_paths = list(case_paths)
+        self.shard = shard
+        self.samples = samples
+        self.seed = seed
+        self.temperatures = temperatures
+        self.run_id = Path(output).stem
+        self.writer = ResultWriter(output)
+        self.writer.write({
+            "type": "resume" if resume is not None else "run", "run_id": self.run_id, "suite": suite,
+            "cases": [str(p) for p in self.case_paths], "shard": list(shard) if shard else None,
+            "samples": samples, "seed": seed, "temperatures": temperatures,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        self.counts: Dict[str, int] = {}  # 카테고리별 완료 수 (결과 본문은 메모리에 남기지 않음)
+        self.completed = 0
+        self.failures = 0
+
+    def cases(self) -> Iterator[Case]:
+        """이 샤드에서 실행할 케이스 (지연 로딩, 샘플/시드/온도 설정 적용)"""
+        for case in select_shard(load_cases(self.case_paths), self.shard):
+            if case.get("samples", 1) > 1:
+                if self.samples is not None:
+                    case["samples"] = self.samples
+                if self.temperatures is not None:
+                    case["temperature"] = self.temperatures
+            if self.seed is not None:
+                case.setdefault("seed", self.seed)
+            yield case
+
+    def run(self, runner: EvalRunner, generate: GenerateFn) -> Dict[str, int]:
+        """
+        케이스를 동시에 실행하고 끝나는 대로 출력/기록
+
+        Returns:
+            카테고리별 완료 수
+        """
+        current = None
+        tasks = iter_tasks(self.cases(), self.done)
+        for (case, sample), result in runner.imap(lambda task, client: run_task(generate, task, client), tasks):
+            if case["category"] != current and not self.quiet:
+                print_section(self.titles.get(case["category"], case["category"]))
+            current = case["category"]
+            self.writer.write(make_record(case, sample, result))
+            self.counts[current] = self.counts.get(current, 0) + 1
+            self.completed += 1
+            self.failures += not result["success"]
+            if self.quiet:
+                print(f"\r⏳ 완료 {self.completed}개 (실패 {self.failures}개) · {current}", end="", file=sys.stderr)
+            else:
+                print_case_result(case, sample, result)
+        if self.quiet:
+            print(file=sys.stderr)
+        # 여러 샘플을 생성한 케이스는 실행 기록 전체(이어서 실행한 경우 이전 결과 포함)로 일관성 계산
+        self.consistency = score_journals([self.writer.path], vectors=self.vectors)
+        for record in self.consistency:
+            self.writer.write(record)
+        return self.counts
+
+    def print_summary(self):
+        """실행 기록 요약 출력"""
+        shard = f" (샤드 {self.shard[0]}/{self.shard[1]})" if self.shard else ""
+        skipped = f", 이전 실행에서 완료 {len(self.done)}개 건너뜀" if self.done else ""
+        print_consistency(self.consistency)
+        print(f"\n💾 결과 {self.completed}개{shard} (실패 {self.failures}개{skipped}): {self.writer.path}")
+        if self.failures:
+            print(f"   🔁 실패한 케이스만 다시 실행: --resume {self.resume_target}")
+
+    @property
+    def resume_target(self) -> str:
+        """--resume에 넘길 값 (.runs/ 밖의 실행 기록은 경로, parse_run은 실행 ID를 .runs/에서만 찾음)"""
+        path = self.writer.path.resolve()
+        return self.run_id if path.parent == DEFAULT_RUN_DIR and path.suffix == ".jsonl" else str(path)
+
+    def print_interrupted(self):
+        """중단됐을 때 저장된 결과와 이어서 실행하는 방법 출력"""
+        print(f"💾 끝난 결과 {self.completed}개는 저장됨: {self.writer.path}")
+        print(f"   🔁 이어서 실행: --resume {self.resume_target}")
+
+    def close(self):
+        self.writer.close()
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace, suite: str,
+                  titles: Optional[Dict[str, str]] = None) -> "EvalHarness":
+        """add_harness_arguments로 파싱한 인자로 하네스 생성"""
+        return cls(suite, args.cases, output=args.output, shard=args.shard, titles=titles, quiet=args.quiet,
+                   resume=args.resume, samples=args.samples, seed=args.seed, temperatures=args.temperatures,
+                   vectors=args.consistency_vectors)
+
+
+def add_harness_arguments(parser: argparse.ArgumentParser, default_cases: List[Path]):
+    """케이스 파일/샤드/결과 파일 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--cases", type=Path, nargs="+", default=default_cases,
+        help="케이스 파일 (.jsonl, .yaml) 목록 (기본값: " + ", ".join(p.name for p in default_cases) + ")"
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, default=None, metavar="I/N",
+        help="케이스를 N개로 나눠 i번째만 실행 (여러 머신에서 나눠 실행, 예: 2/4)"
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--output", type=Path, default=None,
+        help=f"실행 기록 경로 (기본값: {DEFAULT_RUN_DIR}/<스위트>-<시각>.jsonl, 파일 이름이 실행 ID)"
+    )
+    group.add_argument(
+        "--resume", type=parse_run, default=None, metavar="RUN_ID",
+        help="중단된 실행을 이어서 실행 (성공한 케이스는 건너뛰고 실패/미완료만 다시 실행, 실행 ID 또는 경로)"
+    )
+    parser.add_argument(
+        "--quiet", action="store_true",
+        help="응답 본문을 출력하지 않고 진행 상황만 표시 (케이스가 많을 때)"
+    )
+    add_consistency_arguments(parser)
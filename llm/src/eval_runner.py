@@ -0,0 +1,169 @@
+"""
+평가 스크립트용 동시 실행 러너
+여러 테스트 케이스를 하나 이상의 Ollama 백엔드로 동시에 보냅니다.
+"""
+
+import argparse
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from .backend_pool import BackendPool
+from .ollama_client import OllamaClient, get_client
+from .scheduler import BATCH, RequestScheduler
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class EvalRunner:
+    """동시 실행 수를 제한하는 스레드 풀 러너"""
+
+    def __init__(self, concurrency: int = 1, backends: Optional[List[str]] = None,
+                 scheduler: Optional[RequestScheduler] = None, priority: str = BATCH):
+        """
+        Args:
+            concurrency: 동시에 보낼 요청 수
+            backends: Ollama 서버 주소 목록 (None이면 공유 클라이언트 사용)
+            scheduler: backends로 만든 클라이언트가 요청 전에 슬롯을 받을 스케줄러
+            priority: backends로 만든 클라이언트의 요청 우선순위
+        """
+        self.concurrency = max(1, concurrency)
+        if len(backends or ()) > 1:
+            # 진행 중인 요청이 가장 적고 모델이 로드된 서버로 분산 (장애 서버는 제외)
+            self.clients = [OllamaClient(pool=BackendPool(backends), pool_size=self.concurrency,
+                                         scheduler=scheduler, priority=priority)]
+        elif backends:
+            self.clients = [OllamaClient(base_url=backends[0], pool_size=self.concurrency,
+                                         scheduler=scheduler, priority=priority)]
+        else:
+            self.clients = [get_client()]
+        # 직접 만든 클라이언트만 close에서 닫는다 (공유 클라이언트는 다른 코드도 씀)
+        self._owned_clients = list(self.clients) if backends else []
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self._client_cycle = itertools.cycle(self.clients)
+        self._lock = threading.Lock()
+
+        self.task_count = 0
+        self.wall_time = 0.0   # 실제 경과 시간
+        self.busy_time = 0.0   # 각 요청 소요 시간의 합 (순차 실행 시 예상 시간)
+
+    def _run_timed(self, fn: Callable[[T, OllamaClient], R], item: T, client: OllamaClient) -> R:
+        start = time.time()
+        try:
+            return fn(item, client)
+        finally:
+            elapsed = time.time() - start
+            with self._lock:
+                self.task_count += 1
+                self.busy_time += elapsed
+
+    def map(self, fn: Callable[[T, OllamaClient], R], items: Iterable[T]) -> List[R]:
+        """
+        fn(item, client)를 동시에 실행하고 입력 순서대로 결과 반환
+
+        Args:
+            fn: 테스트 케이스와 사용할 클라이언트를 받는 함수
+            items: 테스트 케이스 목록
+        """
+        start = time.time()
+        futures = [
+            self._executor.submit(self._run_timed, fn, item, next(self._client_cycle))
+            for item in items
+        ]
+        results = [future.result() for future in futures]
+        self.wall_time += time.time() - start
+        return results
+
+    def imap(self, fn: Callable[[T, OllamaClient], R], items: Iterable[T],
+             window: Optional[int] = None) -> Iterator[Tuple[T, R]]:
+        """
+        fn(item, client)를 동시에 실행하고 (item, 결과)를 입력 순서대로 하나씩 반환
+
+        map과 달리 items를 window개까지만 앞서 제출하므로, 케이스가 수만 개여도
+        케이스와 결과를 한꺼번에 메모리에 두지 않는다.
+
+        Args:
+            fn: 테스트 케이스와 사용할 클라이언트를 받는 함수
+            items: 테스트 케이스 (지연 로딩 이터레이터 가능)
+            window: 앞서 제출할 최대 개수 (기본값: 동시 실행 수 × 2)
+        """
+        window = window or self.concurrency * 2
+        start = time.time()
+        pending: Deque[Tuple[T, Future]] = deque()
+        try:
+            for item in items:
+                pending.append((item, self._executor.submit(self._run_timed, fn, item, next(self._client_cycle))))
+                if len(pending) >= window:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+        finally:
+            # 중간에 멈추면 아직 시작하지 않은 요청은 취소
+            for _, future in pending:
+                future.cancel()
+            self.wall_time += time.time() - start
+
+    def summary(self) -> Dict[str, Any]:
+        """실행 요약 (순차 실행 대비 속도 향상 포함)"""
+        speedup = self.busy_time / self.wall_time if self.wall_time > 0 else 1.0
+        return {
+            "concurrency": self.concurrency,
+            "backends": [url for client in self.clients for url in client.urls],
+            "tasks": self.task_count,
+            "wall_time": self.wall_time,
+            "sequential_time": self.busy_time,
+            "speedup": speedup,
+        }
+
+    def print_summary(self):
+        """실행 요약 출력"""
+        summary = self.summary()
+        print(f"\n⚡ 동시 실행 요약:")
+        print(f"   - 동시 실행 수: {summary['concurrency']} (백엔드 {len(summary['backends'])}개)")
+        print(f"   - 요청 수: {summary['tasks']}개")
+        print(f"   - 실제 소요 시간: {summary['wall_time']:.2f}초")
+        print(f"   - 요청 시간 합계 (순차 실행 기준): {summary['sequential_time']:.2f}초")
+        print(f"   - 속도 향상: {summary['speedup']:.2f}배")
+
+    def close(self, cancel: bool = False):
+        """
+        스레드 풀과 러너가 만든 클라이언트 정리 (백엔드 풀의 상태 확인 스레드도 멈춤)
+
+        Args:
+            cancel: Ctrl+C로 중단한 경우 True. 진행 중인 요청을 기다리지 않고 대기 중인 요청은 취소한다.
+        """
+        self._executor.shutdown(wait=not cancel, cancel_futures=cancel)
+        for client in self._owned_clients:
+            client.close()
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "EvalRunner":
+        """
+        add_runner_arguments로 파싱한 인자로 러너 생성
+
+        --backends로 만드는 클라이언트도 configure_scheduler가 공유 클라이언트에 설정한
+        스케줄러와 우선순위를 그대로 쓴다.
+        """
+        backends = [url.strip() for url in args.backends.split(",")] if args.backends else None
+        shared = get_client()
+        return cls(concurrency=args.concurrency, backends=backends,
+                   scheduler=shared.scheduler, priority=shared.priority)
+
+
+def add_runner_arguments(parser: argparse.ArgumentParser):
+    """동시 실행 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--concurrency", type=int, default=1,
+        help="동시에 보낼 요청 수 (서버의 OLLAMA_NUM_PARALLEL에 맞추세요, 기본값: 1)"
+    )
+    parser.add_argument(
+        "--backends", default=None,
+        help="쉼표로 구분한 Ollama 서버 주소 목록 (기본값: OLLAMA_URL)"
+    )
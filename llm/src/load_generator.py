@@ -0,0 +1,224 @@
+"""
+동시 사용자 부하 생성기
+동시 사용자 수(또는 도착률)를 단계별로 올리며 처리량, TTFT, 오류율과 포화 지점을 측정합니다.
+
+사용법:
+    # closed-loop: 사용자 N명이 응답을 받고 think time 후 다음 질문
+    python -m src.load_generator --levels 1,2,4,8 --duration 60 --think-time 2
+
+    # open-loop: 초당 도착률(λ)을 단계별로 올림 (응답 속도와 무관하게 요청 발생)
+    python -m src.load_generator --mode open --levels 0.2,0.5,1,2 --duration 60
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from .benchmark import load_prompts, measure_stream, percentile
+from .metrics import add_metrics_arguments, configure_metrics
+from .ollama_client import OLLAMA_URL, OllamaClient
+
+
+class LoadResult:
+    """한 단계(동시 사용자 수 또는 도착률)의 측정 결과"""
+
+    def __init__(self, level: float):
+        self.level = level
+        self.samples: List[Dict[str, Any]] = []
+        self.errors = 0
+        self.timeouts = 0
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, sample: Optional[Dict[str, Any]] = None, error: bool = False, timeout: bool = False):
+        with self._lock:
+            if sample is not None:
+                self.samples.append(sample)
+            self.errors += int(error)
+            self.timeouts += int(timeout)
+
+    def summary(self) -> Dict[str, Any]:
+        """단계 요약"""
+        total = len(self.samples) + self.errors + self.timeouts
+        ttfts = [s["ttft"] for s in self.samples if s["ttft"] is not None]
+        tokens = sum(s["eval_count"] or 0 for s in self.samples)
+        return {
+            "level": self.level,
+            "requests": total,
+            "completed": len(self.samples),
+            "tokens_per_sec": tokens / self.wall_time if self.wall_time > 0 else 0.0,
+            "requests_per_sec": len(self.samples) / self.wall_time if self.wall_time > 0 else 0.0,
+            "ttft_p50": percentile(ttfts, 50),
+            "ttft_p90": percentile(ttfts, 90),
+            "ttft_p99": percentile(ttfts, 99),
+            "latency_p90": percentile([s["total_time"] for s in self.samples], 90),
+            "error_rate": self.errors / total if total else 0.0,
+            "timeout_rate": self.timeouts / total if total else 0.0,
+        }
+
+
+class LoadGenerator:
+    """closed-loop / open-loop 부하 생성"""
+
+    def __init__(self, client: OllamaClient, prompts: List[str], options: Dict[str, Any],
+                 think_time: float = 2.0, seed: int = 42):
+        self.client = client
+        self.prompts = prompts
+        self.options = options
+        self.think_time = think_time
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _random(self, fn, *args):
+        with self._rng_lock:
+            return fn(*args)
+
+    def _send(self, result: LoadResult):
+        prompt = self._random(self.rng.choice, self.prompts)
+        try:
+            result.record(sample=measure_stream(self.client, prompt, self.options))
+        except requests.Timeout:
+            result.record(timeout=True)
+        except Exception:
+            result.record(error=True)
+
+    def run_closed(self, users: int, duration: float) -> LoadResult:
+        """사용자 users명이 요청 → 응답 → think time을 반복"""
+        result = LoadResult(users)
+        deadline = time.perf_counter() + duration
+
+        def user_loop():
+            while time.perf_counter() < deadline:
+                self._send(result)
+                think = self._random(self.rng.expovariate, 1 / self.think_time) if self.think_time > 0 else 0
+                time.sleep(max(0.0, min(think, deadline - time.perf_counter())))
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=user_loop) for _ in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result.wall_time = time.perf_counter() - start
+        return result
+
+    def run_open(self, rate: float, duration: float, max_in_flight: int = 256) -> LoadResult:
+        """초당 rate건의 포아송 도착 (이전 응답을 기다리지 않음)"""
+        result = LoadResult(rate)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            next_arrival = start
+            while True:
+                next_arrival += self._random(self.rng.expovariate, rate)
+                if next_arrival - start >= duration:
+                    break
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+                executor.submit(self._send, result)
+        result.wall_time = time.perf_counter() - start
+        return result
+
+
+def find_saturation(summaries: List[Dict[str, Any]], min_gain: float = 0.1,
+                    max_error_rate: float = 0.05) -> Optional[float]:
+    """
+    포화 지점 탐지
+
+    다음 단계로 올려도 처리량(tokens/sec)이 min_gain 미만으로 늘거나
+    오류율이 max_error_rate를 넘기 직전 단계를 포화 지점으로 본다.
+    """
+    for previous, current in zip(summaries, summaries[1:]):
+        failed = current["error_rate"] + current["timeout_rate"] > max_error_rate
+        base = previous["tokens_per_sec"]
+        gain = (current["tokens_per_sec"] - base) / base if base > 0 else float("inf")
+        if failed or gain < min_gain:
+            return previous["level"]
+    return None
+
+
+def _fmt(value: Optional[float], digits: int = 2) -> str:
+    return f"{value:.{digits}f}" if value is not None else "N/A"
+
+
+def print_table(summaries: List[Dict[str, Any]], mode: str):
+    """단계별 결과 표 출력"""
+    level_name = "사용자" if mode == "closed" else "도착률/s"
+    print(f"\n{'='*96}")
+    print(f"{level_name:>8}{'요청':>8}{'tok/s':>10}{'req/s':>8}{'TTFT p50':>10}{'TTFT p90':>10}"
+          f"{'TTFT p99':>10}{'지연 p90':>10}{'오류':>8}{'타임아웃':>9}")
+    print(f"{'─'*96}")
+    for s in summaries:
+        print(f"{s['level']:>8g}{s['requests']:>8}{_fmt(s['tokens_per_sec']):>10}{_fmt(s['requests_per_sec']):>8}"
+              f"{_fmt(s['ttft_p50']):>10}{_fmt(s['ttft_p90']):>10}{_fmt(s['ttft_p99']):>10}"
+              f"{_fmt(s['latency_p90']):>10}{s['error_rate'] * 100:>7.1f}%{s['timeout_rate'] * 100:>8.1f}%")
+    print(f"{'='*96}")
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="Ollama 동시 사용자 부하 생성기")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed",
+                        help="closed: 사용자 수 고정, open: 도착률 고정 (기본값: closed)")
+    parser.add_argument("--levels", default="1,2,4,8",
+                        help="쉼표로 구분한 단계 (closed: 사용자 수, open: 초당 요청 수)")
+    parser.add_argument("--duration", type=float, default=60, help="단계별 측정 시간 초 (기본값: 60)")
+    parser.add_argument("--think-time", type=float, default=2.0,
+                        help="closed-loop 평균 think time 초 (지수 분포, 기본값: 2)")
+    parser.add_argument("--timeout", type=float, default=120, help="요청 타임아웃 초 (기본값: 120)")
+    parser.add_argument("--prompts", type=Path, default=None, help="프롬프트 파일 (.txt 또는 .jsonl)")
+    parser.add_argument("--max-tokens", type=int, default=128, help="최대 생성 토큰 수 (기본값: 128)")
+    parser.add_argument("--seed", type=int, default=42, help="프롬프트 선택/도착 간격 시드")
+    parser.add_argument("--url", default=OLLAMA_URL, help="Ollama 서버 주소")
+    parser.add_argument("--json", type=Path, default=None, help="결과 JSON 파일")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics(args, call_site="load_generator")
+
+    levels = [float(level) for level in args.levels.split(",")]
+    max_in_flight = 256
+    client = OllamaClient(base_url=args.url, timeout=args.timeout,
+                          pool_size=max(1, int(max(levels))) if args.mode == "closed" else max_in_flight)
+    prompts = load_prompts(args.prompts)
+    generator = LoadGenerator(client, prompts, {"num_predict": args.max_tokens},
+                              think_time=args.think_time, seed=args.seed)
+
+    print(f"\n🚦 부하 테스트: {client.model} @ {client.base_url} ({args.mode}-loop)")
+    summaries = []
+    for level in levels:
+        label = f"사용자 {int(level)}명" if args.mode == "closed" else f"초당 {level:g}건"
+        print(f"  ▶ {label} · {args.duration:.0f}초 측정 중...")
+        if args.mode == "closed":
+            result = generator.run_closed(int(level), args.duration)
+        else:
+            result = generator.run_open(level, args.duration, max_in_flight)
+        summaries.append(result.summary())
+
+    print_table(summaries, args.mode)
+    saturation = find_saturation(summaries)
+    if saturation is not None:
+        print(f"📈 포화 지점: {saturation:g} (이후 단계에서 처리량이 거의 늘지 않거나 오류 증가)")
+    else:
+        print("📈 포화 지점: 측정 범위 안에서 발견되지 않음 (더 높은 단계로 측정하세요)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "mode": args.mode,
+                "model": client.model,
+                "host": client.base_url,
+                "duration": args.duration,
+                "think_time": args.think_time,
+                "levels": summaries,
+                "saturation": saturation,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 JSON 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+스트리밍 마크다운 렌더러
+완성된 블록(문단, 코드 블록, 목록, 제목)은 한 번만 파싱/렌더링해서 캐시하고,
+아직 열려 있는 마지막 블록만 프레임마다 다시 그립니다.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from rich.console import Console, ConsoleOptions, RenderResult
+from rich.markdown import Markdown
+from rich.segment import Segment
+
+FENCE_PATTERN = re.compile(r"^\s{0,3}(`{3,}|~{3,})")
+
+
+class StreamingMarkdown:
+    """블록 단위 캐시를 가진 스트리밍 마크다운 renderable"""
+
+    def __init__(self, code_theme: str = "monokai"):
+        self.code_theme = code_theme
+
+        self._seen = 0                  # update()로 받은 텍스트 중 처리한 길이
+        self._pending = ""              # 아직 줄바꿈이 오지 않은 마지막 줄
+        self._current: List[str] = []   # 열려 있는 블록의 완성된 줄
+        self._fence: Optional[str] = None  # 코드 블록 안이면 여는 펜스 (``` 또는 ~~~)
+        self._blocks: List[str] = []    # 완성된 블록 소스
+
+        self._cache: Dict[int, List[List[Segment]]] = {}
+        self._cache_width: Optional[int] = None
+
+    def update(self, text: str) -> "StreamingMarkdown":
+        """누적 텍스트를 받아 새로 추가된 부분만 블록으로 나눔"""
+        data = self._pending + text[self._seen:]
+        self._seen = len(text)
+        lines = data.split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._feed_line(line)
+        return self
+
+    def _finish_block(self):
+        if self._current:
+            self._blocks.append("\n".join(self._current))
+        self._current = []
+        self._fence = None
+
+    def _feed_line(self, line: str):
+        stripped = line.strip()
+
+        if self._fence:
+            self._current.append(line)
+            # 여는 펜스와 같은 문자로, 같거나 더 길게 닫아야 코드 블록이 끝난다
+            fence_char = self._fence[0]
+            if stripped.startswith(self._fence) and set(stripped) == {fence_char}:
+                self._finish_block()
+            return
+
+        fence = FENCE_PATTERN.match(line)
+        if fence:
+            self._finish_block()
+            self._fence = fence.group(1)
+            self._current.append(line)
+        elif not stripped:
+            self._finish_block()
+        elif stripped.startswith("#"):
+            # 제목은 한 줄로 끝나는 블록
+            self._finish_block()
+            self._current.append(line)
+            self._finish_block()
+        else:
+            self._current.append(line)
+
+    @property
+    def open_source(self) -> str:
+        """아직 완성되지 않은 마지막 블록"""
+        return "\n".join(self._current + [self._pending])
+
+    def _render_source(self, source: str, console: Console, options: ConsoleOptions) -> List[List[Segment]]:
+        lines = console.render_lines(Markdown(source, code_theme=self.code_theme), options, pad=False)
+        # 블록 사이 간격은 직접 넣으므로 앞뒤의 빈 줄은 제거 (코드 블록의 배경 여백 줄은 유지)
+        while lines and not any(segment.text for segment in lines[0]):
+            lines.pop(0)
+        while lines and not any(segment.text for segment in lines[-1]):
+            lines.pop()
+        return lines
+
+    def _render_block(self, index: int, console: Console, options: ConsoleOptions) -> List[List[Segment]]:
+        lines = self._cache.get(index)
+        if lines is None:
+            lines = self._render_source(self._blocks[index], console, options)
+            self._cache[index] = lines
+        return lines
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        if options.max_width != self._cache_width:
+            # 폭이 바뀌면 줄바꿈 위치가 달라지므로 캐시를 비운다
+            self._cache.clear()
+            self._cache_width = options.max_width
+
+        blocks = [self._render_block(index, console, options) for index in range(len(self._blocks))]
+        open_source = self.open_source
+        if open_source.strip():
+            # 마지막 열린 블록만 매 프레임 다시 렌더링
+            blocks.append(self._render_source(open_source, console, options))
+
+        new_line = Segment.line()
+        for index, lines in enumerate(block for block in blocks if block):
+            if index:
+                yield new_line  # 블록 사이 빈 줄
+            for line in lines:
+                yield from line
+                yield new_line
@@ -0,0 +1,295 @@
+"""
+Prometheus 형식 지표
+공용 요청 경로(OllamaClient)의 단계별 시간, 토큰 수, 오류를 모델/호출 위치별 카운터와 히스토그램으로 기록합니다.
+
+사용법:
+    python src/chat_ui.py --metrics-port 9464          # http://127.0.0.1:9464/metrics
+    python tests/phase2_cot_test.py --metrics-json metrics.json
+"""
+
+import argparse
+import atexit
+import json
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LABELS = ("model", "call_site")
+
+# 초 단위 히스토그램 버킷 (프리필/생성은 수십 초, 콜드 스타트는 분 단위까지)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_call_site = "default"
+
+
+def set_call_site(name: str):
+    """이 프로세스의 요청에 붙일 call_site 라벨 (예: chat_ui, phase2_cot)"""
+    global _call_site
+    _call_site = name
+
+
+def get_call_site() -> str:
+    return _call_site
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """라벨별 누적 카운터"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = LABELS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, key)} {value:g}"
+                    for key, value in sorted(self._values.items())]
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": dict(zip(self.labels, key)), "value": value}
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """라벨별 현재 값 (큐 길이, 진행 중 요청 수 등)"""
+
+    kind = "gauge"
+
+    def set(self, *label_values: str, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """라벨별 누적 버킷 히스토그램"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labels: Sequence[str] = LABELS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 → [버킷별 개수..., +Inf 개수], 합계
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(label_values)
+            if counts is None:
+                counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._sums[label_values] = self._sums.get(label_values, 0.0) + value
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            return sum(self._counts.get(label_values, []))
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _format_labels(self.labels, key, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {self._sums[key]:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{
+                "labels": dict(zip(self.labels, key)),
+                "count": sum(counts),
+                "sum": self._sums[key],
+                "buckets": dict(zip([f"{b:g}" for b in self.buckets] + ["+Inf"], counts)),
+            } for key, counts in sorted(self._counts.items())]
+
+
+class MetricsRegistry:
+    """지표 모음 (Prometheus 텍스트 형식 / JSON 출력)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = LABELS) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = LABELS) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  labels: Sequence[str] = LABELS) -> Histogram:
+        return self._register(Histogram(name, help, buckets, labels))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: {"type": m.kind, "help": m.help, "values": m.to_dict()} for m in metrics}
+
+    def dump_json(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+class OllamaMetrics:
+    """OllamaClient가 기록하는 지표"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.requests = registry.counter("ollama_requests_total", "생성 요청 수")
+        self.errors = registry.counter("ollama_errors_total", "실패/취소된 생성 요청 수 (kind: http, timeout, connection, cancelled, other)",
+                                       labels=LABELS + ("kind",))
+        self.prompt_tokens = registry.counter("ollama_prompt_tokens_total", "프리필한 입력 토큰 수 (prompt_eval_count)")
+        self.completion_tokens = registry.counter("ollama_completion_tokens_total", "생성한 출력 토큰 수 (eval_count)")
+        self.ttft = registry.histogram("ollama_ttft_seconds", "요청부터 첫 토큰까지 (스트리밍 요청)")
+        self.request_duration = registry.histogram("ollama_request_duration_seconds", "요청 전체 소요 시간 (클라이언트 측)")
+        self.load_duration = registry.histogram("ollama_load_duration_seconds", "모델 로딩 시간 (서버 측 load_duration)")
+        self.prompt_eval_duration = registry.histogram("ollama_prompt_eval_duration_seconds",
+                                                       "프리필 시간 (서버 측 prompt_eval_duration)")
+        self.eval_duration = registry.histogram("ollama_eval_duration_seconds", "토큰 생성 시간 (서버 측 eval_duration)")
+
+    def record_done(self, model: str, chunk: Dict[str, Any], elapsed: float, ttft: Optional[float] = None):
+        """완료 응답(done 청크)의 서버 측 시간 정보와 토큰 수 기록"""
+        labels = (model, _call_site)
+        self.requests.inc(*labels)
+        self.request_duration.observe(elapsed, *labels)
+        if ttft is not None:
+            self.ttft.observe(ttft, *labels)
+        self.prompt_tokens.inc(*labels, amount=chunk.get("prompt_eval_count") or 0)
+        self.completion_tokens.inc(*labels, amount=chunk.get("eval_count") or 0)
+        for key, histogram in (("load_duration", self.load_duration),
+                               ("prompt_eval_duration", self.prompt_eval_duration),
+                               ("eval_duration", self.eval_duration)):
+            if chunk.get(key) is not None:
+                histogram.observe(chunk[key] / 1e9, *labels)
+
+    def record_error(self, model: str, kind: str):
+        self.requests.inc(model, _call_site)
+        self.errors.inc(model, _call_site, kind)
+
+
+_default_registry: Optional[MetricsRegistry] = None
+_ollama_metrics: Optional[OllamaMetrics] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """프로세스 전체에서 공유하는 기본 레지스트리"""
+    global _default_registry
+    with _registry_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+        return _default_registry
+
+
+def get_ollama_metrics() -> OllamaMetrics:
+    """기본 레지스트리에 등록된 Ollama 요청 지표"""
+    global _ollama_metrics
+    registry = get_registry()
+    with _registry_lock:
+        if _ollama_metrics is None:
+            _ollama_metrics = OllamaMetrics(registry)
+        return _ollama_metrics
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.registry.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(self.registry.to_dict(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1",
+                         registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """/metrics (Prometheus 텍스트)와 /metrics.json을 제공하는 백그라운드 HTTP 서버 시작"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or get_registry()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser):
+    """지표 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--metrics-port", type=int, default=None,
+        help="지정하면 127.0.0.1:PORT/metrics 로 Prometheus 지표 제공"
+    )
+    parser.add_argument(
+        "--metrics-json", type=Path, default=None,
+        help="종료 시 지표를 저장할 JSON 파일"
+    )
+
+
+def configure_metrics(args: argparse.Namespace, call_site: str) -> MetricsRegistry:
+    """add_metrics_arguments로 파싱한 인자로 call_site 라벨, /metrics 서버, JSON 저장 설정"""
+    set_call_site(call_site)
+    registry = get_registry()
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port, registry=registry)
+    if args.metrics_json is not None:
+        atexit.register(registry.dump_json, args.metrics_json)
+    return registry
@@ -0,0 +1,469 @@
+"""
+로컬 Mock Ollama 서버
+실제 모델 없이 Ollama API를 흉내 내어 클라이언트 쪽 성능 작업을 결정적으로 재현합니다.
+
+기본 시간 설정은 notes/phase1-api-test.md의 CPU 측정값(모델 로딩 3.4초, ~13 tokens/sec)을 따릅니다.
+
+사용법:
+    python -m src.mock_ollama --port 11435
+    OLLAMA_URL=http://localhost:11435 python tests/phase2_cot_test.py
+
+    # CI: 지연 없이 실행
+    python -m src.mock_ollama --port 11435 --load-delay 0 --prefill-rate 0 --token-latency 0
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .context_window import estimate_tokens
+from .ollama_client import MODEL_NAME
+
+VOCABULARY = (
+    "the model answer is a simple example of local inference and each token arrives "
+    "after a short delay 모델 응답 예시 입니다 토큰 스트리밍 테스트 결과 확인"
+).split()
+
+DEFAULT_RESPONSE_TOKENS = 64
+DEFAULT_EMBEDDING_DIM = 384
+
+
+def parse_keep_alive(value: Any, default: float = 300.0) -> float:
+    """keep_alive 값("30m", "10s", 300, -1)을 초로 변환 (음수는 무기한)"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)([smh]?)", str(value).strip())
+    if not match:
+        return default
+    number, unit = float(match.group(1)), match.group(2)
+    return number * {"": 1, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+def stable_seed(*parts: Any) -> int:
+    """프로세스가 달라도 같은 값을 주는 시드"""
+    digest = hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def hashed_embedding(text: str, dim: int = DEFAULT_EMBEDDING_DIM) -> List[float]:
+    """
+    문자 3-gram feature hashing 임베딩
+
+    비슷한 문장은 코사인 유사도가 높게 나오므로 시맨틱 캐시/검색 테스트에 쓸 수 있다.
+    """
+    vector = [0.0] * dim
+    padded = f"  {text.lower()}  "
+    for i in range(len(padded) - 2):
+        h = stable_seed(padded[i:i + 3])
+        vector[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class MockConfig:
+    """Mock 서버 동작 설정"""
+
+    def __init__(
+        self,
+        models: Optional[List[str]] = None,
+        load_delay: float = 3.4,
+        prefill_rate: float = 10.0,
+        token_latency: float = 0.077,
+        jitter: float = 0.1,
+        response_tokens: int = DEFAULT_RESPONSE_TOKENS,
+        fail_rate: float = 0.0,
+        disconnect_rate: float = 0.0,
+        num_parallel: int = 1,
+        embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            models: 제공할 모델 이름 목록
+            load_delay: 모델이 메모리에 없을 때 첫 요청의 로딩 시간 (초)
+            prefill_rate: 프롬프트 처리 속도 (tokens/sec, 0이면 즉시)
+            token_latency: 생성 토큰당 지연 (초)
+            jitter: 토큰 지연의 무작위 변동 비율 (0.1 = ±10%)
+            response_tokens: num_predict가 없을 때 생성할 토큰 수
+            fail_rate: HTTP 500을 반환할 확률
+            disconnect_rate: 스트리밍 도중 연결을 끊을 확률
+            num_parallel: 동시에 처리할 요청 수 (OLLAMA_NUM_PARALLEL), 나머지는 대기
+            embedding_dim: 임베딩 차원
+            seed: 지연/실패 주입용 시드
+        """
+        self.models = models or [MODEL_NAME]
+        self.load_delay = load_delay
+        self.prefill_rate = prefill_rate
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.response_tokens = response_tokens
+        self.fail_rate = fail_rate
+        self.disconnect_rate = disconnect_rate
+        self.num_parallel = num_parallel
+        self.embedding_dim = embedding_dim
+        self.seed = seed
+
+
+class MockState:
+    """모델 상주 상태와 동시 실행 슬롯"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.slots = threading.Semaphore(max(1, config.num_parallel))
+        self.loaded_until: Dict[str, float] = {}  # 모델 → 언로드 시각 (monotonic)
+        self.lock = threading.Lock()
+
+    def random(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def ensure_loaded(self, model: str, keep_alive: Any) -> float:
+        """모델을 로드하고 로딩에 걸린 시간 반환 (이미 로드돼 있으면 0)"""
+        now = time.monotonic()
+        with self.lock:
+            loaded = self.loaded_until.get(model, 0) > now
+        load_time = 0.0
+        if not loaded:
+            load_time = self.config.load_delay
+            time.sleep(load_time)
+
+        duration = parse_keep_alive(keep_alive)
+        with self.lock:
+            self.loaded_until[model] = float("inf") if duration < 0 else time.monotonic() + duration
+        return load_time
+
+    def running(self) -> List[Dict[str, Any]]:
+        """/api/ps 응답용 로드된 모델 목록"""
+        now = time.monotonic()
+        result = []
+        with self.lock:
+            items = list(self.loaded_until.items())
+        for model, until in items:
+            if until <= now:
+                continue
+            remaining = 10 * 365 * 86400 if until == float("inf") else until - now
+            expires = datetime.now(timezone.utc).astimezone() + timedelta(seconds=remaining)
+            result.append({
+                "name": model,
+                "model": model,
+                "size": model_size(model),
+                "size_vram": 0,
+                "digest": model_digest(model),
+                "expires_at": expires.isoformat(),
+            })
+        return result
+
+
+def model_digest(model: str) -> str:
+    return hashlib.sha256(model.encode("utf-8")).hexdigest()
+
+
+def model_size(model: str) -> int:
+    return 3_825_819_519  # llama2:7b-chat-q4_0 크기
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Ollama API 엔드포인트 구현"""
+
+    protocol_version = "HTTP/1.1"
+    state: MockState  # MockOllamaServer가 설정
+
+    def log_message(self, format, *args):
+        pass  # 요청 로그 출력 안 함
+
+    # ---------- 응답 헬퍼 ----------
+
+    def _send_json(self, body: Dict[str, Any], status: int = 200):
+        data = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_line(self, body: Dict[str, Any]):
+        # 실제 Ollama와 같은 공백 없는 JSON 한 줄을 HTTP 청크 하나로 전송
+        data = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    # ---------- 라우팅 ----------
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [
+                {
+                    "name": model,
+                    "model": model,
+                    "size": model_size(model),
+                    "digest": model_digest(model),
+                    "details": {"parameter_size": "7B", "quantization_level": "Q4_0"},
+                }
+                for model in self.state.config.models
+            ]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": self.state.running()})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        routes = {
+            "/api/generate": self._handle_generate,
+            "/api/chat": self._handle_chat,
+            "/api/embeddings": self._handle_embeddings,
+            "/api/embed": self._handle_embed,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        model = payload.get("model")
+        if model not in self.state.config.models:
+            self._send_json({"error": f"model '{model}' not found"}, status=404)
+            return
+        if self.state.random() < self.state.config.fail_rate:
+            self._send_json({"error": "injected failure"}, status=500)
+            return
+
+        with self.state.slots:
+            try:
+                handler(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # 클라이언트가 스트림을 끊으면 실제 서버처럼 생성을 멈추고 슬롯을 반환
+                self.close_connection = True
+
+    # ---------- 엔드포인트 ----------
+
+    def _generate_tokens(self, model: str, prompt: str, options: Dict[str, Any]) -> List[str]:
+        """결정적인 응답 토큰 생성 (seed가 같거나 temperature가 0이면 같은 응답)"""
+        if "seed" in options or options.get("temperature") == 0:
+            rng = random.Random(stable_seed(model, prompt, options.get("seed")))
+        else:
+            rng = random.Random(self.state.random())
+        count = options.get("num_predict", self.state.config.response_tokens)
+        if count is None or count < 0:
+            count = self.state.config.response_tokens
+        return [rng.choice(VOCABULARY) + " " for _ in range(count)]
+
+    def _run(self, payload: Dict[str, Any], prompt: str,
+             make_chunk, context: Optional[List[int]] = None):
+        """generate/chat 공통 처리: 로딩 → 프리필 → 토큰 생성"""
+        config = self.state.config
+        model = payload["model"]
+        options = payload.get("options") or {}
+        stream = payload.get("stream", True)
+        start = time.monotonic()
+
+        load_time = self.state.ensure_loaded(model, payload.get("keep_alive"))
+
+        prompt_tokens = estimate_tokens(prompt) if prompt else 0
+        prefill_time = prompt_tokens / config.prefill_rate if config.prefill_rate > 0 else 0.0
+        time.sleep(prefill_time)
+
+        tokens = self._generate_tokens(model, prompt, options) if prompt else []
+        disconnect_at = None
+        if stream and tokens and self.state.random() < config.disconnect_rate:
+            disconnect_at = len(tokens) // 2
+
+        if stream:
+            self._start_stream()
+
+        eval_start = time.monotonic()
+        for i, token in enumerate(tokens):
+            if disconnect_at is not None and i == disconnect_at:
+                self.close_connection = True
+                return  # 청크 스트림을 끝맺지 않고 연결 종료
+            delay = config.token_latency * (1 + config.jitter * (2 * self.state.random() - 1))
+            time.sleep(max(0.0, delay))
+            if stream:
+                self._write_line(make_chunk(token, False))
+        eval_time = time.monotonic() - eval_start
+
+        new_ids = [stable_seed(t) % 32000 for t in tokens]
+        prompt_ids = [stable_seed(prompt, i) % 32000 for i in range(prompt_tokens)]
+        done = make_chunk("" if stream else "".join(tokens), True)
+        done.update({
+            "done_reason": "stop" if prompt else "load",
+            "total_duration": int((time.monotonic() - start) * 1e9),
+            "load_duration": int(load_time * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill_time * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(eval_time * 1e9),
+        })
+        if context is not None:
+            done["context"] = context + prompt_ids + new_ids
+
+        if stream:
+            self._write_line(done)
+            self._end_stream()
+        else:
+            self._send_json(done)
+
+    def _handle_generate(self, payload: Dict[str, Any]):
+        model = payload["model"]
+
+        def make_chunk(text: str, done: bool) -> Dict[str, Any]:
+            return {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": text,
+                "done": done,
+            }
+
+        # context를 보내면 이전 토큰은 다시 계산하지 않고 새 프롬프트만 프리필
+        self._run(payload, payload.get("prompt", ""), make_chunk, context=list(payload.get("context") or []))
+
+    def _handle_chat(self, payload: Dict[str, Any]):
+        model = payload["model"]
+        messages = payload.get("messages", [])
+        prompt = "\n".join(m.get("content", "") for m in messages)
+
+        def make_chunk(text: str, done: bool) -> Dict[str, Any]:
+            return {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": text},
+                "done": done,
+            }
+
+        self._run(payload, prompt, make_chunk)
+
+    def _handle_embeddings(self, payload: Dict[str, Any]):
+        self.state.ensure_loaded(payload["model"], payload.get("keep_alive"))
+        prompt = payload.get("prompt", "")
+        if self.state.config.prefill_rate > 0:
+            time.sleep(estimate_tokens(prompt) / self.state.config.prefill_rate)
+        self._send_json({"embedding": hashed_embedding(prompt, self.state.config.embedding_dim)})
+
+    def _handle_embed(self, payload: Dict[str, Any]):
+        self.state.ensure_loaded(payload["model"], payload.get("keep_alive"))
+        texts = payload.get("input", "")
+        if isinstance(texts, str):
+            texts = [texts]
+        tokens = sum(estimate_tokens(text) for text in texts)
+        if self.state.config.prefill_rate > 0:
+            time.sleep(tokens / self.state.config.prefill_rate)
+        self._send_json({
+            "model": payload["model"],
+            "embeddings": [hashed_embedding(text, self.state.config.embedding_dim) for text in texts],
+            "prompt_eval_count": tokens,
+        })
+
+
+class MockOllamaServer:
+    """백그라운드 스레드에서 실행하는 Mock 서버 (with 문 지원)"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            config: 동작 설정 (기본값: MockConfig())
+            host: 바인딩 주소
+            port: 포트 (0이면 빈 포트 자동 선택)
+        """
+        self.config = config or MockConfig()
+        handler = type("BoundMockOllamaHandler", (MockOllamaHandler,), {"state": MockState(self.config)})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="로컬 Mock Ollama 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", action="append", default=None,
+                        help=f"제공할 모델 이름 (여러 번 지정 가능, 기본값: {MODEL_NAME})")
+    parser.add_argument("--load-delay", type=float, default=3.4, help="모델 로딩 시간 초 (기본값: 3.4)")
+    parser.add_argument("--prefill-rate", type=float, default=10.0,
+                        help="프롬프트 처리 속도 tokens/sec, 0이면 즉시 (기본값: 10)")
+    parser.add_argument("--token-latency", type=float, default=0.077,
+                        help="토큰당 생성 지연 초 (기본값: 0.077 ≈ 13 tokens/sec)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="토큰 지연 변동 비율 (기본값: 0.1)")
+    parser.add_argument("--response-tokens", type=int, default=DEFAULT_RESPONSE_TOKENS,
+                        help=f"기본 응답 토큰 수 (기본값: {DEFAULT_RESPONSE_TOKENS})")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="HTTP 500 반환 확률")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="스트리밍 중 연결 끊김 확률")
+    parser.add_argument("--num-parallel", type=int, default=1, help="동시 처리 요청 수 (기본값: 1)")
+    parser.add_argument("--embedding-dim", type=int, default=DEFAULT_EMBEDDING_DIM, help="임베딩 차원")
+    parser.add_argument("--seed", type=int, default=0, help="지연/실패 주입 시드")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        models=args.model,
+        load_delay=args.load_delay,
+        prefill_rate=args.prefill_rate,
+        token_latency=args.token_latency,
+        jitter=args.jitter,
+        response_tokens=args.response_tokens,
+        fail_rate=args.fail_rate,
+        disconnect_rate=args.disconnect_rate,
+        num_parallel=args.num_parallel,
+        embedding_dim=args.embedding_dim,
+        seed=args.seed,
+    )
+    server = MockOllamaServer(config, host=args.host, port=args.port)
+    print(f"🧪 Mock Ollama 서버 실행 중: {server.url} (모델: {', '.join(config.models)})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n종료합니다.")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
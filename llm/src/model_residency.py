@@ -0,0 +1,110 @@
+"""
+모델 상주 관리
+시작 시 모델을 미리 로드하고, 언로드되면 백그라운드에서 다시 로드합니다.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from .ollama_client import OllamaClient, get_client
+
+DEFAULT_KEEP_ALIVE = "30m"
+CHECK_INTERVAL = 60  # 상주 여부 확인 주기 (초)
+
+
+class ModelResidency:
+    """모델 프리로드와 keep_alive 유지"""
+
+    def __init__(self, client: Optional[OllamaClient] = None,
+                 keep_alive: str = DEFAULT_KEEP_ALIVE,
+                 check_interval: float = CHECK_INTERVAL):
+        """
+        Args:
+            client: 사용할 클라이언트 (모든 요청에 keep_alive가 붙도록 설정된다)
+            keep_alive: 마지막 요청 후 모델을 메모리에 유지할 시간
+            check_interval: 언로드 여부를 확인하는 주기 (초)
+        """
+        self.client = client or get_client()
+        self.client.keep_alive = keep_alive
+        self.keep_alive = keep_alive
+        self.check_interval = check_interval
+
+        self.ready = threading.Event()
+        self.load_count = 0
+        self.last_load_duration: Optional[float] = None  # 마지막 프리로드의 모델 로딩 시간 (초)
+        self.last_error: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def preload(self):
+        """빈 프롬프트로 generate를 호출해 모델을 메모리에 올림"""
+        with self._lock:
+            try:
+                result = self.client.generate("", timeout=300)
+            except Exception as e:
+                self.last_error = str(e)
+                return
+            self.load_count += 1
+            self.last_load_duration = result.get("load_duration", 0) / 1e9
+            self.last_error = None
+            self.ready.set()
+
+    def preload_async(self) -> threading.Thread:
+        """백그라운드에서 프리로드 (환영 화면을 그리는 동안 모델 로딩)"""
+        thread = threading.Thread(target=self.preload, daemon=True)
+        thread.start()
+        return thread
+
+    def get_status(self) -> Optional[Dict[str, Any]]:
+        """/api/ps에서 이 모델의 상주 정보 조회 (언로드 상태면 None)"""
+        running = self.client.get_running(timeout=5).get("models", [])
+        for model in running:
+            if model.get("name") == self.client.model or model.get("model") == self.client.model:
+                return model
+        return None
+
+    def _watch(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                resident = self.get_status() is not None
+            except Exception:
+                continue
+            if not resident:
+                # 유휴 시간 동안 서버가 모델을 내렸으면 다음 질문 전에 다시 로드
+                self.ready.clear()
+                self.preload()
+
+    def start_watcher(self):
+        """언로드 감지 후 재워밍하는 백그라운드 스레드 시작"""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        """백그라운드 스레드 정지"""
+        self._stop.set()
+
+    def describe(self) -> str:
+        """/stats에 표시할 상주 상태 문자열"""
+        try:
+            status = self.get_status()
+        except Exception:
+            return "확인 불가"
+
+        if status is None:
+            return "언로드됨 (다음 질문 전에 다시 로드)"
+
+        text = "로드됨"
+        if status.get("size_vram"):
+            text += f" · VRAM {status['size_vram'] / (1024**3):.1f} GB"
+        elif status.get("size"):
+            text += f" · {status['size'] / (1024**3):.1f} GB"
+        expires_at = status.get("expires_at", "")
+        if len(expires_at) >= 19:
+            # 예: 2024-06-04T14:38:31.83753-07:00 -> 14:38:31 (서버 시간대 기준)
+            text += f" · 만료 {expires_at[11:19]}"
+        if self.last_load_duration is not None:
+            text += f" · 로딩 {self.last_load_duration:.2f}초 ({self.load_count}회)"
+        return text
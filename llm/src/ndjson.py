@@ -0,0 +1,200 @@
+"""
+Ollama NDJSON 스트림 디코더
+큰 단위로 읽은 바이트를 복사 없이(memoryview) 줄 단위로 나누고, 토큰 청크는 필요한 필드만 꺼냅니다.
+orjson이 설치되어 있으면 자동으로 사용합니다.
+
+사용법 (청크당 클라이언트 오버헤드 마이크로 벤치마크):
+    python -m src.ndjson --tokens 20000
+"""
+
+import argparse
+import json
+import time
+from json.decoder import scanstring
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+# iter_content로 한 번에 읽을 최대 바이트 수 (chunked 응답은 도착한 HTTP 청크 단위로 반환됨)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+Line = Union[bytes, bytearray, memoryview]
+
+
+def _stdlib_loads(line: Line) -> Any:
+    return json.loads(bytes(line) if isinstance(line, memoryview) else line)
+
+
+# orjson은 memoryview를 그대로 받는다
+loads: Callable[[Line], Any] = orjson.loads if orjson is not None else _stdlib_loads
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+# 필드만 꺼내는 빠른 경로는 표준 json보다 빠르지만 orjson 전체 파싱보다는 느리다
+FAST_PATH = orjson is None
+
+_DONE_FALSE = b'"done":false'
+# 토큰 청크에서 꺼낼 문자열 필드 키, 값 뒤에 와야 하는 나머지, 결과 dict 생성 함수
+_FAST_FIELDS = (
+    (b'"response":"', ',"done":false}', lambda text: {"response": text, "done": False}),
+    (b'"content":"', '},"done":false}',
+     lambda text: {"message": {"role": "assistant", "content": text}, "done": False}),
+)
+
+Span = Tuple[bytes, int, int]
+
+
+def _iter_spans(chunks: Iterable[bytes]) -> Iterator[Span]:
+    """
+    바이트 청크를 (버퍼, 시작, 끝) 줄 위치로 분리 (빈 줄은 건너뜀)
+
+    한 청크 안에서 끝나는 줄은 복사하지 않고 청크 안의 위치만 넘기고,
+    청크 경계에 걸친 줄만 bytearray에 이어 붙인다.
+    """
+    tail = bytearray()
+    for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            if tail:
+                tail += memoryview(chunk)[start:end]
+                line = bytes(tail)
+                tail.clear()
+                yield line, 0, len(line)
+            elif end > start:
+                yield chunk, start, end
+            start = end + 1
+        if start < len(chunk):
+            tail += memoryview(chunk)[start:]
+    if tail.strip():
+        line = bytes(tail)
+        yield line, 0, len(line)
+
+
+def split_lines(chunks: Iterable[bytes]) -> Iterator[memoryview]:
+    """바이트 청크를 줄 단위 memoryview로 분리"""
+    for buffer, start, end in _iter_spans(chunks):
+        yield memoryview(buffer)[start:end]
+
+
+def decode_span(buffer: bytes, start: int, end: int) -> Dict[str, Any]:
+    """
+    버퍼의 한 줄을 dict로 변환
+
+    done=false인 토큰 청크는 전체를 파싱하지 않고 response(generate) 또는
+    message.content(chat)만 꺼낸 작은 dict를 돌려준다. 값 뒤에 다른 필드가 더 있거나
+    형식이 다르면 (완료 청크 포함) 전체를 파싱한다.
+    """
+    if buffer.find(_DONE_FALSE, start, end) >= 0:
+        for key, rest, make in _FAST_FIELDS:
+            # 문자열 값 안의 따옴표는 이스케이프되어 있으므로 처음 찾은 위치가 실제 키다
+            index = buffer.find(key, start, end)
+            if index < 0:
+                continue
+            try:
+                value = buffer[index + len(key):end].decode("utf-8")
+                text, value_end = scanstring(value, 0)
+            except ValueError:
+                break
+            if value[value_end:] == rest:
+                return make(text)
+            break
+    return loads(memoryview(buffer)[start:end])
+
+
+def decode_line(line: Line) -> Dict[str, Any]:
+    """스트림 한 줄을 dict로 변환 (decode_span 참고)"""
+    line = bytes(line)
+    return decode_span(line, 0, len(line))
+
+
+def iter_ndjson(chunks: Iterable[bytes], fast: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+    """
+    바이트 청크 이터레이터 → 청크 dict 이터레이터 (done 청크에서 종료)
+
+    Args:
+        chunks: response.iter_content() 등 바이트 청크
+        fast: True면 토큰 청크에서 필요한 필드만 꺼냄 (기본값: FAST_PATH, orjson이 없을 때만 사용)
+    """
+    if fast is None:
+        fast = FAST_PATH
+    for buffer, start, end in _iter_spans(chunks):
+        chunk = decode_span(buffer, start, end) if fast else loads(memoryview(buffer)[start:end])
+        yield chunk
+        if chunk.get("done", False):
+            break
+
+
+def _sample_stream(tokens: int) -> list:
+    """Ollama /api/generate 스트림과 같은 형식의 토큰 청크 (HTTP 청크 하나에 한 줄)"""
+    words = ["안녕하세요", " model", " 응답", "입니다", ".", "\n", " \"quoted\"", " token"]
+    lines = [
+        json.dumps({"model": "llama2:7b-chat-q4_0", "created_at": "2024-01-01T00:00:00.000000Z",
+                    "response": words[i % len(words)], "done": False},
+                   ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        for i in range(tokens)
+    ]
+    lines.append(json.dumps({"model": "llama2:7b-chat-q4_0", "created_at": "2024-01-01T00:00:00.000000Z",
+                             "response": "", "done": True, "context": list(range(512)),
+                             "eval_count": tokens, "eval_duration": 10 ** 9},
+                            separators=(",", ":")).encode("utf-8") + b"\n")
+    return lines
+
+
+def _baseline(chunks: list) -> int:
+    """기존 방식: requests의 iter_lines + 줄마다 json.loads"""
+    import requests
+
+    response = requests.Response()
+    response.iter_content = lambda chunk_size=1, decode_unicode=False: iter(chunks)
+    count = 0
+    for line in response.iter_lines():
+        if line:
+            json.loads(line)
+            count += 1
+    return count
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="NDJSON 스트림 디코더 마이크로 벤치마크")
+    parser.add_argument("--tokens", type=int, default=20000, help="토큰 청크 수 (기본값: 20000)")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수, 최솟값 사용 (기본값: 5)")
+    args = parser.parse_args()
+
+    chunks = _sample_stream(args.tokens)
+    # 여러 줄이 한 번에 도착하는 경우 (부하가 높을 때 소켓 버퍼에 쌓인 청크)
+    joined = b"".join(chunks)
+    large = [joined[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(joined), STREAM_CHUNK_SIZE)]
+
+    cases = [
+        ("iter_lines + json.loads", lambda: _baseline(chunks)),
+        (f"iter_ndjson 전체 파싱 ({JSON_BACKEND})", lambda: sum(1 for _ in iter_ndjson(chunks, fast=False))),
+        ("iter_ndjson 빠른 경로", lambda: sum(1 for _ in iter_ndjson(chunks, fast=True))),
+        ("iter_ndjson 빠른 경로 (64KB 청크)", lambda: sum(1 for _ in iter_ndjson(large, fast=True))),
+    ]
+    if orjson is not None:
+        cases.insert(2, ("iter_ndjson 전체 파싱 (json)",
+                         lambda: sum(1 for _ in map(_stdlib_loads, split_lines(chunks)))))
+
+    print(f"\n🧪 NDJSON 디코더 벤치마크: 토큰 {args.tokens}개 × {args.repeat}회")
+    print(f"   JSON 백엔드: {JSON_BACKEND} · 기본 빠른 경로: {'사용' if FAST_PATH else '사용 안 함'}")
+    print(f"{'='*64}")
+    baseline = None
+    for name, run in cases:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            count = run()
+            best = min(best, time.perf_counter() - start)
+        per_token = best / count * 1e6
+        baseline = baseline or per_token
+        print(f"  {name}: {per_token:.2f} µs/토큰 ({baseline / per_token:.2f}x)")
+    print(f"{'='*64}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Ollama API 공용 클라이언트
+keep-alive 커넥션 풀을 공유하는 requests.Session 기반 클라이언트
+"""
+
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from .backend_pool import Backend, BackendPool, parse_urls
+from .metrics import get_call_site, get_ollama_metrics
+from .ndjson import STREAM_CHUNK_SIZE, iter_ndjson
+from .scheduler import BATCH, CALLER_HEADER, PRIORITY_HEADER, RequestScheduler, parse_priority
+
+# Ollama API 설정 (환경 변수로 덮어쓸 수 있음)
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+# 쉼표로 구분한 여러 서버 주소 (두 개 이상이면 공유 클라이언트가 백엔드 풀로 분산)
+OLLAMA_URLS = os.environ.get("OLLAMA_URLS")
+MODEL_NAME = os.environ.get("OLLAMA_MODEL", "llama2:7b-chat-q4_0")
+# 임베딩 모델 (nomic-embed-text 같은 전용 모델을 권장, 없으면 생성 모델 사용)
+EMBED_MODEL = os.environ.get("OLLAMA_EMBED_MODEL", MODEL_NAME)
+# 요청마다 보낼 모델 상주 시간 (예: "30m", 없으면 서버 기본값 5분)
+KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE")
+
+# 타임아웃 (초): 연결 / 응답 대기
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 300
+
+
+class OllamaError(Exception):
+    """Ollama API 오류 응답"""
+
+    def __init__(self, status_code: int, body: str = ""):
+        super().__init__(f"HTTP {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.body = body
+
+
+class StreamResponse:
+    """
+    스트리밍 응답 청크 이터레이터
+
+    다른 스레드에서 cancel()을 호출하면 소켓을 바로 끊어서, 읽는 쪽은 즉시 예외로 빠져나오고
+    서버는 연결 종료를 감지해 생성을 멈춘다 (슬롯 반환).
+    """
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        self.cancelled = threading.Event()
+        self._chunks: Iterator[Dict[str, Any]] = iter(())
+        self._on_close: List[Callable[[], None]] = []  # 스케줄러 슬롯, 백엔드 요청 수 반환
+        self.error: Optional[str] = None  # 서버 쪽 원인으로 스트림이 실패했으면 그 내용
+
+    def __iter__(self) -> "StreamResponse":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        return next(self._chunks)
+
+    def close(self):
+        """이터레이터 정리 (읽는 스레드에서 호출)"""
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+        self._finish()
+
+    def _finish(self):
+        on_close, self._on_close = self._on_close, []
+        for callback in on_close:
+            callback()
+
+    def cancel(self):
+        """진행 중인 스트림 중단 (어느 스레드에서든 호출 가능)"""
+        self.cancelled.set()
+        # close()만으로는 다른 스레드의 블로킹 recv가 깨어나지 않으므로 shutdown으로 끊는다
+        connection = getattr(self.response.raw, "connection", None)
+        sock = getattr(connection, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # 이미 닫힌 연결
+
+
+def _is_read_timeout(error: requests.ConnectionError) -> bool:
+    """
+    requests가 ConnectionError로 감싼 읽기 타임아웃인지
+
+    응답 본문을 읽다가 난 타임아웃(스트리밍)과 read=0 재시도 설정 때문에 MaxRetryError로 감싸진
+    응답 대기 타임아웃은 requests.ReadTimeout이 아니라 ConnectionError로 올라온다.
+    """
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, ReadTimeoutError)
+
+
+class OllamaClient:
+    """커넥션 풀을 재사용하는 Ollama API 클라이언트"""
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_URL,
+        model: str = MODEL_NAME,
+        timeout: float = READ_TIMEOUT,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        retries: int = 2,
+        pool_size: int = 10,
+        keep_alive: Optional[str] = KEEP_ALIVE,
+        scheduler: Optional[RequestScheduler] = None,
+        priority: str = BATCH,
+        pool: Optional[BackendPool] = None,
+    ):
+        """
+        Args:
+            scheduler: 생성 요청을 보내기 전에 슬롯을 받을 스케줄러 (None이면 바로 전송)
+            priority: 요청 기본 우선순위 (interactive/batch). 스케줄링 프록시에도 헤더로 전달된다.
+            pool: 여러 서버로 분산할 백엔드 풀 (지정하면 base_url 대신 요청마다 서버를 고름)
+        """
+        self.pool = pool
+        self.base_url = ",".join(pool.urls) if pool is not None else base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.scheduler = scheduler
+        self.priority = priority
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+        # 연결 실패와 일시적인 서버 오류만 재시도한다.
+        # 응답 도중 끊긴 요청은 서버에서 이미 생성이 진행됐을 수 있으므로 재시도하지 않는다.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _timeout(self, timeout: Optional[float]) -> tuple:
+        return (self.connect_timeout, timeout if timeout is not None else self.timeout)
+
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None,
+                 stream: bool = False, timeout: Optional[float] = None,
+                 headers: Optional[Dict[str, str]] = None, base_url: Optional[str] = None) -> requests.Response:
+        """요청 전송 후 200이 아니면 OllamaError 발생 (읽기 타임아웃은 requests.ReadTimeout)"""
+        try:
+            response = self.session.request(
+                method,
+                f"{base_url or self.base_url}{path}",
+                json=payload,
+                stream=stream,
+                timeout=self._timeout(timeout),
+                headers=headers,
+            )
+        except requests.ConnectionError as e:
+            if _is_read_timeout(e):
+                raise requests.ReadTimeout(e, request=e.request) from e
+            raise
+        if response.status_code != 200:
+            body = response.text
+            response.close()
+            raise OllamaError(response.status_code, body)
+        return response
+
+    @staticmethod
+    def _iter_chunks(response: requests.Response) -> Iterator[Dict[str, Any]]:
+        """NDJSON 스트림을 청크 단위 dict로 변환 (읽기 타임아웃은 requests.ReadTimeout으로 발생)"""
+        try:
+            yield from iter_ndjson(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        except requests.ConnectionError as e:
+            if _is_read_timeout(e):
+                raise requests.ReadTimeout(e, request=e.request, response=response) from e
+            raise
+        finally:
+            response.close()
+
+    @staticmethod
+    def _error_kind(error: BaseException) -> str:
+        if isinstance(error, OllamaError):
+            return "http"
+        if isinstance(error, requests.Timeout):
+            return "timeout"
+        if isinstance(error, requests.ConnectionError):
+            return "connection"
+        return "other"
+
+    @staticmethod
+    def _is_backend_failure(error: BaseException) -> bool:
+        """서버 장애로 볼 오류인지 (4xx는 요청 문제이므로 제외)"""
+        if isinstance(error, OllamaError):
+            return error.status_code >= 500
+        return isinstance(error, (requests.RequestException, ValueError))
+
+    def _send(self, path: str, payload: Dict, stream: bool, timeout: Optional[float],
+              headers: Dict[str, str]) -> Tuple[requests.Response, Optional[Backend]]:
+        """
+        생성 요청 전송
+
+        백엔드 풀이 있으면 서버를 골라 보내고, 연결 단계에서 실패하면 (생성이 시작되지 않았으므로)
+        다른 서버로 다시 보낸다. 성공하면 고른 서버를 함께 반환하며, 호출자가 pool.release를 호출한다.
+        """
+        if self.pool is None:
+            return self._request("POST", path, payload, stream=stream, timeout=timeout, headers=headers), None
+
+        tried: List[Backend] = []
+        while True:
+            backend = self.pool.acquire(payload["model"], exclude=tried)
+            try:
+                response = self._request("POST", path, payload, stream=stream, timeout=timeout,
+                                         headers=headers, base_url=backend.url)
+            except Exception as e:
+                self.pool.release(backend, ok=not self._is_backend_failure(e), error=str(e)[:200])
+                tried.append(backend)
+                if isinstance(e, requests.ConnectionError) and len(tried) < len(self.pool.backends):
+                    continue
+                raise
+            return response, backend
+
+    def _get(self, path: str, timeout: Optional[float]) -> Dict[str, Any]:
+        """GET 요청 (백엔드 풀이 있으면 클라이언트 모델이 로드된 서버 우선)"""
+        if self.pool is None:
+            return self._request("GET", path, timeout=timeout).json()
+        backend = self.pool.acquire(self.model)
+        try:
+            result = self._request("GET", path, timeout=timeout, base_url=backend.url).json()
+        except Exception as e:
+            self.pool.release(backend, ok=not self._is_backend_failure(e), error=str(e)[:200])
+            raise
+        self.pool.release(backend)
+        return result
+
+    def _instrument(self, chunks: Iterator[Dict[str, Any]], model: str, start: float,
+                    stream: StreamResponse) -> Iterator[Dict[str, Any]]:
+        """스트림을 그대로 넘기면서 첫 토큰 시간, 완료 시간 정보, 오류를 지표에 기록"""
+        metrics = get_ollama_metrics()
+        ttft = None
+        finished = False
+        try:
+            for chunk in chunks:
+                if ttft is None and (chunk.get("response") or chunk.get("message", {}).get("content")):
+                    ttft = time.perf_counter() - start
+                if chunk.get("done"):
+                    finished = True
+                    metrics.record_done(model, chunk, time.perf_counter() - start, ttft)
+                    stream._finish()  # 서버 생성이 끝났으므로 소비자가 스트림을 닫기 전에 슬롯 반환
+                yield chunk
+        except GeneratorExit:
+            if not finished:
+                metrics.record_error(model, "cancelled")  # 소비자가 중간에 스트림을 닫음
+            raise
+        except Exception as e:
+            if stream.cancelled.is_set():
+                metrics.record_error(model, "cancelled")
+            else:
+                metrics.record_error(model, self._error_kind(e))
+                stream.error = str(e)[:200]
+            raise
+        finally:
+            stream._finish()
+
+    def _call(self, path: str, payload: Dict, stream: bool, timeout: Optional[float],
+              priority: Optional[str] = None) -> Union[Dict[str, Any], StreamResponse]:
+        payload["stream"] = stream
+        if self.keep_alive is not None:
+            payload.setdefault("keep_alive", self.keep_alive)
+
+        priority = parse_priority(priority or self.priority)
+        caller = get_call_site()
+        headers = {PRIORITY_HEADER: priority, CALLER_HEADER: caller}
+        scheduler = self.scheduler
+        if scheduler is not None:
+            # 대기 시간은 지표에 따로 기록하고, 요청 시간은 슬롯을 받은 뒤부터 잰다
+            scheduler.acquire(priority, caller)
+
+        metrics = get_ollama_metrics()
+        start = time.perf_counter()
+        handle = None
+        backend = None
+        try:
+            response, backend = self._send(path, payload, stream, timeout, headers)
+            if stream:
+                handle = StreamResponse(response)
+                # 스트림이 끝나거나 닫힐 때 반환
+                if scheduler is not None:
+                    handle._on_close.append(scheduler.release)
+                if backend is not None:
+                    handle._on_close.append(lambda: self.pool.release(
+                        backend, payload["model"], ok=handle.error is None, error=handle.error))
+                handle._chunks = self._instrument(self._iter_chunks(response), payload["model"], start, handle)
+                return handle
+            result = response.json()
+        except Exception as e:
+            metrics.record_error(payload["model"], self._error_kind(e))
+            if backend is not None and handle is None:
+                self.pool.release(backend, ok=False, error=str(e)[:200])
+            raise
+        finally:
+            if scheduler is not None and handle is None:
+                scheduler.release()
+        if backend is not None:
+            self.pool.release(backend, payload["model"])
+        metrics.record_done(payload["model"], result, time.perf_counter() - start)
+        return result
+
+    def get_tags(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """다운로드된 모델 목록 (/api/tags)"""
+        return self._get("/api/tags", timeout)
+
+    def get_running(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """메모리에 로드된 모델 목록 (/api/ps)"""
+        return self._get("/api/ps", timeout)
+
+    def get_digest(self, model: Optional[str] = None, timeout: Optional[float] = None) -> Optional[str]:
+        """모델 digest (/api/tags, 다운로드되지 않았으면 None)"""
+        name = model or self.model
+        for entry in self.get_tags(timeout=timeout).get("models", []):
+            if name in (entry.get("name"), entry.get("model")):
+                return entry.get("digest")
+        return None
+
+    @property
+    def urls(self) -> List[str]:
+        """요청을 보내는 서버 주소 목록"""
+        return self.pool.urls if self.pool is not None else [self.base_url]
+
+    def is_available(self, timeout: float = 5) -> bool:
+        """서버 연결 확인 (백엔드 풀이면 모든 서버를 동시에 확인해서 하나라도 정상이면 True)"""
+        if self.pool is not None:
+            return self.pool.check_all() > 0
+        try:
+            self.get_tags(timeout=timeout)
+            return True
+        except (requests.RequestException, OllamaError):
+            return False
+
+    def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        stream: bool = False,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[str] = None,
+        **extra: Any,
+    ) -> Union[Dict[str, Any], StreamResponse]:
+        """
+        /api/generate 호출
+
+        Args:
+            prompt: 프롬프트
+            model: 모델 이름 (기본값: 클라이언트 모델)
+            stream: True면 청크 dict 이터레이터(StreamResponse), False면 최종 응답 dict 반환
+            options: temperature, seed, num_ctx 등 모델 옵션
+            timeout: 응답 대기 시간 (초)
+            priority: 이 요청의 우선순위 (기본값: 클라이언트 priority)
+            extra: context, system 등 추가 payload 필드
+        """
+        payload = {"model": model or self.model, "prompt": prompt, **extra}
+        if options:
+            payload["options"] = options
+        return self._call("/api/generate", payload, stream, timeout, priority)
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        stream: bool = False,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[str] = None,
+        **extra: Any,
+    ) -> Union[Dict[str, Any], StreamResponse]:
+        """
+        /api/chat 호출
+
+        Args:
+            messages: [{"role": ..., "content": ...}] 형식의 대화 목록
+            model: 모델 이름 (기본값: 클라이언트 모델)
+            stream: True면 청크 dict 이터레이터, False면 최종 응답 dict 반환
+            options: temperature, seed, num_ctx 등 모델 옵션
+            timeout: 응답 대기 시간 (초)
+            priority: 이 요청의 우선순위 (기본값: 클라이언트 priority)
+        """
+        payload = {"model": model or self.model, "messages": messages, **extra}
+        if options:
+            payload["options"] = options
+        return self._call("/api/chat", payload, stream, timeout, priority)
+
+    def embeddings(self, prompt: str, model: Optional[str] = None, timeout: Optional[float] = None,
+                   priority: Optional[str] = None) -> List[float]:
+        """
+        /api/embeddings 호출
+
+        Args:
+            prompt: 임베딩할 텍스트
+            model: 임베딩 모델 (기본값: EMBED_MODEL)
+            timeout: 응답 대기 시간 (초)
+            priority: 이 요청의 우선순위 (기본값: 클라이언트 priority)
+        """
+        payload = {"model": model or EMBED_MODEL, "prompt": prompt}
+        return self._call("/api/embeddings", payload, False, timeout, priority)["embedding"]
+
+    def embed(self, texts: List[str], model: Optional[str] = None, timeout: Optional[float] = None,
+              priority: Optional[str] = None) -> List[List[float]]:
+        """
+        /api/embed 호출 (여러 텍스트를 한 요청으로 임베딩)
+
+        /api/embed가 없는 이전 버전 서버(404)는 /api/embeddings로 한 건씩 요청한다.
+
+        Args:
+            texts: 임베딩할 텍스트 목록
+            model: 임베딩 모델 (기본값: EMBED_MODEL)
+            timeout: 응답 대기 시간 (초)
+            priority: 이 요청의 우선순위 (기본값: 클라이언트 priority)
+
+        Returns:
+            texts와 같은 순서의 임베딩 목록
+        """
+        payload = {"model": model or EMBED_MODEL, "input": list(texts)}
+        try:
+            return self._call("/api/embed", payload, False, timeout, priority)["embeddings"]
+        except OllamaError as e:
+            # 모델이 없어서 난 404("model ... not found")는 그대로 전달
+            if e.status_code != 404 or "model" in e.body:
+                raise
+        return [self.embeddings(text, model=model, timeout=timeout, priority=priority) for text in texts]
+
+    def close(self):
+        """커넥션 풀 정리"""
+        if self.pool is not None:
+            self.pool.stop()
+        self.session.close()
+
+
+_default_client: Optional[OllamaClient] = None
+
+
+def get_client() -> OllamaClient:
+    """프로세스 전체에서 공유하는 기본 클라이언트 (OLLAMA_URLS에 서버가 여러 개면 백엔드 풀 사용)"""
+    global _default_client
+    if _default_client is None:
+        urls = parse_urls(OLLAMA_URLS)
+        if len(urls) > 1:
+            _default_client = OllamaClient(pool=BackendPool(urls))
+        else:
+            _default_client = OllamaClient(base_url=urls[0] if urls else OLLAMA_URL)
+    return _default_client
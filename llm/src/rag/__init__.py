@@ -0,0 +1,14 @@
+"""
+로컬 RAG (검색 증강 생성)
+문서를 청크로 나눠 BM25 역색인과 임베딩 행렬(memmap)에 넣고, 질문과 관련된 청크를 찾아 프롬프트에 붙입니다.
+
+사용법:
+    python -m src.rag ingest notes docs          # 문서 추가 (바뀐 파일만 다시 처리)
+    python -m src.rag query "환각 현상을 줄이는 방법"
+    python src/chat_ui.py --rag-index .rag
+"""
+
+from .index import RagIndex, SearchResult
+from .retriever import Retriever, add_rag_arguments, configure_rag, get_retriever
+
+__all__ = ["RagIndex", "SearchResult", "Retriever", "add_rag_arguments", "configure_rag", "get_retriever"]
@@ -0,0 +1,238 @@
+"""
+RAG 색인 관리 CLI
+
+사용법:
+    python -m src.rag ingest notes docs                # 문서 추가/갱신 (중단 후 다시 실행하면 이어서)
+    python -m src.rag query "환각을 줄이는 방법" --k 5
+    python -m src.rag delete notes/phase1-api-test.md
+    python -m src.rag stats
+    python -m src.rag train-ivf                        # 큰 색인의 임베딩 검색을 IVF로 가속
+    python -m src.rag bench --rows 1000000 --dim 768   # 임베딩/BM25/하이브리드 검색 지연 측정 (합성 데이터)
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ..metrics import add_metrics_arguments, configure_metrics
+from .bm25 import BM25Index
+from .index import DEFAULT_INDEX_DIR, SEARCH_MODES, RagIndex, rrf
+from .ingest import DEFAULT_BATCH_SIZE, DEFAULT_CHECKPOINT_EVERY, ingest
+from .text import DEFAULT_CHUNK_CHARS
+from .vector_store import BLOCK_ROWS, DEFAULT_NPROBE, IVF_MIN_ROWS, VectorStore, normalize
+
+
+def cmd_ingest(args: argparse.Namespace):
+    index = RagIndex(args.index, embed_model=args.embed_model)
+    print(f"\n📥 문서 수집: {', '.join(map(str, args.paths))} → {args.index} (임베딩: {index.embed_model})")
+    marks = {"added": "➕", "updated": "🔄", "empty": "⚪"}
+
+    def on_file(path: Path, status: str, chunks: int):
+        # 바뀌지 않은 파일은 개수만 표시 (중단 후 다시 실행하면 대부분 건너뜀)
+        if status in marks:
+            print(f"  {marks[status]} {path}" + (f" ({chunks}개 청크)" if chunks else ""))
+
+    start = time.time()
+    try:
+        counts = ingest(index, args.paths, max_chars=args.chunk_chars, on_file=on_file,
+                        batch_size=args.batch_size, max_in_flight=args.max_in_flight, workers=args.workers)
+    except KeyboardInterrupt:
+        print(f"\n⚠️  중단됨: 마지막 체크포인트까지 저장했습니다 (청크 {len(index)}개). 다시 실행하면 이어서 처리합니다.")
+        return
+    elapsed = time.time() - start
+    print(f"\n✅ 추가 {counts['added']} · 갱신 {counts['updated']} · 건너뜀 {counts['skipped']} "
+          f"· 청크 {counts['chunks']}개 ({elapsed:.1f}초, {counts['chunks'] / max(elapsed, 1e-9):.0f} 청크/초)")
+    print(f"   색인: 원본 {len(index.sources)}개, 청크 {len(index)}개")
+
+
+def cmd_query(args: argparse.Namespace):
+    index = RagIndex(args.index)
+    start = time.perf_counter()
+    results = index.search(args.question, k=args.k, mode=args.mode)
+    elapsed = time.perf_counter() - start
+    print(f"\n🔎 {args.question} ({args.mode}, {elapsed * 1000:.1f}ms, 질문 임베딩 포함)")
+    for rank, result in enumerate(results, 1):
+        ranks = f"BM25 {result.bm25_rank or '-'} · 임베딩 {result.vector_rank or '-'}"
+        print(f"\n  {rank}. {result.source} #{result.id} ({result.score:.4f} · {ranks})")
+        print(f"     {result.text[:200]}")
+    if not results:
+        print("  결과 없음")
+
+
+def cmd_delete(args: argparse.Namespace):
+    index = RagIndex(args.index)
+    for source in args.sources:
+        print(f"🗑️  {source}: 청크 {index.delete_source(source)}개 삭제")
+
+
+def cmd_stats(args: argparse.Namespace):
+    index = RagIndex(args.index)
+    print(f"\n📚 RAG 색인: {args.index}")
+    for key, value in index.stats().items():
+        print(f"   - {key}: {value}")
+
+
+def cmd_train_ivf(args: argparse.Namespace):
+    index = RagIndex(args.index)
+    print(f"\n🧮 IVF 학습: 임베딩 {index.vectors.count}개")
+    start = time.time()
+    index.vectors.train_ivf(args.lists, progress=lambda done, total: print(f"\r   배정 {done}/{total}", end=""))
+    print(f"\n✅ 클러스터 {index.vectors.n_lists}개 ({time.time() - start:.1f}초)")
+
+
+def _latency(fn, queries) -> float:
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def _bench_bm25(args: argparse.Namespace, directory: Path, rng: np.random.Generator,
+                probabilities: np.ndarray) -> BM25Index:
+    """합성 청크를 수집과 같은 방식(체크포인트마다 세그먼트 저장)으로 색인하고 다시 열기"""
+    names = np.array([f"t{i}" for i in range(args.vocab)], dtype=object)
+    bm25 = BM25Index()
+    start = time.time()
+    for block in range(0, args.rows, DEFAULT_CHECKPOINT_EVERY):
+        n = min(DEFAULT_CHECKPOINT_EVERY, args.rows - block)
+        lengths = rng.poisson(args.chunk_terms, size=n)
+        tokens = rng.choice(args.vocab, size=int(lengths.sum()), p=probabilities)
+        for doc, terms in enumerate(np.split(tokens, np.cumsum(lengths)[:-1])):
+            terms, counts = np.unique(terms, return_counts=True)
+            bm25.add(block + doc, dict(zip(names[terms].tolist(), counts.tolist())))
+        bm25.save(directory, block + n)
+        bm25.prune(directory)
+        print(f"\r   생성 {block + n}/{args.rows}", end="")
+    print(f"\n   BM25 색인: {time.time() - start:.1f}초, 세그먼트 {bm25.stats()['segments']}개, "
+          f"posting {bm25.stats()['postings']}개")
+
+    manifest = bm25.save(directory, args.rows)
+    start = time.perf_counter()
+    loaded = BM25Index()
+    loaded.load(directory, manifest, bm25.alive[:args.rows])
+    print(f"   BM25 열기 (세그먼트 memmap): {(time.perf_counter() - start) * 1000:.0f}ms")
+    return loaded
+
+
+def cmd_bench(args: argparse.Namespace):
+    """합성 데이터로 임베딩(정확/IVF), BM25, 하이브리드 검색의 지연/재현율 측정"""
+    rng = np.random.default_rng(0)
+    # 실제 임베딩처럼 군집이 있는 데이터 (완전 무작위 벡터는 IVF에 가장 불리함)
+    centers = normalize(rng.standard_normal((max(1, args.rows // 1000), args.dim), dtype=np.float32))
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as directory:
+        store = VectorStore(Path(directory), dim=args.dim)
+        store.reserve(args.rows)
+        print(f"\n🧪 임베딩 검색 벤치마크: {args.rows}행 × {args.dim}차원 "
+              f"({args.rows * args.dim * 4 / 1e9:.1f} GB memmap)")
+        for start in range(0, args.rows, BLOCK_ROWS):
+            n = min(BLOCK_ROWS, args.rows - start)
+            noise = rng.standard_normal((n, args.dim), dtype=np.float32) * 0.05
+            store.add(centers[rng.integers(len(centers), size=n)] + noise)
+            print(f"\r   생성 {start + n}/{args.rows}", end="")
+        print()
+
+        queries = [normalize(centers[i % len(centers)] + rng.standard_normal(args.dim, dtype=np.float32) * 0.05)
+                   for i in range(args.queries)]
+        truth = [set(store.search(q, args.k, exact=True)[0].tolist()) for q in queries]  # 정답 + 페이지 캐시 예열
+        exact_ms = _latency(lambda q: store.search(q, args.k, exact=True), queries)
+        print(f"   정확 검색 (블록 행렬 곱): p50 {exact_ms:.1f}ms")
+
+        start = time.time()
+        store.train_ivf(args.lists)
+        print(f"   IVF 학습: 클러스터 {store.n_lists}개 ({time.time() - start:.1f}초)")
+        for nprobe in (max(1, DEFAULT_NPROBE // 2), DEFAULT_NPROBE, DEFAULT_NPROBE * 4):
+            # 행 수가 IVF_MIN_ROWS보다 적어도 IVF 경로를 측정하도록 직접 호출
+            ivf_ms = _latency(lambda q: store._ivf(q, args.k, nprobe), queries)
+            recall = np.mean([len(t & set(store._ivf(q, args.k, nprobe)[0].tolist())) / args.k
+                              for q, t in zip(queries, truth)])
+            print(f"   IVF nprobe={nprobe}: p50 {ivf_ms:.2f}ms · recall@{args.k} {recall:.2f}")
+
+        print(f"\n🧪 BM25 벤치마크: {args.rows}청크 × 평균 {args.chunk_terms}검색어 (어휘 {args.vocab}개, Zipf)")
+        # 실제 bigram처럼 상위 몇 개("니다", "습니" 등)가 거의 모든 청크에 나오는 분포
+        probabilities = 1 / np.arange(1, args.vocab + 1)
+        probabilities /= probabilities.sum()
+        bm25 = _bench_bm25(args, Path(directory) / "bm25", rng, probabilities)
+        terms = [[f"t{i}" for i in rng.choice(args.vocab, size=args.query_terms, p=probabilities)]
+                 for _ in range(args.queries)]
+        truth = [set(bm25.search(t, args.k, exact=True)[0].tolist()) for t in terms]
+        exact_ms = _latency(lambda t: bm25.search(t, args.k, exact=True), terms)
+        bm25_ms = _latency(lambda t: bm25.search(t, args.k), terms)
+        recall = np.mean([len(t & set(bm25.search(q, args.k)[0].tolist())) / args.k for q, t in zip(terms, truth)])
+        print(f"   BM25 정확 (모든 posting): p50 {exact_ms:.1f}ms")
+        print(f"   BM25 (흔한 검색어는 후보에서만): p50 {bm25_ms:.2f}ms · recall@{args.k} {recall:.2f}")
+
+        # RagIndex.search(mode="hybrid")와 같은 후보 수/합치기 (청크 본문 읽기와 질문 임베딩 제외)
+        def hybrid(pair):
+            query, vector = pair
+            ids, _ = bm25.search(query, args.candidates)
+            vector_ids, _ = store.search(vector, args.candidates)
+            scores = rrf({int(i): rank for rank, i in enumerate(ids, 1)},
+                         {int(i): rank for rank, i in enumerate(vector_ids, 1)})
+            return sorted(scores, key=scores.get, reverse=True)[:args.k]
+
+        hybrid_ms = _latency(hybrid, list(zip(terms, queries)))
+        print(f"   하이브리드 (BM25 + {'IVF' if store.n_lists and store.count >= IVF_MIN_ROWS else '정확 검색'}"
+              f" + RRF, 후보 {args.candidates}개): p50 {hybrid_ms:.2f}ms")
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="RAG 색인 관리")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX_DIR, help=f"색인 디렉토리 (기본값: {DEFAULT_INDEX_DIR})")
+    add_metrics_arguments(parser)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("ingest", help="문서 추가/갱신")
+    p.add_argument("paths", nargs="+", type=Path, help="파일 또는 디렉토리 (.md, .txt)")
+    p.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS,
+                   help=f"청크 최대 글자 수 (기본값: {DEFAULT_CHUNK_CHARS})")
+    p.add_argument("--embed-model", default=None, help="임베딩 모델 (새 색인만, 기본값: OLLAMA_EMBED_MODEL)")
+    p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                   help=f"/api/embed 요청 하나에 묶을 청크 수 (기본값: {DEFAULT_BATCH_SIZE})")
+    p.add_argument("--max-in-flight", type=int, default=None, help="동시에 보낼 임베딩 요청 수 (기본값: 서버 수 × 2)")
+    p.add_argument("--workers", type=int, default=None, help="청크 분할 프로세스 수 (기본값: CPU 수, 0: 메인 스레드)")
+    p.set_defaults(func=cmd_ingest)
+
+    p = commands.add_parser("query", help="검색")
+    p.add_argument("question", help="질문")
+    p.add_argument("--k", type=int, default=5, help="결과 수 (기본값: 5)")
+    p.add_argument("--mode", choices=SEARCH_MODES, default="hybrid", help="검색 방식 (기본값: hybrid)")
+    p.set_defaults(func=cmd_query)
+
+    p = commands.add_parser("delete", help="원본의 청크 삭제")
+    p.add_argument("sources", nargs="+", help="원본 경로 (ingest 때와 같은 형태)")
+    p.set_defaults(func=cmd_delete)
+
+    p = commands.add_parser("stats", help="색인 통계")
+    p.set_defaults(func=cmd_stats)
+
+    p = commands.add_parser("train-ivf", help="임베딩 검색용 IVF 색인 생성")
+    p.add_argument("--lists", type=int, default=None, help="클러스터 수 (기본값: √청크 수)")
+    p.set_defaults(func=cmd_train_ivf)
+
+    p = commands.add_parser("bench", help="합성 데이터로 임베딩/BM25/하이브리드 검색 지연 측정")
+    p.add_argument("--rows", type=int, default=1_000_000, help="행 수 (기본값: 1000000)")
+    p.add_argument("--dim", type=int, default=768, help="차원 (기본값: 768)")
+    p.add_argument("--k", type=int, default=5, help="결과 수 (기본값: 5)")
+    p.add_argument("--queries", type=int, default=50, help="질문 수 (기본값: 50)")
+    p.add_argument("--lists", type=int, default=None, help="IVF 클러스터 수 (기본값: √행 수)")
+    p.add_argument("--chunk-terms", type=int, default=200, help="청크당 평균 검색어 수 (기본값: 200)")
+    p.add_argument("--vocab", type=int, default=50_000, help="BM25 어휘 크기 (기본값: 50000)")
+    p.add_argument("--query-terms", type=int, default=10, help="질문당 검색어 수 (기본값: 10)")
+    p.add_argument("--candidates", type=int, default=50, help="하이브리드에서 합치기 전 각 검색의 후보 수 (기본값: 50)")
+    p.add_argument("--tmp-dir", default=None, help="memmap 임시 파일 위치")
+    p.set_defaults(func=cmd_bench)
+
+    args = parser.parse_args()
+    configure_metrics(args, call_site="rag")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
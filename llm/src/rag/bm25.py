@@ -0,0 +1,375 @@
+"""
+BM25 역색인
+체크포인트마다 그 사이에 추가된 청크의 posting을 CSR 배열(.npy) 세그먼트로 저장하고, 열 때는
+memmap으로 연결하므로 청크 본문을 다시 읽지 않습니다. 세그먼트는 바로 앞 세그먼트보다 커지면
+합쳐서 (삭제된 청크의 posting은 이때 버림) 개수가 청크 수의 로그 수준으로 유지됩니다.
+
+"니다", "습니" 같은 흔한 bigram은 posting이 청크 수에 가깝게 길어서 그대로 점수를 더하면 검색 시간이
+청크 수에 비례합니다. 그래서 드문 검색어부터 posting 전체로 점수를 더하고, 문서 빈도가 청크 수의
+MAX_DF_RATIO를 넘는 검색어는 후보가 LOOKUP_CANDIDATES개 이상 모인 뒤라면 그때까지 점수가 높은 후보 청크에서만
+(청크 ID로 정렬된 posting을 이진 탐색) 찾아 더합니다. 흔한 검색어는 idf가 작아 후보 밖의 청크가 순위에 들어오는 경우가 드뭅니다.
+exact=True면 모든 검색어의 posting 전체를 사용합니다.
+
+디렉토리 구성:
+    terms.txt               검색어 목록 (줄 번호 = 검색어 ID, append-only)
+    {이름}.indptr.npy       검색어 ID별 posting 시작 위치
+    {이름}.ids.npy          청크 ID (검색어마다 오름차순)
+    {이름}.tfs.npy          등장 횟수
+    {이름}.lengths.npy      세그먼트 청크들의 검색어 수
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vector_store import top_k
+
+K1 = 1.2
+B = 0.75
+MAX_DF_RATIO = 0.05        # 문서 빈도가 청크 수의 이 비율을 넘는 검색어는 후보 청크에서만 찾음
+LOOKUP_CANDIDATES = 1000   # 흔한 검색어를 찾아 볼 후보 청크 수
+MERGE_BLOCK = 1 << 22      # 세그먼트를 합칠 때 한 번에 옮길 posting 수
+
+
+class _Segment:
+    """저장된 posting 묶음 (청크 ID start 이상 end 미만)"""
+
+    def __init__(self, name: str, start: int, end: int, dead: int, directory: Path):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.dead = dead  # posting이 남아 있는 삭제된 청크 수 (합칠 때 0)
+        self.indptr, self.ids, self.tfs, self.lengths = (
+            np.load(directory / f"{name}.{part}.npy", mmap_mode="r") for part in ("indptr", "ids", "tfs", "lengths"))
+
+    @property
+    def files(self) -> List[str]:
+        return [f"{self.name}.{part}.npy" for part in ("indptr", "ids", "tfs", "lengths")]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "start": self.start, "end": self.end, "dead": self.dead}
+
+
+class BM25Index:
+    """청크 ID(0부터 연속) 기준 BM25 역색인 (저장된 세그먼트 + 아직 저장하지 않은 posting)"""
+
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b = b
+        # 마지막 저장 이후 추가된 청크의 posting: 검색어 → (청크 ID 목록, 등장 횟수 목록)
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # 검색용 배열 (posting이 바뀌면 다시 만듦)
+        self._segments: List[_Segment] = []
+        self._vocab: Dict[str, int] = {}  # 검색어 → 검색어 ID (저장된 세그먼트 기준)
+        self._terms: List[str] = []
+        self._saved_terms = 0  # terms.txt에 기록된 검색어 수
+        self._next_segment = 0
+        self.lengths = np.zeros(1024, dtype=np.float32)
+        self.alive = np.zeros(1024, dtype=bool)
+        self._scores = np.zeros(1024, dtype=np.float32)  # 검색용 누적 버퍼 (검색 후 건드린 칸만 0으로 되돌림)
+        self._search_lock = threading.Lock()
+        self.size = 0        # 가장 큰 청크 ID + 1
+        self.saved = 0       # 세그먼트로 저장된 청크 수
+        self.n_docs = 0      # 살아 있는 청크 수
+        self.total_length = 0.0
+
+    def _grow(self, size: int):
+        capacity = len(self.lengths)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        self.lengths = np.resize(self.lengths, capacity)
+        self.lengths[self.size:] = 0
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        self.alive = alive
+        with self._search_lock:
+            self._scores = np.zeros(capacity, dtype=np.float32)
+
+    def add(self, doc_id: int, counts: Dict[str, int]):
+        """청크 추가 (counts: 검색어별 등장 횟수)"""
+        self._grow(doc_id + 1)
+        length = sum(counts.values())
+        for term, tf in counts.items():
+            ids, tfs = self._postings.setdefault(term, ([], []))
+            ids.append(doc_id)
+            tfs.append(tf)
+            self._arrays.pop(term, None)
+        self.lengths[doc_id] = length
+        self.alive[doc_id] = True
+        self.size = max(self.size, doc_id + 1)
+        self.n_docs += 1
+        self.total_length += length
+
+    def remove(self, doc_id: int):
+        """청크 삭제 (posting은 남겨 두고 검색 시 alive로 거름, 세그먼트를 합칠 때 버림)"""
+        if doc_id >= self.size or not self.alive[doc_id]:
+            return
+        for segment in self._segments:
+            if segment.start <= doc_id < segment.end:
+                segment.dead += 1
+        self.alive[doc_id] = False
+        self.n_docs -= 1
+        self.total_length -= float(self.lengths[doc_id])
+
+    def load(self, directory: Path, manifest: Dict[str, Any], alive: np.ndarray):
+        """
+        저장된 세그먼트 연결
+
+        Args:
+            directory: 세그먼트 디렉토리
+            manifest: save()가 반환한 값 (체크포인트에 기록된 것)
+            alive: 청크별 삭제 여부 (임베딩 저장소의 alive 플래그, 세그먼트가 덮는 청크 수만큼)
+        """
+        n_terms = manifest["terms"]
+        terms_path = directory / "terms.txt"
+        data = terms_path.read_bytes() if n_terms else b""
+        lines = data.split(b"\n")[:n_terms]
+        if len(lines) < n_terms:
+            raise ValueError(f"검색어 목록이 체크포인트보다 짧습니다: {terms_path}")
+        if n_terms:
+            # 체크포인트 이후에 추가된 검색어는 잘라 냄
+            with open(terms_path, "ab") as f:
+                f.truncate(sum(len(line) + 1 for line in lines))
+        self._terms = [line.decode("utf-8") for line in lines]
+        self._vocab = {term: i for i, term in enumerate(self._terms)}
+        self._saved_terms = n_terms
+        self._next_segment = manifest["next"]
+        self._segments = [_Segment(entry["name"], entry["start"], entry["end"], entry["dead"], directory)
+                          for entry in manifest["segments"]]
+        self.saved = self._segments[-1].end if self._segments else 0
+        if len(alive) != self.saved:
+            raise ValueError("세그먼트와 alive 플래그의 청크 수가 다릅니다")
+
+        self.size = 0
+        self._grow(max(self.saved, 1))
+        for segment in self._segments:
+            self.lengths[segment.start:segment.end] = segment.lengths
+        self.alive[:self.saved] = alive
+        self.size = self.saved
+        self.n_docs = int(np.count_nonzero(alive))
+        self.total_length = float(self.lengths[:self.saved][alive].sum(dtype=np.float64))
+
+    def save(self, directory: Path, end: int) -> Dict[str, Any]:
+        """
+        마지막 저장 이후 추가된 청크를 세그먼트로 기록하고 필요하면 세그먼트를 합침
+
+        이전 세그먼트 파일은 지우지 않는다 (반환값을 체크포인트에 기록한 뒤 prune()으로 정리).
+
+        Args:
+            directory: 세그먼트 디렉토리
+            end: 저장할 청크 수 (마지막 청크 ID + 1, 삭제된 채로 끝나는 청크 포함)
+
+        Returns:
+            체크포인트에 기록할 값 (load()에 전달)
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        if end > self.saved:
+            self._grow(end)
+            self.size = max(self.size, end)
+            self._write_delta(directory, end)
+        # 바로 앞 세그먼트보다 커지면 합침 → 세그먼트 수는 청크 수의 로그 수준
+        while len(self._segments) >= 2 and \
+                self._segments[-2].end - self._segments[-2].start <= self._segments[-1].end - self._segments[-1].start:
+            self._merge(directory, self._segments[-2:])
+        return {"terms": len(self._terms), "next": self._next_segment,
+                "segments": [segment.to_dict() for segment in self._segments]}
+
+    def prune(self, directory: Path):
+        """저장된 세그먼트에 속하지 않는 파일 삭제 (합쳐진 세그먼트, 중단된 저장의 잔여물)"""
+        keep = {"terms.txt", *(name for segment in self._segments for name in segment.files)}
+        for path in directory.glob("*.npy"):
+            if path.name not in keep:
+                path.unlink(missing_ok=True)
+
+    def _write_delta(self, directory: Path, end: int):
+        """아직 저장하지 않은 posting을 세그먼트 하나로 기록"""
+        new_terms = [term for term in self._postings if term not in self._vocab]
+        for term in new_terms:
+            self._vocab[term] = len(self._terms)
+            self._terms.append(term)
+        if new_terms:
+            # 처음 저장할 때는 중단된 이전 저장이 남긴 목록을 덮어씀 (load()는 체크포인트 이후 줄을 잘라 냄)
+            with open(directory / "terms.txt", "ab" if self._saved_terms else "wb") as f:
+                f.write("".join(term + "\n" for term in new_terms).encode("utf-8"))
+        self._saved_terms = len(self._terms)
+
+        terms = sorted(self._postings, key=self._vocab.__getitem__)
+        counts = np.zeros(len(self._terms), dtype=np.int64)
+        for term in terms:
+            counts[self._vocab[term]] = len(self._postings[term][0])
+        ids = np.fromiter((i for term in terms for i in self._postings[term][0]), dtype=np.int32, count=int(counts.sum()))
+        tfs = np.fromiter((tf for term in terms for tf in self._postings[term][1]), dtype=np.float32, count=len(ids))
+        keep = self.alive[ids]
+        if not keep.all():
+            counts = self._kept_counts(np.concatenate(([0], np.cumsum(counts))), keep)
+            ids, tfs = ids[keep], tfs[keep]
+        self._append_segment(directory, self.saved, end, np.concatenate(([0], np.cumsum(counts))), ids, tfs)
+        self._postings.clear()
+        self._arrays.clear()
+
+    @staticmethod
+    def _kept_counts(indptr: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        """검색어별로 keep인 posting 수"""
+        kept = np.concatenate(([0], np.cumsum(keep, dtype=np.int64)))
+        return kept[indptr[1:]] - kept[indptr[:-1]]
+
+    def _merge(self, directory: Path, segments: Sequence[_Segment]):
+        """연속된 세그먼트를 하나로 합침 (삭제된 청크의 posting은 버림)"""
+        n_terms = max(len(segment.indptr) for segment in segments) - 1
+        kept_counts = []
+        for segment in segments:
+            counts = np.zeros(n_terms, dtype=np.int64)
+            counts[:len(segment.indptr) - 1] = (self._kept_counts(segment.indptr, self.alive[segment.ids])
+                                                if segment.dead else np.diff(segment.indptr))
+            kept_counts.append(counts)
+        indptr = np.concatenate(([0], np.cumsum(np.sum(kept_counts, axis=0))))
+        ids = np.empty(int(indptr[-1]), dtype=np.int32)
+        tfs = np.empty(len(ids), dtype=np.float32)
+        # 검색어마다 앞 세그먼트의 posting 뒤에 이어 붙이도록 위치를 계산해서 복사 (정렬 없음, 청크 ID 순서 유지).
+        # 큰 세그먼트도 임시 배열이 MERGE_BLOCK 크기를 넘지 않도록 나눠서 처리
+        base = indptr[:-1].copy()
+        for segment, counts in zip(segments, kept_counts):
+            offset = base - (np.cumsum(counts) - counts)  # 검색어별 (합친 위치 - 이 세그먼트 안의 위치)
+            kept = 0
+            for lo in range(0, len(segment.ids), MERGE_BLOCK):
+                hi = min(lo + MERGE_BLOCK, len(segment.ids))
+                block_ids, block_tfs = segment.ids[lo:hi], segment.tfs[lo:hi]
+                terms = np.searchsorted(segment.indptr, np.arange(lo, hi), side="right") - 1
+                if segment.dead:
+                    keep = self.alive[block_ids]
+                    block_ids, block_tfs, terms = block_ids[keep], block_tfs[keep], terms[keep]
+                positions = offset[terms] + np.arange(kept, kept + len(terms))
+                ids[positions] = block_ids
+                tfs[positions] = block_tfs
+                kept += len(terms)
+            base += counts
+        del self._segments[-len(segments):]
+        self.saved = segments[0].start
+        self._append_segment(directory, segments[0].start, segments[-1].end, indptr, ids, tfs)
+
+    def _append_segment(self, directory: Path, start: int, end: int, indptr: np.ndarray,
+                        ids: np.ndarray, tfs: np.ndarray):
+        """세그먼트 파일 기록 후 연결"""
+        name = f"seg{self._next_segment:06d}"
+        self._next_segment += 1
+        for part, array in (("indptr", indptr.astype(np.int64, copy=False)), ("ids", ids), ("tfs", tfs),
+                            ("lengths", self.lengths[start:end])):
+            np.save(directory / f"{name}.{part}.npy", array)
+        self._segments.append(_Segment(name, start, end, 0, directory))
+        self.saved = end
+
+    def _impact(self, ids: np.ndarray, tfs: np.ndarray, avg_length: float) -> np.ndarray:
+        """BM25 검색어 점수에서 idf × (k1 + 1)을 뺀 부분 (1 미만)"""
+        return tfs / (tfs + self.k1 * (1 - self.b + self.b * self.lengths[ids] / avg_length))
+
+    def _posting(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self._postings.get(term)
+            if posting is None:
+                return None
+            arrays = (np.asarray(posting[0], dtype=np.int32), np.asarray(posting[1], dtype=np.float32))
+            self._arrays[term] = arrays
+        return arrays
+
+    def _parts(self, term: str, segments: Sequence[_Segment]) -> Tuple[int, List[Tuple[np.ndarray, np.ndarray, bool]]]:
+        """
+        검색어의 posting 조각
+
+        Returns:
+            (문서 빈도 하한, [(청크 ID, 등장 횟수, 삭제된 청크가 섞여 있을 수 있는지)])
+        """
+        df = 0
+        parts = []
+        term_id = self._vocab.get(term)
+        if term_id is not None:
+            for segment in segments:
+                if term_id + 1 >= len(segment.indptr):
+                    continue
+                lo, hi = int(segment.indptr[term_id]), int(segment.indptr[term_id + 1])
+                if hi > lo:
+                    parts.append((segment.ids[lo:hi], segment.tfs[lo:hi], segment.dead > 0))
+                    df += max(hi - lo - segment.dead, 0)
+        posting = self._posting(term)
+        if posting is not None:
+            ids, tfs = posting
+            alive = self.alive[ids]
+            if alive.any():
+                parts.append((ids[alive], tfs[alive], False))
+                df += len(parts[-1][0])
+        return df, parts
+
+    def _idf(self, df: int) -> float:
+        return float(np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)))
+
+    def search(self, terms: List[str], k: int = 10, exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 상위 k개
+
+        Args:
+            terms: 질문의 검색어
+            k: 결과 수
+            exact: 흔한 검색어도 posting 전체로 점수 계산 (기본값: 후보 청크에서만 찾음)
+
+        Returns:
+            (청크 ID 배열, 점수 배열), 점수 내림차순. 검색어가 하나도 없으면 빈 배열.
+        """
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if not self.n_docs:
+            return empty
+        avg_length = self.total_length / self.n_docs
+        segments = list(self._segments)  # 저장 중에 목록이 바뀌어도 이번 검색은 같은 세그먼트 사용
+        postings = sorted((self._parts(term, segments) for term in set(terms)), key=lambda posting: posting[0])
+        postings = [posting for posting in postings if posting[1]]
+        limit = self.n_docs if exact else MAX_DF_RATIO * self.n_docs
+
+        # 1단계: 드문 검색어부터 posting 전체로 점수 누적. 후보가 max(k, LOOKUP_CANDIDATES)개가 될 때까지는
+        # 흔한 검색어도 누적한다 (드문 검색어가 나오는 청크만으로는 작은 코퍼스에서 k개를 못 채움)
+        found: List[np.ndarray] = []
+        n_found = 0
+        scored = 0
+        with self._search_lock:
+            scores = self._scores
+            for df, parts in postings:
+                if df > limit and n_found >= max(k, LOOKUP_CANDIDATES):
+                    break
+                scored += 1
+                ids = np.concatenate([part[0] for part in parts])
+                tfs = np.concatenate([part[1] for part in parts])
+                if any(part[2] for part in parts):
+                    alive = self.alive[ids]
+                    ids, tfs = ids[alive], tfs[alive]
+                if not len(ids):
+                    continue
+                contribution = self._idf(len(ids)) * (self.k1 + 1) * self._impact(ids, tfs, avg_length)
+                # 세그먼트/미저장 posting은 청크 범위가 겹치지 않아 한 검색어 안에서 청크가 한 번만 나옴
+                found.append(ids[scores[ids] == 0])  # 점수는 항상 양수이므로 0이면 처음 나온 청크
+                n_found += len(found[-1])
+                scores[ids] += contribution
+            if not found:
+                return empty
+            ids = np.concatenate(found)
+            values = scores[ids]
+            scores[ids] = 0
+
+        # 2단계: 흔한 검색어는 점수 상위 후보 청크에서만 이진 탐색으로 찾아 더함
+        if scored < len(postings):
+            head = top_k(values, max(LOOKUP_CANDIDATES, k))
+            order = np.argsort(ids[head])
+            ids, values = ids[head][order], values[head][order]
+            for df, parts in postings[scored:]:
+                weight = self._idf(df) * (self.k1 + 1)
+                for part_ids, part_tfs, _ in parts:
+                    positions = np.minimum(np.searchsorted(part_ids, ids), len(part_ids) - 1)
+                    hit = part_ids[positions] == ids
+                    values[hit] += weight * self._impact(ids[hit], part_tfs[positions[hit]], avg_length)
+        order = top_k(values, k)
+        return ids[order].astype(np.int64), values[order]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"segments": len(self._segments), "terms": len(self._terms),
+                "postings": sum(len(segment.ids) for segment in self._segments)}
@@ -0,0 +1,319 @@
+"""
+RAG 색인
+청크 본문(chunks.jsonl), BM25 역색인, 임베딩 저장소를 청크 ID로 묶고 하이브리드 검색을 제공합니다.
+
+디렉토리 구성:
+    meta.json       임베딩 모델
+    chunks.jsonl    청크 레코드 (append-only: id, source, text, terms)
+    checkpoint.json 커밋된 청크 수 + 원본 파일별 fingerprint와 청크 ID (바뀐 파일만 다시 처리) + BM25 세그먼트 목록
+    offsets.i64     청크 ID → chunks.jsonl 바이트 위치 (append-only)
+    bm25/           BM25 역색인 세그먼트 (bm25.py)
+    vectors.*       임베딩 저장소 (vector_store.py)
+
+체크포인트 이후에 기록된 청크와 임베딩은 열 때 잘라 내므로, 중단된 수집은 마지막 체크포인트 상태에서 이어집니다.
+BM25 역색인과 청크 위치는 체크포인트마다 저장하고 열 때 memmap으로 연결하므로 chunks.jsonl을 다시 읽지 않습니다
+(세그먼트가 없는 이전 형식 색인만 한 번 chunks.jsonl에서 다시 만들고 저장).
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..ollama_client import EMBED_MODEL, OllamaClient, get_client
+from .bm25 import BM25Index
+from .text import term_counts, tokenize
+from .vector_store import VectorStore
+
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent.parent.parent / ".rag"
+RRF_K = 60  # Reciprocal Rank Fusion 상수 (순위가 낮은 결과의 영향을 줄임)
+SEARCH_MODES = ("hybrid", "bm25", "vector")
+
+
+def rrf(*rankings: Dict[int, int]) -> Dict[int, float]:
+    """Reciprocal Rank Fusion: 청크 ID → 순위(1부터) 사전들을 청크 ID → 점수로 합침"""
+    scores: Dict[int, float] = {}
+    for ranks in rankings:
+        for chunk_id, rank in ranks.items():
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank)
+    return scores
+
+
+class SearchResult:
+    """검색된 청크"""
+
+    __slots__ = ("id", "source", "text", "score", "bm25_rank", "vector_rank")
+
+    def __init__(self, id: int, source: str, text: str, score: float,
+                 bm25_rank: Optional[int] = None, vector_rank: Optional[int] = None):
+        self.id = id
+        self.source = source
+        self.text = text
+        self.score = score
+        self.bm25_rank = bm25_rank      # BM25 순위 (1부터, 후보에 없으면 None)
+        self.vector_rank = vector_rank  # 임베딩 검색 순위
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class RagIndex:
+    """청크 저장소 + BM25 + 임베딩 저장소"""
+
+    def __init__(self, directory: Path = DEFAULT_INDEX_DIR, client: Optional[OllamaClient] = None,
+                 embed_model: Optional[str] = None):
+        """
+        Args:
+            directory: 색인 디렉토리
+            client: 임베딩을 요청할 클라이언트 (기본값: 공유 클라이언트)
+            embed_model: 임베딩 모델 (기존 색인은 만들 때의 모델을 사용, 다르면 오류)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.client = client or get_client()
+
+        meta = self._read_json("meta.json") or {}
+        stored_model = meta.get("embed_model")
+        if stored_model and embed_model and stored_model != embed_model:
+            raise ValueError(f"색인의 임베딩 모델({stored_model})과 요청한 모델({embed_model})이 다릅니다")
+        self.embed_model = stored_model or embed_model or EMBED_MODEL
+        if not stored_model:
+            self._write_json("meta.json", {"embed_model": self.embed_model, "created": time.time()})
+
+        checkpoint = self._read_json("checkpoint.json")
+        if checkpoint is None:
+            # 체크포인트 도입 전 색인 (sources.json만 있음)
+            checkpoint = {"chunks": None, "sources": self._read_json("sources.json") or {}}
+        self.sources: Dict[str, Dict[str, Any]] = checkpoint["sources"]
+        self.vectors = VectorStore(self.directory)
+        self.bm25 = BM25Index()
+        self._offsets: List[int] = []  # 청크 ID → chunks.jsonl 바이트 위치
+        self._saved_offsets = 0          # offsets.i64에 기록된 수
+        self._lock = threading.Lock()
+        if not self._load_saved(checkpoint["chunks"], checkpoint.get("bm25")):
+            self._load_chunks(checkpoint["chunks"])
+
+    def _read_json(self, name: str) -> Optional[Any]:
+        try:
+            with open(self.directory / name, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, name: str, data: Any):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.directory / name)
+
+    @property
+    def _chunks_path(self) -> Path:
+        return self.directory / "chunks.jsonl"
+
+    @property
+    def _offsets_path(self) -> Path:
+        return self.directory / "offsets.i64"
+
+    @property
+    def _bm25_dir(self) -> Path:
+        return self.directory / "bm25"
+
+    def _load_saved(self, committed: Optional[int], bm25: Optional[Dict[str, Any]]) -> bool:
+        """체크포인트에 저장된 청크 위치와 BM25 세그먼트 연결 (없거나 맞지 않으면 False → chunks.jsonl에서 다시 만듦)"""
+        if not committed or bm25 is None or committed > self.vectors.count or not self._chunks_path.exists():
+            return False
+        try:
+            offsets = np.fromfile(self._offsets_path, dtype=np.int64, count=committed)
+            if len(offsets) < committed:
+                return False
+            self.bm25.load(self._bm25_dir, bm25, self.vectors._alive[:committed] != 0)
+        except (OSError, ValueError, KeyError):
+            self.bm25 = BM25Index()
+            return False
+        self._offsets = offsets.tolist()
+        self._saved_offsets = committed
+        with open(self._chunks_path, "rb") as f:
+            f.seek(self._offsets[-1])
+            end = self._offsets[-1] + len(f.readline())
+        # 체크포인트 이후에 기록된 청크와 위치는 잘라 냄
+        for path, size in ((self._chunks_path, end), (self._offsets_path, committed * 8)):
+            if path.stat().st_size > size:
+                with open(path, "ab") as f:
+                    f.truncate(size)
+        self.bm25.prune(self._bm25_dir)
+        self.vectors.count = committed
+        return True
+
+    def _load_chunks(self, committed: Optional[int]):
+        """chunks.jsonl을 읽어 위치 목록과 BM25 역색인 구성 (committed: 체크포인트의 청크 수)"""
+        if not self._chunks_path.exists():
+            self.vectors.count = 0
+            return
+        limit = self.vectors.count if committed is None else min(committed, self.vectors.count)
+        with open(self._chunks_path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # 기록 도중 종료되어 잘린 마지막 줄
+                if record["id"] != len(self._offsets) or record["id"] >= limit:
+                    break  # 체크포인트 이후에 기록된 청크
+                self._offsets.append(offset)
+                if self.vectors._alive[record["id"]]:
+                    self.bm25.add(record["id"], record["terms"])
+                offset += len(line)
+        # 잘린 꼬리는 잘라 내서 다음 추가가 온전한 줄부터 시작하게 한다
+        if offset < self._chunks_path.stat().st_size:
+            with open(self._chunks_path, "ab") as f:
+                f.truncate(offset)
+        self.vectors.count = len(self._offsets)
+        if self._offsets:
+            self._checkpoint()  # 다음부터는 저장된 세그먼트로 열림
+
+    def __len__(self) -> int:
+        return self.bm25.n_docs
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """텍스트 임베딩 (한 요청으로 묶어서)"""
+        if not len(texts):
+            return np.zeros((0, self.vectors.dim or 0), dtype=np.float32)
+        return np.array(self.client.embed(list(texts), model=self.embed_model), dtype=np.float32)
+
+    def add_chunks(self, source: str, chunks: Sequence[str], vectors: np.ndarray,
+                   fingerprint: Optional[str] = None, commit: bool = True,
+                   terms: Optional[Sequence[Dict[str, int]]] = None) -> List[int]:
+        """
+        원본 하나의 청크 추가 (이미 있던 원본이면 이전 청크를 지우고 교체)
+
+        Args:
+            source: 원본 이름 (파일 경로 등)
+            chunks: 청크 본문
+            vectors: 청크 임베딩 (chunks와 같은 순서)
+            fingerprint: 원본 변경 감지용 값 (수정 시각 + 크기 등)
+            commit: 바로 체크포인트 기록 (False면 호출한 쪽이 checkpoint() 호출, 대량 수집용)
+            terms: 청크별 검색어 빈도 (미리 계산했으면 전달, 없으면 여기서 계산)
+
+        Returns:
+            부여된 청크 ID
+        """
+        if len(chunks) != len(vectors):
+            raise ValueError("청크 수와 임베딩 수가 다릅니다")
+        with self._lock:
+            self._delete_source(source)
+            ids: List[int] = []
+            if len(chunks):
+                start = len(self._offsets)
+                with open(self._chunks_path, "ab") as f:
+                    offset = f.tell()
+                    for i, text in enumerate(chunks):
+                        counts = terms[i] if terms is not None else term_counts(text)
+                        line = (json.dumps({"id": start + i, "source": source, "text": text, "terms": counts},
+                                           ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                        f.write(line)
+                        self._offsets.append(offset)
+                        offset += len(line)
+                        self.bm25.add(start + i, counts)
+                        ids.append(start + i)
+                self.vectors.add(vectors, flush=False)
+            self.sources[source] = {"fingerprint": fingerprint, "chunks": ids, "updated": time.time()}
+            if commit:
+                self._checkpoint()
+        return ids
+
+    def _checkpoint(self):
+        self.vectors.flush()
+        with open(self._offsets_path, "ab") as f:
+            f.truncate(self._saved_offsets * 8)
+            np.asarray(self._offsets[self._saved_offsets:], dtype=np.int64).tofile(f)
+        self._saved_offsets = len(self._offsets)
+        bm25 = self.bm25.save(self._bm25_dir, len(self._offsets))
+        self._write_json("checkpoint.json", {"chunks": len(self._offsets), "sources": self.sources, "bm25": bm25})
+        self.bm25.prune(self._bm25_dir)
+
+    def checkpoint(self):
+        """지금까지 추가한 청크를 디스크에 반영하고 체크포인트 기록"""
+        with self._lock:
+            self._checkpoint()
+
+    def _delete_source(self, source: str) -> int:
+        entry = self.sources.pop(source, None)
+        if not entry:
+            return 0
+        for chunk_id in entry["chunks"]:
+            self.bm25.remove(chunk_id)
+        return self.vectors.delete(entry["chunks"])
+
+    def delete_source(self, source: str) -> int:
+        """원본의 청크 삭제. 삭제한 청크 수 반환"""
+        with self._lock:
+            deleted = self._delete_source(source)
+            self._checkpoint()
+        return deleted
+
+    def is_current(self, source: str, fingerprint: str) -> bool:
+        """원본이 마지막으로 추가한 뒤 바뀌지 않았는지"""
+        entry = self.sources.get(source)
+        return entry is not None and entry.get("fingerprint") == fingerprint
+
+    def get_record(self, chunk_id: int) -> Dict[str, Any]:
+        """청크 레코드 (위치로 바로 읽음)"""
+        with open(self._chunks_path, "rb") as f:
+            f.seek(self._offsets[chunk_id])
+            return json.loads(f.readline())
+
+    def search(self, query: str, k: int = 5, mode: str = "hybrid", candidates: int = 50,
+               vector: Optional[np.ndarray] = None) -> List[SearchResult]:
+        """
+        질문과 관련된 청크 검색
+
+        hybrid는 BM25와 임베딩 검색의 상위 candidates개를 Reciprocal Rank Fusion으로 합친다.
+        고유명사/숫자는 BM25가, 표현이 다른 같은 의미는 임베딩이 잘 찾으므로 서로 보완된다.
+
+        Args:
+            query: 질문
+            k: 결과 수
+            mode: hybrid, bm25, vector
+            candidates: 합치기 전 각 검색의 후보 수
+            vector: 질문 임베딩 (없으면 요청)
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"알 수 없는 검색 방식: {mode}")
+        if not len(self):
+            return []
+        candidates = max(candidates, k)
+
+        bm25_ranks: Dict[int, int] = {}
+        vector_ranks: Dict[int, int] = {}
+        scores: Dict[int, float] = {}
+        if mode in ("hybrid", "bm25"):
+            ids, bm25_scores = self.bm25.search(tokenize(query), candidates)
+            bm25_ranks = {int(i): rank for rank, i in enumerate(ids, 1)}
+            if mode == "bm25":
+                scores = {int(i): float(s) for i, s in zip(ids, bm25_scores)}
+        if mode in ("hybrid", "vector"):
+            if vector is None:
+                vector = self.embed([query])[0]
+            ids, similarities = self.vectors.search(vector, candidates)
+            vector_ranks = {int(i): rank for rank, i in enumerate(ids, 1)}
+            if mode == "vector":
+                scores = {int(i): float(s) for i, s in zip(ids, similarities)}
+        if mode == "hybrid":
+            scores = rrf(bm25_ranks, vector_ranks)
+
+        results = []
+        for chunk_id in sorted(scores, key=scores.get, reverse=True)[:k]:
+            record = self.get_record(chunk_id)
+            results.append(SearchResult(chunk_id, record["source"], record["text"], scores[chunk_id],
+                                        bm25_ranks.get(chunk_id), vector_ranks.get(chunk_id)))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {"embed_model": self.embed_model, "sources": len(self.sources), "chunks": len(self),
+                **{f"bm25_{key}": value for key, value in self.bm25.stats().items()},
+                **{f"vectors_{key}": value for key, value in self.vectors.stats().items()}}
@@ -0,0 +1,212 @@
+"""
+문서 수집 파이프라인
+세 단계를 겹쳐서 실행합니다.
+    1. 청크 분할: 프로세스 풀에서 파일을 읽고 문장 단위로 나눔 (한국어 문장 분리를 메인 스레드 밖에서)
+    2. 임베딩: 여러 파일의 청크를 batch_size개씩 묶어 /api/embed로 요청하고 max_in_flight개까지 동시에 보냄
+       (OLLAMA_URLS로 서버가 여러 개면 백엔드 풀이 덜 바쁜 서버로 나눠 보냄)
+    3. 기록: 파일 순서대로 미리 늘려 둔 memmap에 쓰고 checkpoint_every개 청크마다 체크포인트 기록
+
+수정 시각과 크기가 그대로인 파일은 건너뛰므로, 중단된 수집을 다시 실행하면 마지막 체크포인트 이후 파일부터 이어서 처리합니다.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .index import RagIndex
+from .text import DEFAULT_CHUNK_CHARS, chunk_text, term_counts
+
+DEFAULT_SUFFIXES = (".md", ".txt")
+DEFAULT_BATCH_SIZE = 32          # /api/embed 한 요청에 묶을 청크 수
+DEFAULT_CHECKPOINT_EVERY = 2048  # 체크포인트 사이 청크 수
+
+
+def iter_files(paths: Iterable[Path], suffixes: Sequence[str] = DEFAULT_SUFFIXES) -> Iterator[Path]:
+    """경로 목록에서 문서 파일을 하나씩 찾음 (디렉토리는 재귀 탐색)"""
+    for path in map(Path, paths):
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.is_file() and child.suffix.lower() in suffixes:
+                    yield child
+        elif path.is_file():
+            yield path
+
+
+def fingerprint(path: Path) -> str:
+    """파일 변경 감지용 값 (수정 시각 + 크기)"""
+    stat = path.stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def read_chunks(path: str, max_chars: int) -> Tuple[List[str], List[Dict[str, int]]]:
+    """파일을 읽어 청크로 나누고 청크별 검색어 빈도 계산 (프로세스 풀에서 실행)"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        chunks = chunk_text(f.read(), max_chars)
+    return chunks, [term_counts(chunk) for chunk in chunks]
+
+
+class _FileJob:
+    """파일 하나의 수집 상태"""
+
+    __slots__ = ("path", "fingerprint", "status", "size", "chunks", "terms", "pieces", "remaining")
+
+    def __init__(self, path: Path, fingerprint: str, status: str, size: int):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.status = status            # added, updated, skipped (분할 후 청크가 없으면 empty)
+        self.size = size
+        self.chunks: List[str] = []
+        self.terms: List[Dict[str, int]] = []
+        self.pieces: List[np.ndarray] = []  # 배치 순서대로 도착한 임베딩 조각
+        self.remaining = 0              # 아직 임베딩을 받지 못한 청크 수
+
+
+def _chunk_jobs(jobs: List[_FileJob], max_chars: int, workers: int) -> Iterator[_FileJob]:
+    """파일 순서대로 청크 분할 결과 채움 (프로세스 풀에는 workers * 4개까지만 앞서 제출)"""
+    if workers <= 0:
+        for job in jobs:
+            if job.status != "skipped":
+                job.chunks, job.terms = read_chunks(str(job.path), max_chars)
+            yield job
+        return
+
+    executor = ProcessPoolExecutor(workers)
+    futures: Deque[Tuple[_FileJob, Optional[Future]]] = deque()
+    try:
+        for job in jobs:
+            futures.append((job, None if job.status == "skipped" else
+                            executor.submit(read_chunks, str(job.path), max_chars)))
+            while len(futures) > workers * 4:
+                yield _chunk_result(*futures.popleft())
+        while futures:
+            yield _chunk_result(*futures.popleft())
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _chunk_result(job: _FileJob, future: Optional[Future]) -> _FileJob:
+    if future is not None:
+        job.chunks, job.terms = future.result()
+    return job
+
+
+def ingest(index: RagIndex, paths: Iterable[Path], max_chars: int = DEFAULT_CHUNK_CHARS,
+           suffixes: Sequence[str] = DEFAULT_SUFFIXES,
+           on_file: Optional[Callable[[Path, str, int], None]] = None,
+           batch_size: int = DEFAULT_BATCH_SIZE, max_in_flight: Optional[int] = None,
+           workers: Optional[int] = None,
+           checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> Dict[str, int]:
+    """
+    파일을 색인에 추가
+
+    Args:
+        index: 대상 색인
+        paths: 파일 또는 디렉토리 목록
+        max_chars: 청크 최대 글자 수
+        suffixes: 수집할 확장자
+        on_file: 파일마다 호출 (경로, 상태: added/updated/skipped/empty, 청크 수)
+        batch_size: 임베딩 요청 하나에 묶을 청크 수
+        max_in_flight: 동시에 보낼 임베딩 요청 수 (기본값: 서버 수 × 2)
+        workers: 청크 분할 프로세스 수 (기본값: CPU 수, 0이면 메인 스레드에서 분할)
+        checkpoint_every: 체크포인트 사이 청크 수
+
+    Returns:
+        상태별 파일 수와 추가한 청크 수
+    """
+    counts = {"added": 0, "updated": 0, "skipped": 0, "empty": 0, "chunks": 0}
+    max_in_flight = max_in_flight or 2 * len(index.client.urls)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    jobs: List[_FileJob] = []
+    for path in iter_files(paths, suffixes):
+        source, current = str(path), fingerprint(path)
+        if index.is_current(source, current):
+            jobs.append(_FileJob(path, current, "skipped", 0))
+        else:
+            jobs.append(_FileJob(path, current, "updated" if source in index.sources else "added",
+                                 path.stat().st_size))
+    if all(job.status == "skipped" for job in jobs):
+        workers = 0  # 프로세스를 띄울 필요 없음
+    # 바이트 수로 청크 수를 추정해서 임베딩 파일을 미리 늘려 둠 (첫 배치에서 차원을 알게 된 뒤).
+    # 한글은 글자당 3바이트라 실제보다 많게 잡히지만 늘어난 부분은 쓰기 전까지 디스크를 차지하지 않는다.
+    estimated_rows = sum(job.size for job in jobs) // max_chars + len(jobs)
+
+    embed_pool = ThreadPoolExecutor(max_in_flight, thread_name_prefix="rag-embed")
+    batches: Deque[Tuple[Future, List[Tuple[_FileJob, int]]]] = deque()
+    pending: Deque[_FileJob] = deque()  # 임베딩을 기다리는 파일 (파일 순서)
+    texts: List[str] = []
+    owners: List[Tuple[_FileJob, int]] = []
+    state = {"since_checkpoint": 0, "reserved": False, "writing": False}
+
+    def submit():
+        batches.append((embed_pool.submit(index.embed, list(texts)), list(owners)))
+        texts.clear()
+        owners.clear()
+
+    def complete_oldest():
+        future, batch_owners = batches.popleft()
+        vectors = future.result()
+        if not state["reserved"]:
+            index.vectors.reserve(estimated_rows, dim=vectors.shape[1])
+            state["reserved"] = True
+        offset = 0
+        for job, n in batch_owners:
+            job.pieces.append(vectors[offset:offset + n])
+            job.remaining -= n
+            offset += n
+
+    def write_ready():
+        while pending and pending[0].remaining == 0:
+            job = pending.popleft()
+            if job.status != "skipped":
+                if not job.chunks:
+                    job.status = "empty"
+                vectors = np.concatenate(job.pieces) if job.pieces else np.zeros((0, 0), dtype=np.float32)
+                state["writing"] = True
+                index.add_chunks(str(job.path), job.chunks, vectors, fingerprint=job.fingerprint,
+                                 commit=False, terms=job.terms)
+                state["writing"] = False
+                counts["chunks"] += len(job.chunks)
+                state["since_checkpoint"] += len(job.chunks)
+                if state["since_checkpoint"] >= checkpoint_every:
+                    index.checkpoint()
+                    state["since_checkpoint"] = 0
+            counts[job.status] += 1
+            if on_file is not None:
+                on_file(job.path, job.status, len(job.chunks))
+            job.chunks, job.terms, job.pieces = [], [], []
+
+    try:
+        for job in _chunk_jobs(jobs, max_chars, workers):
+            pending.append(job)
+            job.remaining = len(job.chunks)
+            # 작은 파일 여러 개의 청크를 한 배치로 묶음
+            start = 0
+            while start < len(job.chunks):
+                n = min(batch_size - len(texts), len(job.chunks) - start)
+                texts.extend(job.chunks[start:start + n])
+                owners.append((job, n))
+                start += n
+                if len(texts) >= batch_size:
+                    submit()
+            while len(batches) >= max_in_flight:
+                complete_oldest()
+                write_ready()
+            write_ready()
+        if texts:
+            submit()
+        while batches:
+            complete_oldest()
+            write_ready()
+        write_ready()
+    finally:
+        embed_pool.shutdown(wait=False, cancel_futures=True)
+        # 파일 하나를 쓰는 도중에 중단됐으면 체크포인트를 남기지 않음 (열 때 이전 체크포인트까지 되돌림)
+        if not state["writing"]:
+            index.checkpoint()
+    return counts
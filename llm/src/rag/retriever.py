@@ -0,0 +1,97 @@
+"""
+검색 증강 프롬프트
+질문과 관련된 청크를 찾아 "참고 문서" 블록으로 프롬프트 앞에 붙입니다. 채팅 UI와 평가 스크립트가 함께 씁니다.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import requests
+
+from ..ollama_client import OllamaError
+from .index import DEFAULT_INDEX_DIR, SEARCH_MODES, RagIndex, SearchResult
+
+RAG_PROMPT = """다음 참고 문서를 근거로 질문에 답하세요.
+참고 문서에 없는 내용은 추측하지 말고 모른다고 답하세요.
+
+[참고 문서]
+{context}
+
+[질문]
+{question}"""
+
+DEFAULT_TOP_K = 4
+
+
+class Retriever:
+    """색인 검색 + 프롬프트 구성"""
+
+    def __init__(self, index: RagIndex, k: int = DEFAULT_TOP_K, mode: str = "hybrid"):
+        self.index = index
+        self.k = k
+        self.mode = mode
+        self.last_latency: Optional[float] = None  # 마지막 검색 시간 (초, 질문 임베딩 포함)
+
+    def retrieve(self, question: str) -> List[SearchResult]:
+        """관련 청크 검색 (임베딩 요청이 실패하면 BM25만 사용)"""
+        start = time.perf_counter()
+        try:
+            results = self.index.search(question, k=self.k, mode=self.mode)
+        except (requests.RequestException, OllamaError):
+            results = self.index.search(question, k=self.k, mode="bm25")
+        self.last_latency = time.perf_counter() - start
+        return results
+
+    @staticmethod
+    def build_prompt(question: str, results: List[SearchResult]) -> str:
+        """참고 문서를 붙인 프롬프트 (검색 결과가 없으면 질문 그대로)"""
+        if not results:
+            return question
+        context = "\n\n".join(f"({i}) [{Path(r.source).name}] {r.text}" for i, r in enumerate(results, 1))
+        return RAG_PROMPT.format(context=context, question=question)
+
+    def augment(self, question: str) -> Tuple[str, List[SearchResult]]:
+        """
+        검색 후 프롬프트 구성
+
+        Returns:
+            (프롬프트, 검색 결과)
+        """
+        results = self.retrieve(question)
+        return self.build_prompt(question, results), results
+
+
+_default_retriever: Optional[Retriever] = None
+
+
+def get_retriever() -> Optional[Retriever]:
+    """configure_rag로 설정한 검색기 (RAG를 켜지 않았으면 None)"""
+    return _default_retriever
+
+
+def add_rag_arguments(parser: argparse.ArgumentParser):
+    """RAG 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--rag-index", type=Path, nargs="?", const=DEFAULT_INDEX_DIR, default=None,
+        help=f"질문과 관련된 문서를 색인에서 찾아 프롬프트에 붙임 (경로 생략 시 {DEFAULT_INDEX_DIR})"
+    )
+    parser.add_argument(
+        "--rag-top-k", type=int, default=DEFAULT_TOP_K,
+        help=f"프롬프트에 붙일 청크 수 (기본값: {DEFAULT_TOP_K})"
+    )
+    parser.add_argument(
+        "--rag-mode", choices=SEARCH_MODES, default="hybrid",
+        help="검색 방식 (기본값: hybrid)"
+    )
+
+
+def configure_rag(args: argparse.Namespace) -> Optional[Retriever]:
+    """add_rag_arguments로 파싱한 인자로 기본 검색기 설정"""
+    global _default_retriever
+    if args.rag_index is None:
+        _default_retriever = None
+    else:
+        _default_retriever = Retriever(RagIndex(args.rag_index), k=args.rag_top_k, mode=args.rag_mode)
+    return _default_retriever
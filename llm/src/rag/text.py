@@ -0,0 +1,69 @@
+"""
+문서 분할과 토큰화
+한국어는 조사/어미가 단어에 붙으므로 BM25 검색어는 음절 bigram으로 나눕니다.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List
+
+_TOKEN_RE = re.compile(r"[가-힣]+|[a-z0-9]+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。…])\s+|\n\s*\n")
+
+DEFAULT_CHUNK_CHARS = 800
+DEFAULT_OVERLAP_SENTENCES = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    BM25 검색어 추출
+
+    영문/숫자는 소문자 단어, 한글은 음절 bigram ("인공지능이" → 인공, 공지, 지능, 능이)으로 나눈다.
+    형태소 분석기 없이도 "인공지능"과 "인공지능이"가 대부분의 검색어를 공유한다.
+    """
+    tokens: List[str] = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        if "가" <= word[0] <= "힣" and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def term_counts(text: str) -> Dict[str, int]:
+    """검색어별 등장 횟수"""
+    return dict(Counter(tokenize(text)))
+
+
+def split_sentences(text: str) -> List[str]:
+    """문장 단위 분리 (문장 부호 뒤 공백, 빈 줄 기준)"""
+    return [sentence.strip() for sentence in _SENTENCE_END_RE.split(text) if sentence and sentence.strip()]
+
+
+def chunk_text(text: str, max_chars: int = DEFAULT_CHUNK_CHARS,
+               overlap_sentences: int = DEFAULT_OVERLAP_SENTENCES) -> List[str]:
+    """
+    문장을 이어 붙여 max_chars 이하의 청크로 분할
+
+    청크 경계에 걸친 내용도 검색되도록 앞 청크의 마지막 문장을 다음 청크 앞에 반복한다.
+    한 문장이 max_chars보다 길면 글자 수로 자른다.
+    """
+    sentences: List[str] = []
+    for sentence in split_sentences(text):
+        sentences.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in sentences:
+        if current and size + len(sentence) + 1 > max_chars:
+            chunks.append(" ".join(current))
+            current = current[-overlap_sentences:] if overlap_sentences else []
+            size = sum(len(s) + 1 for s in current)
+            if size + len(sentence) + 1 > max_chars:
+                current, size = [], 0
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
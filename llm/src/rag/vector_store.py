@@ -0,0 +1,277 @@
+"""
+memmap 임베딩 저장소
+정규화된 float32 임베딩을 파일에 매핑한 행렬(행 = 청크 ID)로 보관합니다. 추가는 끝에 쓰고,
+삭제는 alive 플래그만 내리므로 전체를 다시 만들 필요가 없습니다.
+
+검색은 기본적으로 블록 단위 행렬-벡터 곱으로 정확한 top-k를 구합니다. 이 방식은 행 수에 비례해서
+느려지므로 (768차원 기준 10만 행 ≈ 수십 ms, 100만 행 ≈ 수백 ms, 메모리 대역폭 한계),
+큰 코퍼스는 train_ivf()로 IVF(역파일) 색인을 만들어 질문과 가까운 클러스터만 검색합니다.
+IVF는 근사 검색이므로 nprobe를 늘릴수록 정확도와 시간이 함께 늘어납니다.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BLOCK_ROWS = 65536          # 정확 검색 시 한 번에 곱할 행 수 (임시 메모리 제한)
+INITIAL_CAPACITY = 1024
+IVF_MIN_ROWS = 50_000       # 이보다 작으면 IVF가 있어도 정확 검색 (충분히 빠름)
+DEFAULT_NPROBE = 8
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수 상위 k개 위치 (내림차순)"""
+    if len(scores) > k:
+        index = np.argpartition(scores, -k)[-k:]
+    else:
+        index = np.arange(len(scores))
+    return index[np.argsort(-scores[index], kind="stable")]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """행 단위 L2 정규화 (내적 = 코사인 유사도)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+class VectorStore:
+    """memmap float32 임베딩 행렬 + alive 플래그 + 선택적 IVF 색인"""
+
+    def __init__(self, directory: Path, dim: Optional[int] = None):
+        """
+        Args:
+            directory: 저장 디렉토리 (vectors.f32, alive.u8, vectors.json)
+            dim: 임베딩 차원 (새로 만들 때만 필요, 기존 저장소는 파일에서 읽음)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.directory / "vectors.json"
+
+        meta = self._read_meta()
+        self.dim: Optional[int] = meta.get("dim", dim)
+        self.count: int = meta.get("count", 0)
+        self.capacity = 0
+        self.n_lists: int = meta.get("n_lists", 0)  # IVF 클러스터 수 (0이면 IVF 없음)
+        self._vectors: Optional[np.memmap] = None
+        self._alive: Optional[np.memmap] = None
+        self._assign: Optional[np.memmap] = None    # 행별 IVF 클러스터 번호
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: Optional[List[np.ndarray]] = None
+        self._lists_count = 0
+
+        if self.dim is not None:
+            self._map(max(meta.get("capacity", 0), INITIAL_CAPACITY))
+        if self.n_lists:
+            self._centroids = np.load(self.directory / "ivf_centroids.npy")
+
+    def _read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self):
+        meta = {"dim": self.dim, "count": self.count, "capacity": self.capacity, "n_lists": self.n_lists}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _map_file(self, name: str, dtype, shape: Tuple[int, ...]) -> np.memmap:
+        """파일을 필요한 크기로 늘리고 memmap으로 연결 (늘어난 부분은 0)"""
+        path = self.directory / name
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _map(self, capacity: int):
+        for array in (self._vectors, self._alive, self._assign):
+            if array is not None:
+                array.flush()
+        self.capacity = capacity
+        self._vectors = self._map_file("vectors.f32", np.float32, (capacity, self.dim))
+        self._alive = self._map_file("alive.u8", np.uint8, (capacity,))
+        if self.n_lists:
+            self._assign = self._map_file("ivf_assign.i32", np.int32, (capacity,))
+
+    def reserve(self, rows: int, dim: Optional[int] = None):
+        """
+        rows개를 더 추가할 수 있도록 파일 크기를 미리 늘림
+
+        Args:
+            rows: 더 추가할 행 수
+            dim: 임베딩 차원 (아직 아무것도 추가하지 않은 새 저장소일 때 필요)
+        """
+        if self.dim is None:
+            if dim is None:
+                raise ValueError("새 저장소는 임베딩 차원이 필요합니다")
+            self.dim = dim
+            self._map(INITIAL_CAPACITY)
+        needed = self.count + rows
+        if needed <= self.capacity:
+            return
+        # 조금씩 추가할 때는 두 배씩 늘리고, 한 번에 크게 예약하면 필요한 만큼만 늘림
+        self._map(max(needed, self.capacity * 2, INITIAL_CAPACITY))
+        self._write_meta()
+
+    def add(self, vectors: np.ndarray, flush: bool = True) -> np.ndarray:
+        """
+        임베딩 추가
+
+        Args:
+            vectors: 추가할 임베딩 (행 단위)
+            flush: 바로 디스크에 반영 (False면 호출한 쪽이 체크포인트에서 flush)
+
+        Returns:
+            부여된 행 번호 (청크 ID)
+        """
+        vectors = normalize(np.atleast_2d(vectors))
+        self.reserve(len(vectors), dim=vectors.shape[1])
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"임베딩 차원이 다릅니다: {vectors.shape[1]} (저장소: {self.dim})")
+
+        start, end = self.count, self.count + len(vectors)
+        self._vectors[start:end] = vectors
+        self._alive[start:end] = 1
+        if self.n_lists:
+            self._assign[start:end] = self._nearest_lists(vectors)
+        self.count = end
+        if flush:
+            self.flush()
+        return np.arange(start, end)
+
+    def delete(self, ids) -> int:
+        """임베딩 삭제 (행은 남기고 검색에서만 제외). 삭제한 개수 반환"""
+        ids = np.asarray(ids, dtype=np.int64)
+        ids = ids[(ids >= 0) & (ids < self.count)]
+        deleted = int(self._alive[ids].sum()) if len(ids) else 0
+        if len(ids):
+            self._alive[ids] = 0
+            self._alive.flush()
+        return deleted
+
+    def flush(self):
+        for array in (self._vectors, self._alive, self._assign):
+            if array is not None:
+                array.flush()
+        self._write_meta()
+
+    @property
+    def live_count(self) -> int:
+        return int(self._alive[:self.count].sum()) if self.count else 0
+
+    def _exact(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        ids: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        for start in range(0, self.count, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, self.count)
+            block = self._vectors[start:end] @ query
+            block[self._alive[start:end] == 0] = -np.inf
+            best = top_k(block, k)
+            ids.append(best + start)
+            scores.append(block[best])
+        ids_all, scores_all = np.concatenate(ids), np.concatenate(scores)
+        best = top_k(scores_all, k)
+        return ids_all[best], scores_all[best]
+
+    def _ivf_lists(self) -> List[np.ndarray]:
+        """클러스터별 행 번호 (행이 추가된 뒤 처음 검색할 때 다시 만듦)"""
+        if self._lists is None or self._lists_count != self.count:
+            assign = np.asarray(self._assign[:self.count])
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(self.n_lists + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+            self._lists_count = self.count
+        return self._lists
+
+    def _ivf(self, query: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        lists = self._ivf_lists()
+        probes = top_k(self._centroids @ query, nprobe)
+        ids = np.sort(np.concatenate([lists[i] for i in probes]))  # 정렬해서 파일 순서대로 읽음
+        ids = ids[self._alive[ids] == 1]
+        if not len(ids):
+            return ids, np.zeros(0, dtype=np.float32)
+        scores = self._vectors[ids] @ query
+        best = top_k(scores, k)
+        return ids[best], scores[best]
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None,
+               exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        코사인 유사도 상위 k개
+
+        Args:
+            query: 질문 임베딩
+            k: 결과 수
+            nprobe: IVF에서 검색할 클러스터 수 (기본값: DEFAULT_NPROBE)
+            exact: True면 IVF가 있어도 전체를 검색
+
+        Returns:
+            (행 번호 배열, 유사도 배열), 유사도 내림차순 (삭제된 행 제외)
+        """
+        if not self.count:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = normalize(query)
+        if self.n_lists and not exact and self.count >= IVF_MIN_ROWS:
+            ids, scores = self._ivf(query, k, nprobe or DEFAULT_NPROBE)
+        else:
+            ids, scores = self._exact(query, k)
+        keep = np.isfinite(scores)
+        return ids[keep], scores[keep]
+
+    def _nearest_lists(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def train_ivf(self, n_lists: Optional[int] = None, iterations: int = 10,
+                  sample_per_list: int = 40, seed: int = 0, progress=None):
+        """
+        IVF 색인 생성 (spherical k-means로 클러스터 중심을 구하고 모든 행을 가까운 클러스터에 배정)
+
+        이후 추가되는 행은 가장 가까운 클러스터에 바로 배정된다. 데이터 분포가 크게 바뀌면 다시 학습한다.
+
+        Args:
+            n_lists: 클러스터 수 (기본값: √행 수)
+            iterations: k-means 반복 횟수
+            sample_per_list: 학습에 쓸 클러스터당 샘플 수
+            progress: 진행 상황 콜백 (처리한 행 수, 전체 행 수)
+        """
+        live = np.flatnonzero(np.asarray(self._alive[:self.count]))
+        n_lists = n_lists or max(1, int(np.sqrt(len(live))))
+        if len(live) < n_lists:
+            raise ValueError(f"클러스터 수({n_lists})보다 임베딩이 적습니다: {len(live)}개")
+
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(live, size=min(len(live), n_lists * sample_per_list), replace=False))
+        data = np.asarray(self._vectors[sample])
+        centroids = data[rng.choice(len(data), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]  # 빈 클러스터는 새 샘플로
+            centroids = normalize(sums)
+
+        self.n_lists = n_lists
+        self._centroids = centroids
+        np.save(self.directory / "ivf_centroids.npy", centroids)
+        self._assign = self._map_file("ivf_assign.i32", np.int32, (self.capacity,))
+        for start in range(0, self.count, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, self.count)
+            self._assign[start:end] = self._nearest_lists(np.asarray(self._vectors[start:end]))
+            if progress is not None:
+                progress(end, self.count)
+        self._lists = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"dim": self.dim, "rows": self.count, "live": self.live_count,
+                "capacity": self.capacity, "ivf_lists": self.n_lists}
@@ -0,0 +1,191 @@
+"""
+LLM 응답 디스크 캐시
+모델, 프롬프트, 옵션의 해시를 키로 응답을 저장합니다.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "responses"
+DEFAULT_MAX_MB = 200
+
+
+class ResponseCache:
+    """크기 제한이 있는 content-addressed 응답 캐시 (오래 안 쓴 항목부터 삭제)"""
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, enabled: bool = True):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None  # 첫 저장 시 한 번만 계산
+
+    @staticmethod
+    def make_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 **extra: Any) -> str:
+        """
+        캐시 키 생성
+
+        Args:
+            model: 모델 이름
+            prompt: 프롬프트
+            options: temperature, seed, num_ctx 등 모델 옵션
+            extra: 같은 프롬프트의 여러 샘플을 구분하는 값 (예: sample=2)
+        """
+        material = json.dumps(
+            {"model": model, "prompt": prompt, "options": options or {}, **extra},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """캐시 조회 (없으면 None)"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # 최근 사용 시각 갱신 (삭제 순서 결정용)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """캐시 저장"""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 동시 실행 중에도 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 임시 파일 후 교체
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+
+        with self._lock:
+            # 같은 키를 덮어쓰면 이전 파일 크기를 빼야 합계가 실제 크기와 맞는다
+            try:
+                old_size = path.stat().st_size
+            except FileNotFoundError:
+                old_size = 0
+            os.replace(tmp_path, path)
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += path.stat().st_size - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self.directory.glob("*/*.json"))
+
+    def _evict(self):
+        """최근에 사용하지 않은 항목부터 최대 크기의 90%까지 삭제"""
+        entries = []
+        for p in self.directory.glob("*/*.json"):
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        """히트/미스 통계"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def print_summary(self):
+        """캐시 통계 출력"""
+        if not self.enabled:
+            print(f"\n💾 응답 캐시: 사용 안 함 (--no-cache)")
+            return
+        stats = self.stats()
+        print(f"\n💾 응답 캐시: 히트 {stats['hits']}개 / 미스 {stats['misses']}개 "
+              f"(적중률 {stats['hit_rate'] * 100:.0f}%, 삭제 {stats['evictions']}개)")
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_cache() -> ResponseCache:
+    """프로세스 전체에서 공유하는 기본 캐시"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """응답 캐시 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="캐시를 무시하고 항상 새로 생성"
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, default=DEFAULT_CACHE_DIR,
+        help=f"캐시 디렉토리 (기본값: {DEFAULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=DEFAULT_MAX_MB,
+        help=f"캐시 최대 크기 MB (기본값: {DEFAULT_MAX_MB})"
+    )
+
+
+def configure_cache(args: argparse.Namespace) -> ResponseCache:
+    """add_cache_arguments로 파싱한 인자로 기본 캐시 설정"""
+    global _default_cache
+    _default_cache = ResponseCache(
+        directory=args.cache_dir,
+        max_bytes=args.cache_max_mb * 1024 * 1024,
+        enabled=not args.no_cache,
+    )
+    return _default_cache
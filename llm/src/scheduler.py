@@ -0,0 +1,326 @@
+"""
+우선순위 요청 스케줄러
+공유 Ollama 서버로 가는 생성 요청을 우선순위 클래스(interactive > batch)와 호출자별 공정 큐로 정렬하고,
+동시에 진행하는 요청 수를 서버의 병렬 처리 수(OLLAMA_NUM_PARALLEL)에 맞춰 제한합니다.
+
+프로세스 안에서는 OllamaClient.scheduler로 쓰고, chat_ui와 평가 스크립트처럼 서로 다른 프로세스가
+같은 서버를 쓸 때는 스케줄링 프록시를 띄우고 OLLAMA_URL을 프록시로 지정합니다.
+
+사용법:
+    python -m src.scheduler --port 11500 --upstream http://localhost:11434 --max-in-flight 1
+    OLLAMA_URL=http://localhost:11500 python src/chat_ui.py
+    OLLAMA_URL=http://localhost:11500 python tests/phase2_cot_test.py --concurrency 4
+"""
+
+import argparse
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Iterator, Optional
+
+import requests
+
+from .metrics import get_call_site, get_registry
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)  # 앞쪽이 먼저
+
+# 우선순위/호출자를 프록시에 전달하는 요청 헤더 (Ollama는 무시)
+PRIORITY_HEADER = "X-Ollama-Priority"
+CALLER_HEADER = "X-Ollama-Caller"
+
+QUEUE_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def parse_priority(value: Optional[str], default: str = BATCH) -> str:
+    """헤더/인자 값을 우선순위 클래스로 변환 (알 수 없는 값은 default)"""
+    value = (value or "").strip().lower()
+    return value if value in PRIORITIES else default
+
+
+class _Waiter:
+    __slots__ = ("granted", "enqueued")
+
+    def __init__(self):
+        self.granted = False
+        self.enqueued = time.perf_counter()
+
+
+class RequestScheduler:
+    """우선순위 클래스 + 호출자별 라운드 로빈 큐와 동시 실행 제한"""
+
+    def __init__(self, max_in_flight: int = 1, reserved_interactive: int = 0):
+        """
+        Args:
+            max_in_flight: 동시에 서버로 보낼 최대 요청 수 (서버의 OLLAMA_NUM_PARALLEL에 맞춤)
+            reserved_interactive: batch 요청이 쓰지 못하게 비워 둘 슬롯 수.
+                진행 중인 생성은 중간에 뺏을 수 없으므로, 슬롯을 남겨 두면 interactive 요청이
+                batch 생성이 끝나기를 기다리지 않는다 (max_in_flight보다 작아야 함).
+        """
+        if not 0 <= reserved_interactive < max(1, max_in_flight):
+            raise ValueError("reserved_interactive는 0 이상 max_in_flight 미만이어야 합니다")
+        self.max_in_flight = max(1, max_in_flight)
+        self.reserved_interactive = reserved_interactive
+        self.in_flight = 0
+
+        # 우선순위 → (호출자 → 대기열). 호출자 순서를 돌려 가며 한 건씩 꺼낸다.
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._cond = threading.Condition()
+
+        registry = get_registry()
+        self._wait_time = registry.histogram(
+            "ollama_queue_wait_seconds", "스케줄러 대기 시간", QUEUE_WAIT_BUCKETS, labels=("priority", "caller"))
+        self._depth = registry.gauge("ollama_queue_depth", "스케줄러 대기 요청 수", labels=("priority",))
+        self._in_flight_gauge = registry.gauge("ollama_in_flight", "스케줄러를 통과해 진행 중인 요청 수", labels=())
+
+    def _capacity(self, priority: str) -> int:
+        return self.max_in_flight - (self.reserved_interactive if priority == BATCH else 0)
+
+    def _dispatch(self):
+        """빈 슬롯에 대기 요청 배정 (잠금 안에서 호출)"""
+        granted = False
+        for priority in PRIORITIES:
+            callers = self._queues[priority]
+            while callers and self.in_flight < self._capacity(priority):
+                caller, queue = next(iter(callers.items()))
+                waiter = queue.popleft()
+                del callers[caller]
+                if queue:
+                    callers[caller] = queue  # 같은 호출자의 다음 요청은 맨 뒤로
+                waiter.granted = True
+                self.in_flight += 1
+                self._depth.dec(priority)
+                granted = True
+            if callers:
+                break  # 높은 우선순위가 대기 중이면 낮은 우선순위는 배정하지 않음
+        if granted:
+            self._in_flight_gauge.set(value=self.in_flight)
+            self._cond.notify_all()
+
+    def acquire(self, priority: str = BATCH, caller: Optional[str] = None) -> float:
+        """
+        슬롯을 받을 때까지 대기
+
+        Returns:
+            대기 시간 (초)
+        """
+        priority = parse_priority(priority)
+        caller = caller or get_call_site()
+        waiter = _Waiter()
+        with self._cond:
+            self._queues[priority].setdefault(caller, deque()).append(waiter)
+            self._depth.inc(priority)
+            self._dispatch()
+            try:
+                while not waiter.granted:
+                    self._cond.wait()
+            except BaseException:
+                # 대기 중 중단되면 큐에서 빼고, 그사이 배정됐으면 슬롯을 돌려준다
+                if waiter.granted:
+                    self._release_locked()
+                else:
+                    self._remove(priority, caller, waiter)
+                raise
+
+        waited = time.perf_counter() - waiter.enqueued
+        self._wait_time.observe(waited, priority, caller)
+        return waited
+
+    def _remove(self, priority: str, caller: str, waiter: _Waiter):
+        queue = self._queues[priority].get(caller)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._depth.dec(priority)
+            if not queue:
+                del self._queues[priority][caller]
+
+    def _release_locked(self):
+        self.in_flight -= 1
+        self._in_flight_gauge.set(value=self.in_flight)
+        self._dispatch()
+
+    def release(self):
+        """슬롯 반환"""
+        with self._cond:
+            self._release_locked()
+
+    @contextmanager
+    def slot(self, priority: str = BATCH, caller: Optional[str] = None) -> Iterator[float]:
+        """with 블록 동안 슬롯 하나 사용"""
+        waited = self.acquire(priority, caller)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def queued(self) -> Dict[str, int]:
+        """우선순위별 대기 요청 수"""
+        with self._cond:
+            return {p: sum(len(q) for q in self._queues[p].values()) for p in PRIORITIES}
+
+
+# 스케줄링하는 경로 (그 밖의 요청은 바로 전달)
+SCHEDULED_PATHS = ("/api/generate", "/api/chat", "/api/embeddings", "/api/embed")
+# 그대로 전달하지 않는 hop-by-hop 헤더
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding"}
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    scheduler: RequestScheduler
+    upstream: str
+    session: requests.Session
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _forward(self, method: str):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {"Content-Type": self.headers.get("Content-Type", "application/json")}
+
+        scheduled = method == "POST" and self.path in SCHEDULED_PATHS
+        if scheduled:
+            priority = parse_priority(self.headers.get(PRIORITY_HEADER))
+            caller = self.headers.get(CALLER_HEADER) or self.client_address[0]
+            self.scheduler.acquire(priority, caller)
+        try:
+            self._relay(method, body, headers)
+        finally:
+            if scheduled:
+                self.scheduler.release()
+
+    def _relay(self, method: str, body: Optional[bytes], headers: Dict[str, str]):
+        try:
+            upstream = self.session.request(method, f"{self.upstream}{self.path}", data=body,
+                                            headers=headers, stream=True, timeout=(5, None))
+        except requests.RequestException as e:
+            message = f'{{"error": "upstream unavailable: {type(e).__name__}"}}'.encode("utf-8")
+            self.send_response(502)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(message)))
+            self.end_headers()
+            self.wfile.write(message)
+            return
+
+        try:
+            self.send_response(upstream.status_code)
+            for name, value in upstream.headers.items():
+                if name.lower() not in HOP_HEADERS:
+                    self.send_header(name, value)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            # 업스트림 청크가 도착하는 대로 전달 (스트리밍 토큰이 지연되지 않도록)
+            for chunk in upstream.raw.stream(None, decode_content=True):
+                if chunk:
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                    self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 끊으면 업스트림 연결도 끊어서 서버가 생성을 멈추게 한다
+            self.close_connection = True
+        finally:
+            upstream.close()
+
+    def do_GET(self):
+        self._forward("GET")
+
+    def do_POST(self):
+        self._forward("POST")
+
+    def do_DELETE(self):
+        self._forward("DELETE")
+
+
+class SchedulerProxy:
+    """스케줄러를 거쳐 Ollama로 전달하는 HTTP 프록시"""
+
+    def __init__(self, upstream: str, scheduler: RequestScheduler, host: str = "127.0.0.1", port: int = 0):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=scheduler.max_in_flight + 4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        handler = type("ProxyHandler", (_ProxyHandler,), {
+            "scheduler": scheduler,
+            "upstream": upstream.rstrip("/"),
+            "session": session,
+        })
+        self.scheduler = scheduler
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SchedulerProxy":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "SchedulerProxy":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_scheduler_arguments(parser: argparse.ArgumentParser):
+    """스케줄러 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--max-in-flight", type=int, default=None,
+        help="이 프로세스에서 동시에 서버로 보낼 최대 생성 요청 수 (기본값: 제한 없음)"
+    )
+
+
+def configure_scheduler(args: argparse.Namespace, priority: str = BATCH) -> Optional[RequestScheduler]:
+    """add_scheduler_arguments로 파싱한 인자로 공유 클라이언트의 우선순위와 스케줄러 설정"""
+    from .ollama_client import get_client
+
+    client = get_client()
+    client.priority = priority
+    if args.max_in_flight:
+        client.scheduler = RequestScheduler(args.max_in_flight)
+    return client.scheduler
+
+
+def main():
+    """메인 함수"""
+    from .metrics import add_metrics_arguments, configure_metrics
+    from .ollama_client import OLLAMA_URL
+
+    parser = argparse.ArgumentParser(description="Ollama 우선순위 스케줄링 프록시")
+    parser.add_argument("--host", default="127.0.0.1", help="바인드 주소 (기본값: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=11500, help="포트 (기본값: 11500)")
+    parser.add_argument("--upstream", default=OLLAMA_URL, help="Ollama 서버 주소 (기본값: OLLAMA_URL)")
+    parser.add_argument("--max-in-flight", type=int, default=1,
+                        help="서버로 동시에 보낼 최대 요청 수, OLLAMA_NUM_PARALLEL과 같게 (기본값: 1)")
+    parser.add_argument("--reserved-interactive", type=int, default=0,
+                        help="interactive 요청 전용으로 남겨 둘 슬롯 수 (기본값: 0)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics(args, call_site="scheduler")
+
+    scheduler = RequestScheduler(args.max_in_flight, args.reserved_interactive)
+    proxy = SchedulerProxy(args.upstream, scheduler, host=args.host, port=args.port)
+    print(f"🚦 스케줄링 프록시: {proxy.url} → {args.upstream} "
+          f"(동시 {args.max_in_flight}건, interactive 전용 {args.reserved_interactive}건)")
+    try:
+        proxy.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 종료")
+    finally:
+        proxy.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+시맨틱 응답 캐시
+질문을 Ollama 임베딩(/api/embeddings)으로 바꿔 NumPy 행렬에 보관하고, 새 질문과 코사인 유사도가
+임계값 이상인 질문이 있으면 저장된 답변을 바로 돌려줍니다. 표현이 조금 달라도 같은 질문이면
+생성(수 초~수십 초) 대신 임베딩 한 번과 행렬 곱 한 번(수 ms)으로 끝납니다.
+
+오래된 항목은 TTL이 지나면 버리고, 최대 개수를 넘으면 가장 오래 안 쓴 항목부터 지웁니다.
+적중 시 바뀌는 사용 시각과 조회 중 만료된 항목은 바로 쓰지 않고, put/flush 때나 SAVE_INTERVAL마다 한 번에 저장합니다
+(적중할 때마다 전체 인덱스를 다시 쓰면 적중 비용이 항목 수에 비례).
+
+사용법:
+    python src/chat_ui.py --semantic-cache
+    python src/chat_ui.py --semantic-cache --cache-threshold 0.95 --cache-ttl-hours 24
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .ollama_client import EMBED_MODEL, OllamaClient, get_client
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "semantic"
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL_HOURS = 24 * 7
+DEFAULT_MAX_ENTRIES = 2000
+SAVE_INTERVAL = 60.0  # 적중/만료로 바뀐 내용을 저장하는 최소 간격 (초)
+
+
+class CacheHit:
+    """캐시 적중 결과"""
+
+    __slots__ = ("prompt", "response", "similarity", "age")
+
+    def __init__(self, prompt: str, response: str, similarity: float, age: float):
+        self.prompt = prompt          # 저장된 원래 질문
+        self.response = response
+        self.similarity = similarity  # 코사인 유사도
+        self.age = age                # 저장 후 경과 시간 (초)
+
+
+class SemanticCache:
+    """임베딩 코사인 유사도로 비슷한 질문의 답변을 찾는 캐시 (TTL + LRU)"""
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, threshold: float = DEFAULT_THRESHOLD,
+                 ttl: float = DEFAULT_TTL_HOURS * 3600, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 client: Optional[OllamaClient] = None, embed_model: str = EMBED_MODEL):
+        """
+        Args:
+            directory: 인덱스 저장 디렉토리 (None이면 메모리에만 보관)
+            threshold: 적중으로 볼 최소 코사인 유사도
+            ttl: 항목 유효 시간 (초)
+            max_entries: 최대 항목 수 (넘으면 가장 오래 안 쓴 항목부터 삭제)
+            client: 임베딩을 요청할 클라이언트 (기본값: 공유 클라이언트)
+            embed_model: 임베딩 모델 (바뀌면 기존 벡터와 비교할 수 없으므로 인덱스를 비운다)
+        """
+        self.directory = Path(directory) if directory is not None else None
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.client = client or get_client()
+        self.embed_model = embed_model
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.last_lookup_time: Optional[float] = None  # 마지막 조회의 임베딩 + 검색 시간 (초)
+
+        # 행 i: 정규화된 임베딩 vectors[i], 메타데이터 entries[i], 시각 created[i]/last_used[i]
+        self.vectors: Optional[np.ndarray] = None
+        self.created = np.zeros(0)
+        self.last_used = np.zeros(0)
+        self.entries: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+        self._dirty = False          # 저장하지 않은 변경 (사용 시각, 만료 삭제)
+        self._vectors_dirty = False  # 저장하지 않은 행 삭제 (vectors.npy도 다시 써야 함)
+        self._saved_at = time.monotonic()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _load(self):
+        if self.directory is None:
+            return
+        try:
+            with open(self.directory / "entries.json", encoding="utf-8") as f:
+                data = json.load(f)
+            vectors = np.load(self.directory / "vectors.npy")
+        except (OSError, ValueError):
+            return  # 처음 실행했거나 깨진 인덱스는 새로 시작
+        if data.get("embed_model") != self.embed_model or len(vectors) != len(data["entries"]):
+            return
+        self.vectors = vectors.astype(np.float32, copy=False)
+        self.entries = data["entries"]
+        self.created = np.array(data["created"], dtype=np.float64)
+        self.last_used = np.array(data["last_used"], dtype=np.float64)
+
+    def _save(self, vectors: bool = True):
+        """인덱스 저장 (사용 시각만 바뀌었으면 vectors=False, 잠금 안에서 호출)"""
+        self._dirty = self._vectors_dirty = False
+        self._saved_at = time.monotonic()
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = {"embed_model": self.embed_model, "entries": self.entries,
+                "created": self.created.tolist(), "last_used": self.last_used.tolist()}
+        # 저장 도중 종료돼도 이전 인덱스가 깨지지 않도록 임시 파일 후 교체
+        if vectors and self.vectors is not None:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, self.vectors)
+            os.replace(tmp_path, self.directory / "vectors.npy")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.directory / "entries.json")
+
+    def flush(self):
+        """저장하지 않은 사용 시각/만료 삭제를 기록 (종료할 때 호출)"""
+        with self._lock:
+            if self._dirty:
+                self._save(vectors=self._vectors_dirty)
+
+    def embed(self, text: str) -> np.ndarray:
+        """질문 임베딩 (단위 벡터, float32)"""
+        vector = np.asarray(self.client.embeddings(text.strip(), model=self.embed_model), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _keep(self, mask: np.ndarray):
+        """mask가 True인 행만 남김 (잠금 안에서 호출)"""
+        self.vectors = self.vectors[mask]
+        self.created = self.created[mask]
+        self.last_used = self.last_used[mask]
+        self.entries = [entry for entry, keep in zip(self.entries, mask) if keep]
+
+    def search(self, vector: np.ndarray, model: str) -> Optional[CacheHit]:
+        """
+        임베딩으로 가장 비슷한 유효 항목 검색 (임계값 미만이면 None)
+
+        Args:
+            vector: embed()로 만든 질문 임베딩
+            model: 답변을 생성할 모델 (다른 모델의 답변은 쓰지 않음)
+        """
+        now = time.time()
+        with self._lock:
+            if self.entries:
+                expired = now - self.created > self.ttl
+                if expired.any():
+                    self._keep(~expired)
+                    self._dirty = self._vectors_dirty = True
+            if not self.entries or self.vectors.shape[1] != vector.shape[0]:
+                self.misses += 1
+                self._save_if_due()
+                return None
+
+            # 모든 행이 단위 벡터이므로 내적이 곧 코사인 유사도
+            scores = self.vectors @ vector
+            scores[[entry["model"] != model for entry in self.entries]] = -1.0
+            index = int(np.argmax(scores))
+            similarity = float(scores[index])
+            if similarity < self.threshold:
+                self.misses += 1
+                self._save_if_due()
+                return None
+
+            self.hits += 1
+            self.last_used[index] = now
+            self._dirty = True
+            entry = self.entries[index]
+            hit = CacheHit(entry["prompt"], entry["response"], similarity, now - self.created[index])
+            self._save_if_due()
+        return hit
+
+    def _save_if_due(self):
+        """마지막 저장 후 SAVE_INTERVAL이 지났으면 바뀐 내용 저장 (잠금 안에서 호출)"""
+        if self._dirty and time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+            self._save(vectors=self._vectors_dirty)
+
+    def lookup(self, prompt: str, model: str) -> Tuple[Optional[CacheHit], np.ndarray]:
+        """
+        질문을 임베딩해서 검색
+
+        Returns:
+            (CacheHit 또는 None, 임베딩). 놓쳤으면 생성 후 같은 임베딩으로 put을 호출한다.
+        """
+        start = time.perf_counter()
+        vector = self.embed(prompt)
+        hit = self.search(vector, model)
+        self.last_lookup_time = time.perf_counter() - start
+        return hit, vector
+
+    def put(self, vector: np.ndarray, prompt: str, response: str, model: str):
+        """답변 저장 (최대 개수를 넘으면 가장 오래 안 쓴 항목 삭제)"""
+        now = time.time()
+        with self._lock:
+            if self.vectors is None or self.vectors.shape[1] != vector.shape[0]:
+                self.vectors = np.zeros((0, vector.shape[0]), dtype=np.float32)
+                self.created = np.zeros(0)
+                self.last_used = np.zeros(0)
+                self.entries = []
+            self.vectors = np.vstack([self.vectors, vector[np.newaxis, :]])
+            self.created = np.append(self.created, now)
+            self.last_used = np.append(self.last_used, now)
+            self.entries.append({"prompt": prompt, "response": response, "model": model})
+
+            overflow = len(self.entries) - self.max_entries
+            if overflow > 0:
+                mask = np.ones(len(self.entries), dtype=bool)
+                mask[np.argsort(self.last_used, kind="stable")[:overflow]] = False
+                self._keep(mask)
+                self.evictions += overflow
+            self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        """히트/미스 통계"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def add_semantic_cache_arguments(parser: argparse.ArgumentParser):
+    """시맨틱 캐시 관련 CLI 인자 추가"""
+    parser.add_argument(
+        "--semantic-cache", action="store_true",
+        help="비슷한 질문에 저장된 답변을 재사용 (대화의 첫 질문에만 적용)"
+    )
+    parser.add_argument(
+        "--cache-threshold", type=float, default=DEFAULT_THRESHOLD,
+        help=f"캐시 적중으로 볼 최소 코사인 유사도 (기본값: {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--cache-ttl-hours", type=float, default=DEFAULT_TTL_HOURS,
+        help=f"캐시 항목 유효 시간 (기본값: {DEFAULT_TTL_HOURS}시간)"
+    )
+    parser.add_argument(
+        "--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+        help=f"캐시 최대 항목 수 (기본값: {DEFAULT_MAX_ENTRIES})"
+    )
+
+
+def configure_semantic_cache(args: argparse.Namespace) -> Optional[SemanticCache]:
+    """add_semantic_cache_arguments로 파싱한 인자로 캐시 생성 (--semantic-cache가 없으면 None)"""
+    if not args.semantic_cache:
+        return None
+    return SemanticCache(
+        threshold=args.cache_threshold,
+        ttl=args.cache_ttl_hours * 3600,
+        max_entries=args.cache_max_entries,
+    )
@@ -0,0 +1,277 @@
+"""
+채팅 세션 저장소
+메시지를 추가할 때마다 JSONL 파일에 한 줄씩 덧붙이고, 이어서 시작할 때는 파일 끝에서부터
+표시와 컨텍스트 구성에 필요한 만큼만 읽습니다.
+
+파일 형식 (한 줄에 레코드 하나):
+    {"type": "session", "id": ..., "created": ..., "model": ...}      첫 줄
+    {"type": "message", "index": ..., "role": ..., ..., "totals": {...}, "summarized_upto": ...}
+    {"type": "summary", "summary": ..., "summarized_upto": ...}      컨텍스트 요약 갱신 시
+
+세션 파일 옆의 <세션 ID>.context.json에는 마지막 응답의 KV 컨텍스트 스냅샷을 덮어씁니다.
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .context_window import DEFAULT_BUDGET_TOKENS, estimate_tokens
+
+DEFAULT_SESSION_DIR = Path(__file__).resolve().parent.parent / ".sessions"
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class Message:
+    """대화 메시지 한 건"""
+
+    __slots__ = ("role", "content", "timestamp", "tokens", "prompt_eval_count", "timings", "est_tokens",
+                 "truncated")
+
+    def __init__(self, role: str, content: str, timestamp: Optional[float] = None,
+                 tokens: Optional[int] = None, prompt_eval_count: Optional[int] = None,
+                 timings: Optional[Dict[str, Any]] = None, est_tokens: Optional[int] = None,
+                 truncated: Optional[bool] = False):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.tokens = tokens
+        self.prompt_eval_count = prompt_eval_count
+        self.timings = timings
+        self.est_tokens = est_tokens if est_tokens is not None else estimate_tokens(content)
+        self.truncated = bool(truncated)  # 사용자가 생성 도중 중단한 응답
+
+    @property
+    def datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        return cls(**{slot: data.get(slot) for slot in cls.__slots__})
+
+
+class SessionStats:
+    """세션 전체 누적 카운터 (메시지를 추가할 때 갱신되므로 통계 조회 시 다시 합산하지 않음)"""
+
+    __slots__ = ("messages", "tokens", "prefill_tokens", "generation_time", "rated_turns", "eval_rate_sum")
+
+    def __init__(self, messages: int = 0, tokens: int = 0, prefill_tokens: int = 0,
+                 generation_time: float = 0.0, rated_turns: int = 0, eval_rate_sum: float = 0.0):
+        self.messages = messages
+        self.tokens = tokens                    # 생성 토큰 수 (eval_count) 합계
+        self.prefill_tokens = prefill_tokens    # 프리필 토큰 수 (prompt_eval_count) 합계
+        self.generation_time = generation_time  # 응답 수신 시간 합계 (초)
+        self.rated_turns = rated_turns
+        self.eval_rate_sum = eval_rate_sum
+
+    def add(self, message: Message):
+        self.messages += 1
+        self.tokens += message.tokens or 0
+        self.prefill_tokens += message.prompt_eval_count or 0
+        if message.timings:
+            self.generation_time += message.timings.get("wall_time") or 0.0
+            if message.timings.get("eval_rate") is not None:
+                self.rated_turns += 1
+                self.eval_rate_sum += message.timings["eval_rate"]
+
+    @property
+    def eval_rate(self) -> Optional[float]:
+        """평균 토큰 생성 속도 (tok/s)"""
+        return self.eval_rate_sum / self.rated_turns if self.rated_turns else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionStats":
+        return cls(**{slot: data[slot] for slot in cls.__slots__ if slot in data})
+
+
+class SessionStore:
+    """append-only JSONL 세션 파일"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.session_id = self.path.stem
+        self._summarized_upto = 0  # 마지막으로 기록한 요약의 summarized_upto (메시지 레코드에도 남김)
+
+    @classmethod
+    def create(cls, directory: Path = DEFAULT_SESSION_DIR, model: Optional[str] = None) -> "SessionStore":
+        """새 세션 파일 생성"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        session_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = directory / f"{session_id}.jsonl"
+        suffix = 1
+        while path.exists():
+            suffix += 1
+            path = directory / f"{session_id}-{suffix}.jsonl"
+
+        store = cls(path)
+        store._append({"type": "session", "id": store.session_id, "created": time.time(), "model": model})
+        return store
+
+    @classmethod
+    def find(cls, session_id: Optional[str] = None, directory: Path = DEFAULT_SESSION_DIR) -> "SessionStore":
+        """기존 세션 열기 (session_id가 없으면 가장 최근 세션)"""
+        directory = Path(directory)
+        if session_id:
+            path = directory / f"{session_id}.jsonl"
+        else:
+            sessions = list_sessions(directory)
+            if not sessions:
+                raise FileNotFoundError(f"저장된 세션이 없습니다: {directory}")
+            path = sessions[-1]
+        if not path.exists():
+            raise FileNotFoundError(f"세션 파일이 없습니다: {path}")
+        return cls(path)
+
+    def _append(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        # 한 번의 write로 한 줄을 통째로 덧붙여서 중간에 종료돼도 앞의 레코드는 온전하다
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def append_message(self, index: int, message: Message, totals: SessionStats):
+        """메시지와 그 시점의 누적 카운터, 요약 상태 기록"""
+        self._append({"type": "message", "index": index, **message.to_dict(), "totals": totals.to_dict(),
+                      "summarized_upto": self._summarized_upto})
+
+    def append_summary(self, summary: str, summarized_upto: int):
+        """컨텍스트 요약 상태 기록 (summarized_upto: 요약에 반영된 메시지 수)"""
+        self._append({"type": "summary", "summary": summary, "summarized_upto": summarized_upto})
+        self._summarized_upto = summarized_upto
+
+    @property
+    def context_path(self) -> Path:
+        return self.path.with_suffix(".context.json")
+
+    def save_context(self, context: List[int], model: str, digest: Optional[str], message_count: int):
+        """
+        KV 컨텍스트 스냅샷 저장 (이전 스냅샷을 교체)
+
+        Args:
+            context: 서버가 마지막 응답에 돌려준 컨텍스트 토큰
+            model: 컨텍스트를 만든 모델 이름
+            digest: 모델 digest (모델이 바뀌면 토큰이 의미가 없으므로 복원 시 비교)
+            message_count: 스냅샷에 반영된 메시지 수 (세션 전체 기준)
+        """
+        snapshot = {"model": model, "digest": digest, "message_count": message_count,
+                    "saved": time.time(), "context": context}
+        # 기록 도중 종료돼도 이전 스냅샷이 깨지지 않도록 임시 파일 후 교체
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, self.context_path)
+
+    def load_context(self) -> Optional[Dict[str, Any]]:
+        """KV 컨텍스트 스냅샷 읽기 (없거나 깨졌으면 None)"""
+        try:
+            with open(self.context_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def discard_context(self):
+        """더 이상 쓸 수 없는 스냅샷 삭제"""
+        try:
+            self.context_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def read_header(self) -> Dict[str, Any]:
+        with open(self.path, encoding="utf-8") as f:
+            return json.loads(f.readline())
+
+    def iter_reverse(self) -> Iterator[Dict[str, Any]]:
+        """파일 끝에서부터 레코드를 거꾸로 읽음 (끝이 잘린 줄은 건너뜀)"""
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            rest = b""
+            while position > 0:
+                size = min(READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + rest).split(b"\n")
+                rest = lines.pop(0)  # 블록 앞쪽에 걸친 줄은 다음 블록과 합친다
+                for line in reversed(lines):
+                    record = self._parse(line)
+                    if record is not None:
+                        yield record
+            record = self._parse(rest)
+            if record is not None:
+                yield record
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[Dict[str, Any]]:
+        if not line.strip():
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None  # 기록 도중 종료되어 잘린 줄
+
+    def load_tail(self, min_messages: int = 5, budget_tokens: int = DEFAULT_BUDGET_TOKENS
+                  ) -> Tuple[List[Message], int, SessionStats, Optional[Dict[str, Any]]]:
+        """
+        이어서 시작하는 데 필요한 끝부분만 읽기
+
+        최근 min_messages개와, 마지막 요약 이후 아직 요약되지 않은 메시지를 모두 읽는다.
+        요약을 기록한 적이 없는 세션이면 컨텍스트 예산(budget_tokens)을 채울 만큼만 읽는다
+        (그보다 오래된 메시지는 프롬프트에 들어가지 않으므로 파일 전체를 읽지 않음).
+
+        Args:
+            min_messages: 화면에 보여 줄 최근 메시지 수
+            budget_tokens: 컨텍스트 예산 (ContextWindow.budget_tokens)
+
+        Returns:
+            (메시지 목록, 첫 메시지의 전체 인덱스, 누적 카운터, 마지막 요약 레코드)
+        """
+        messages: List[Message] = []
+        totals: Optional[SessionStats] = None
+        summary: Optional[Dict[str, Any]] = None
+        used = 0  # 읽은 메시지의 추정 토큰 수
+        # 마지막 메시지 레코드의 summarized_upto가 0이면 그 앞에는 요약 레코드가 없다
+        # (이 필드가 없는 이전 형식의 파일은 알 수 없으므로 요약을 찾을 때까지 읽음)
+        never_summarized = False
+
+        for record in self.iter_reverse():
+            kind = record.get("type")
+            if kind == "summary":
+                if summary is None:
+                    summary = record  # 거꾸로 읽으므로 처음 만난 요약이 최신
+                continue
+            if kind != "message":
+                continue
+
+            if totals is None:
+                totals = SessionStats.from_dict(record.get("totals", {}))
+                never_summarized = record.get("summarized_upto") == 0
+            messages.append(Message.from_dict(record))
+            used += messages[-1].est_tokens
+            if len(messages) < min_messages:
+                continue
+            # 마지막 요약 이후의 메시지를 모두 읽었으면 중단
+            if summary is not None and record["index"] <= summary["summarized_upto"]:
+                break
+            # 요약이 없는 세션이면 예산을 넘길 만큼 읽었으면 중단
+            if summary is None and never_summarized and used > budget_tokens:
+                break
+
+        messages.reverse()
+        totals = totals or SessionStats()
+        if summary is not None:
+            self._summarized_upto = summary["summarized_upto"]
+        return messages, totals.messages - len(messages), totals, summary
+
+
+def list_sessions(directory: Path = DEFAULT_SESSION_DIR) -> List[Path]:
+    """저장된 세션 파일 (오래된 순)"""
+    return sorted(Path(directory).glob("*.jsonl"), key=lambda p: p.stat().st_mtime)
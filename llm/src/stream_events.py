@@ -0,0 +1,190 @@
+"""
+스트리밍 이벤트 모델
+Ollama 스트림 청크를 토큰/진행/완료/오류 이벤트로 바꿔서 UI, 지표, 저장 계층이 같은 형태로 소비하게 합니다.
+"""
+
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .ollama_client import OllamaClient, OllamaError, StreamResponse, get_client
+
+
+@dataclass
+class TokenEvent:
+    """생성된 텍스트 조각"""
+    text: str
+
+
+@dataclass
+class ProgressEvent:
+    """요청 진행 단계 (request_sent: 요청 전송, first_token: 첫 토큰 도착)"""
+    stage: str
+    elapsed: float
+
+
+@dataclass
+class DoneEvent:
+    """
+    스트림 완료 (서버 측 시간 정보는 ns 단위, 클라이언트 측은 초 단위)
+
+    truncated면 사용자가 중간에 취소한 것으로, text는 받은 부분까지이고 서버 측 시간 정보는 없다.
+    """
+    text: str
+    eval_count: Optional[int] = None
+    prompt_eval_count: Optional[int] = None
+    total_duration: Optional[int] = None
+    load_duration: Optional[int] = None
+    prompt_eval_duration: Optional[int] = None
+    eval_duration: Optional[int] = None
+    context: Optional[List[int]] = field(default=None, repr=False)
+    ttft: Optional[float] = None
+    wall_time: float = 0.0
+    truncated: bool = False
+
+    @classmethod
+    def from_chunk(cls, chunk: Dict[str, Any], text: str, ttft: Optional[float],
+                   wall_time: float) -> "DoneEvent":
+        return cls(
+            text=text,
+            eval_count=chunk.get("eval_count"),
+            prompt_eval_count=chunk.get("prompt_eval_count"),
+            total_duration=chunk.get("total_duration"),
+            load_duration=chunk.get("load_duration"),
+            prompt_eval_duration=chunk.get("prompt_eval_duration"),
+            eval_duration=chunk.get("eval_duration"),
+            context=chunk.get("context"),
+            ttft=ttft,
+            wall_time=wall_time,
+        )
+
+    @property
+    def eval_rate(self) -> Optional[float]:
+        """토큰 생성 속도 (tok/s)"""
+        if not self.eval_count or not self.eval_duration:
+            return None
+        return self.eval_count / (self.eval_duration / 1e9)
+
+    @property
+    def prompt_eval_rate(self) -> Optional[float]:
+        """프롬프트 처리 속도 (tok/s)"""
+        if not self.prompt_eval_count or not self.prompt_eval_duration:
+            return None
+        return self.prompt_eval_count / (self.prompt_eval_duration / 1e9)
+
+    def timings(self) -> Dict[str, Any]:
+        """기록용 시간 정보 (텍스트와 KV 컨텍스트 제외)"""
+        data = asdict(self)
+        del data["text"], data["context"]
+        data["eval_rate"] = self.eval_rate
+        data["prompt_eval_rate"] = self.prompt_eval_rate
+        return data
+
+
+@dataclass
+class ErrorEvent:
+    """스트림 실패 (받은 부분까지의 텍스트 포함)"""
+    message: str
+    text: str = ""
+    status_code: Optional[int] = None
+    error: Optional[BaseException] = field(default=None, repr=False)
+
+    def raise_error(self):
+        """원래 예외를 다시 발생 (예외 종류로 분기하는 호출자용)"""
+        raise self.error if self.error is not None else RuntimeError(self.message)
+
+
+StreamEvent = Union[TokenEvent, ProgressEvent, DoneEvent, ErrorEvent]
+
+
+class CancelToken:
+    """진행 중인 스트림 취소 요청 (UI 스레드에서 cancel, 수신 스레드의 스트림에 전달)"""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._stream: Optional[StreamResponse] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def attach(self, stream: StreamResponse):
+        """스트림 등록 (이미 취소됐으면 바로 끊음)"""
+        with self._lock:
+            self._stream = stream
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            stream.cancel()
+
+    def cancel(self):
+        """
+        취소 요청
+
+        응답 헤더를 받기 전(모델 로딩/프리필 중)이면 스트림이 등록되는 즉시 끊긴다.
+        """
+        with self._lock:
+            self._cancelled.set()
+            stream = self._stream
+        if stream is not None:
+            stream.cancel()
+
+
+def stream_events(prompt: str, client: Optional[OllamaClient] = None,
+                  cancel: Optional[CancelToken] = None, **kwargs) -> Iterator[StreamEvent]:
+    """
+    generate 스트림을 이벤트로 변환
+
+    마지막 이벤트는 항상 DoneEvent 또는 ErrorEvent 하나다.
+
+    Args:
+        prompt: 프롬프트
+        client: 사용할 클라이언트 (기본값: 공유 클라이언트)
+        cancel: 취소 토큰. 취소되면 연결을 끊고 받은 부분까지를 truncated DoneEvent로 끝낸다.
+        **kwargs: OllamaClient.generate에 그대로 전달 (options, timeout, context 등)
+    """
+    client = client or get_client()
+    start = time.perf_counter()
+    parts: List[str] = []
+    ttft = None
+    stream: Optional[StreamResponse] = None
+
+    try:
+        yield ProgressEvent("request_sent", 0.0)
+        stream = client.generate(prompt, stream=True, **kwargs)
+        if cancel is not None:
+            cancel.attach(stream)
+        for chunk in stream:
+            text = chunk.get("response")
+            if text:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                    yield ProgressEvent("first_token", ttft)
+                parts.append(text)
+                yield TokenEvent(text)
+
+            if chunk.get("done"):
+                event = DoneEvent.from_chunk(chunk, "".join(parts), ttft, time.perf_counter() - start)
+                stream.close()  # 호출한 쪽이 Done 뒤로 더 읽지 않아도 연결을 바로 돌려줌
+                yield event
+                return
+
+        if cancel is None or not cancel.cancelled:
+            yield ErrorEvent("스트림이 완료 청크 없이 종료됨", text="".join(parts))
+            return
+    except OllamaError as e:
+        yield ErrorEvent(f"Error: {e.status_code}", text="".join(parts), status_code=e.status_code, error=e)
+        return
+    except Exception as e:
+        if cancel is None or not cancel.cancelled:
+            yield ErrorEvent(f"Exception: {e}", text="".join(parts), error=e)
+            return
+    finally:
+        # Done/Error/취소, 호출한 쪽이 중간에 그만 읽은 경우 모두 스트림을 닫아 연결을 풀에 돌려준다.
+        # 닫지 않으면 순환 참조라 GC가 회수하는데, GC가 풀의 큐 락을 잡은 스레드에서 돌면 release_conn이 멈춘다.
+        if stream is not None:
+            stream.close()
+
+    # 취소 토큰으로 연결을 직접 끊었으면 오류가 아니라 중단된 응답
+    yield DoneEvent(text="".join(parts), ttft=ttft, wall_time=time.perf_counter() - start, truncated=True)
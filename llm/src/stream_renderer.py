@@ -0,0 +1,147 @@
+"""
+스트리밍 렌더러
+토큰 수신은 별도 스레드에서 버퍼에 쌓고, 화면은 고정 프레임 레이트로 한 번에 갱신합니다.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from rich.console import RenderableType
+from rich.live import Live
+
+DEFAULT_FPS = 12
+CANCEL_GRACE = 1.0  # 취소 후 수신 스레드가 끝나기를 기다리는 최대 시간 (초)
+
+
+class StreamRenderer:
+    """네트워크 수신과 화면 갱신을 분리하는 렌더러"""
+
+    def __init__(self, live: Live, make_renderable: Callable[[str], RenderableType],
+                 fps: float = DEFAULT_FPS, on_cancel: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            live: 갱신할 Live (auto_refresh=False 권장, 프레임마다 직접 refresh)
+            make_renderable: 누적 텍스트 → 화면에 그릴 renderable
+            fps: 초당 최대 프레임 수
+            on_cancel: 수신 중 Ctrl+C를 누르면 호출 (스트림 연결을 끊는 함수)
+        """
+        self.live = live
+        self.make_renderable = make_renderable
+        self.frame_interval = 1 / fps
+        self.on_cancel = on_cancel
+        self.cancelled = False
+
+        self._parts: List[str] = []     # 수신한 토큰 (수신 스레드가 추가)
+        self._rendered = 0              # 화면에 반영한 토큰 수
+        self._lock = threading.Lock()
+        self._arrived = threading.Event()
+        self._finished = threading.Event()
+        self._error: Optional[BaseException] = None
+
+        self.tokens = 0
+        self.frames = 0
+        self.render_time = 0.0          # 화면 갱신에 쓴 시간 합계
+        self.max_frame_time = 0.0
+        self.max_batch = 0              # 한 프레임에 합쳐서 그린 최대 토큰 수
+        self.network_time = 0.0         # 요청 시작부터 스트림 종료까지
+        self.first_token_time: Optional[float] = None
+
+    def _read(self, tokens: Iterable[str], start: float):
+        try:
+            for token in tokens:
+                with self._lock:
+                    self._parts.append(token)
+                if self.first_token_time is None:
+                    self.first_token_time = time.perf_counter() - start
+                self._arrived.set()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self.network_time = time.perf_counter() - start
+            self._finished.set()
+            self._arrived.set()
+
+    def _render_frame(self, text: str, batch: int):
+        frame_start = time.perf_counter()
+        self.live.update(self.make_renderable(text), refresh=True)
+        frame_time = time.perf_counter() - frame_start
+
+        self.frames += 1
+        self.render_time += frame_time
+        self.max_frame_time = max(self.max_frame_time, frame_time)
+        self.max_batch = max(self.max_batch, batch)
+
+    def run(self, tokens: Iterable[str]) -> str:
+        """
+        토큰을 수신 스레드에서 읽으면서 프레임 단위로 화면 갱신
+
+        on_cancel이 있으면 Ctrl+C는 세션을 끝내지 않고 이번 응답만 중단한다 (self.cancelled).
+
+        Returns:
+            전체 텍스트, 취소했으면 받은 부분까지 (수신 중 예외가 있었으면 다시 발생)
+        """
+        start = time.perf_counter()
+        reader = threading.Thread(target=self._read, args=(tokens, start), daemon=True)
+        reader.start()
+
+        text = ""
+        try:
+            while True:
+                self._arrived.wait()
+                frame_start = time.perf_counter()
+                finished = self._finished.is_set()
+                text = self._flush(text)
+                if finished:
+                    break
+
+                # 다음 프레임까지 대기 (그동안 도착하는 토큰은 버퍼에 쌓임)
+                self._finished.wait(max(0.0, frame_start + self.frame_interval - time.perf_counter()))
+        except KeyboardInterrupt:
+            if self.on_cancel is None:
+                raise
+            self.cancelled = True
+            self.on_cancel()
+            # 연결을 끊었으므로 수신 스레드는 곧 끝난다. 응답 헤더를 기다리는 중(로딩/프리필)이면
+            # 기다리지 않고 돌아가고, 수신 스레드는 헤더를 받는 즉시 연결을 끊고 혼자 종료한다.
+            reader.join(CANCEL_GRACE)
+            # 프레임을 그리는 도중에 Ctrl+C가 들어왔으면 버퍼에서 꺼낸 토큰이 text에 아직 없으므로
+            # 받은 토큰 전체에서 다시 만든다
+            with self._lock:
+                text = "".join(self._parts)
+                batch = len(self._parts) - self._rendered
+                self._rendered = self.tokens = len(self._parts)
+            self._render_frame(text, batch)
+            return text
+
+        reader.join()
+        if self._error is not None:
+            raise self._error
+        return text
+
+    def _flush(self, text: str) -> str:
+        """버퍼에 쌓인 토큰을 합쳐서 한 프레임으로 그림"""
+        with self._lock:
+            self._arrived.clear()
+            pending = self._parts[self._rendered:]
+            self._rendered = len(self._parts)
+
+        if pending:
+            # 프레임 사이에 도착한 토큰을 한 번에 합쳐서 그린다
+            text += "".join(pending)
+            self.tokens += len(pending)
+            self._render_frame(text, len(pending))
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        """렌더 시간 vs 네트워크 시간"""
+        return {
+            "tokens": self.tokens,
+            "frames": self.frames,
+            "render_time": self.render_time,
+            "max_frame_time": self.max_frame_time,
+            "max_batch": self.max_batch,
+            "network_time": self.network_time,
+            "first_token_time": self.first_token_time,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+백엔드 풀 제외/복귀 테스트 (Mock 서버)
+
+요청이 실패해 제외된 서버가 제외 시간이 끝나기 전이라도 상태 확인이 성공하면 바로 다시 라우팅되는지,
+상태 확인이 실패하는 서버는 계속 제외되는지 확인합니다.
+실제 Ollama 없이 src/mock_ollama.py로 실행합니다.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.backend_pool import BackendPool
+from src.mock_ollama import MockConfig, MockOllamaServer
+
+DEAD_URL = "http://127.0.0.1:9"  # 아무것도 듣지 않는 포트
+
+
+def test_health_check_readmits_ejected_backend():
+    """제외된 서버는 제외 시간이 남아 있어도 상태 확인이 성공하면 바로 복귀"""
+    with MockOllamaServer(MockConfig(load_delay=0)) as server:
+        pool = BackendPool([server.url, DEAD_URL], eject_time=60)
+        backend = pool.backends[0]
+        pool.mark_failure(backend, "connection refused", eject=True)
+        assert backend.ejected
+        assert backend not in pool.healthy()
+
+        assert pool.check(backend)
+        assert not backend.ejected, backend.ejected_until
+        assert backend in pool.healthy()
+        assert pool.acquire() is backend
+        pool.stop()
+
+
+def test_failed_health_check_keeps_backend_ejected():
+    """상태 확인이 실패하는 서버는 제외된 채로 남고 정상 서버로만 라우팅"""
+    with MockOllamaServer(MockConfig(load_delay=0)) as server:
+        pool = BackendPool([server.url, DEAD_URL], eject_time=60)
+        assert pool.check_all() == 1
+        dead = pool.backends[1]
+        assert dead.ejected
+        assert all(pool.acquire() is pool.backends[0] for _ in range(4))
+        pool.stop()
+
+
+if __name__ == "__main__":
+    failed = 0
+    for test in (test_health_check_readmits_ejected_backend, test_failed_health_check_keeps_backend_ejected):
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__doc__}: {e}")
+    sys.exit(1 if failed else 0)
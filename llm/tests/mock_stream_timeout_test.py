@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+스트리밍 타임아웃 분류 테스트 (Mock 서버)
+
+토큰 간격이 클라이언트 읽기 타임아웃보다 긴 스트림이 오류가 아니라 타임아웃으로 집계되는지
+(부하 생성기의 timeout_rate, ollama_errors_total의 kind 라벨) 확인합니다.
+실제 Ollama 없이 src/mock_ollama.py로 실행합니다.
+"""
+
+import sys
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.load_generator import LoadGenerator, LoadResult
+from src.metrics import get_ollama_metrics
+from src.mock_ollama import MockConfig, MockOllamaServer
+from src.ollama_client import OllamaClient
+
+# 첫 토큰 전에 1.5초 멈추는 서버 + 0.8초 읽기 타임아웃
+STALLED = MockConfig(load_delay=0, prefill_rate=0, token_latency=1.5, jitter=0, response_tokens=3)
+READ_TIMEOUT = 0.8
+
+
+def _errors_by_kind() -> dict:
+    counts: dict = {}
+    for entry in get_ollama_metrics().errors.to_dict():
+        kind = entry["labels"]["kind"]
+        counts[kind] = counts.get(kind, 0) + entry["value"]
+    return counts
+
+
+def test_stalled_stream_raises_read_timeout():
+    """스트림을 읽다가 멈추면 requests.ReadTimeout 발생"""
+    with MockOllamaServer(STALLED) as server:
+        client = OllamaClient(base_url=server.url, timeout=READ_TIMEOUT)
+        try:
+            for _ in client.generate("안녕하세요", stream=True):
+                pass
+        except requests.ReadTimeout:
+            return
+        raise AssertionError("ReadTimeout이 발생하지 않았습니다")
+
+
+def test_stalled_stream_counts_as_timeout():
+    """부하 생성기에서 멈춘 스트림이 오류가 아니라 타임아웃으로 집계"""
+    with MockOllamaServer(STALLED) as server:
+        client = OllamaClient(base_url=server.url, timeout=READ_TIMEOUT)
+        result = LoadResult(1)
+        LoadGenerator(client, ["안녕하세요"], {}, think_time=0)._send(result)
+    summary = result.summary()
+    assert summary["timeout_rate"] == 1.0, summary
+    assert summary["error_rate"] == 0.0, summary
+
+
+def test_timeout_metric_label_matches_non_stream():
+    """스트리밍/일반 요청의 타임아웃이 모두 ollama_errors_total{kind="timeout"}으로 기록"""
+    before = _errors_by_kind()
+    with MockOllamaServer(STALLED) as server:
+        client = OllamaClient(base_url=server.url, timeout=READ_TIMEOUT)
+        for stream in (False, True):
+            try:
+                response = client.generate("안녕하세요", stream=stream)
+                if stream:
+                    for _ in response:
+                        pass
+            except requests.Timeout:
+                pass
+    after = _errors_by_kind()
+    assert after.get("timeout", 0) - before.get("timeout", 0) == 2, after
+    assert after.get("connection", 0) == before.get("connection", 0), after
+
+
+if __name__ == "__main__":
+    failed = 0
+    for test in (test_stalled_stream_raises_read_timeout, test_stalled_stream_counts_as_timeout,
+                 test_timeout_metric_label_matches_non_stream):
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__doc__}: {e}")
+    sys.exit(1 if failed else 0)
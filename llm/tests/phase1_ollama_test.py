@@ -4,33 +4,34 @@ Ollama API 테스트 스크립트
 Ollama API를 통해 LLM과 질의/응답을 테스트합니다.
 """
 
-import requests
-import json
+import sys
 import time
+from pathlib import Path
+
+import requests
 
-# Ollama API 엔드포인트
-OLLAMA_URL = "http://localhost:11434"
-MODEL_NAME = "llama2:7b-chat-q4_0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.ollama_client import OllamaError, get_client
 
 
 def check_ollama_status():
     """Ollama 서버 상태 확인"""
     try:
-        response = requests.get(f"{OLLAMA_URL}/api/tags")
-        if response.status_code == 200:
-            print("✓ Ollama 서버 실행 중")
-            models = response.json().get("models", [])
-            if models:
-                print(f"✓ 사용 가능한 모델: {len(models)}개")
-                for model in models:
-                    print(f"  - {model['name']} (크기: {model['size'] / (1024**3):.2f} GB)")
-                return True
-            else:
-                print("✗ 다운로드된 모델 없음")
-                return False
+        tags = get_client().get_tags()
+        print("✓ Ollama 서버 실행 중")
+        models = tags.get("models", [])
+        if models:
+            print(f"✓ 사용 가능한 모델: {len(models)}개")
+            for model in models:
+                print(f"  - {model['name']} (크기: {model['size'] / (1024**3):.2f} GB)")
+            return True
         else:
-            print(f"✗ Ollama 서버 응답 오류: {response.status_code}")
+            print("✗ 다운로드된 모델 없음")
             return False
+    except OllamaError as e:
+        print(f"✗ Ollama 서버 응답 오류: {e.status_code}")
+        return False
     except requests.exceptions.ConnectionError:
         print("✗ Ollama 서버에 연결할 수 없습니다")
         return False
@@ -44,14 +45,6 @@ def generate_response(prompt, show_metrics=True):
         prompt: 질의 내용
         show_metrics: 성능 메트릭 표시 여부
     """
-    url = f"{OLLAMA_URL}/api/generate"
-
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False  # 스트리밍 비활성화
-    }
-
     print(f"\n{'='*60}")
     print(f"질문: {prompt}")
     print(f"{'='*60}")
@@ -59,36 +52,33 @@ def generate_response(prompt, show_metrics=True):
     start_time = time.time()
 
     try:
-        response = requests.post(url, json=payload)
+        result = get_client().generate(prompt, stream=False)  # 스트리밍 비활성화
+        elapsed_time = time.time() - start_time
 
-        if response.status_code == 200:
-            result = response.json()
-            elapsed_time = time.time() - start_time
+        # 응답 출력
+        print(f"\n답변:\n{result['response']}")
 
-            # 응답 출력
-            print(f"\n답변:\n{result['response']}")
+        # 메트릭 출력
+        if show_metrics:
+            print(f"\n{'─'*60}")
+            print("📊 성능 메트릭:")
+            print(f"  - 총 소요 시간: {elapsed_time:.2f}초")
+            print(f"  - 생성된 토큰 수: {result.get('eval_count', 'N/A')}")
+            print(f"  - 프롬프트 토큰 수: {result.get('prompt_eval_count', 'N/A')}")
 
-            # 메트릭 출력
-            if show_metrics:
-                print(f"\n{'─'*60}")
-                print("📊 성능 메트릭:")
-                print(f"  - 총 소요 시간: {elapsed_time:.2f}초")
-                print(f"  - 생성된 토큰 수: {result.get('eval_count', 'N/A')}")
-                print(f"  - 프롬프트 토큰 수: {result.get('prompt_eval_count', 'N/A')}")
+            if result.get('eval_count') and result.get('total_duration'):
+                tokens_per_sec = result['eval_count'] / (result['total_duration'] / 1e9)
+                print(f"  - 토큰 생성 속도: {tokens_per_sec:.2f} tokens/sec")
 
-                if result.get('eval_count') and result.get('total_duration'):
-                    tokens_per_sec = result['eval_count'] / (result['total_duration'] / 1e9)
-                    print(f"  - 토큰 생성 속도: {tokens_per_sec:.2f} tokens/sec")
-
-                print(f"  - 모델 로딩 시간: {result.get('load_duration', 0) / 1e9:.2f}초")
-                print(f"{'─'*60}")
+            print(f"  - 모델 로딩 시간: {result.get('load_duration', 0) / 1e9:.2f}초")
+            print(f"{'─'*60}")
 
-            return result
-        else:
-            print(f"\n✗ API 오류: {response.status_code}")
-            print(f"내용: {response.text}")
-            return None
+        return result
 
+    except OllamaError as e:
+        print(f"\n✗ API 오류: {e.status_code}")
+        print(f"내용: {e.body}")
+        return None
     except Exception as e:
         print(f"\n✗ 예외 발생: {str(e)}")
         return None
@@ -101,14 +91,6 @@ def chat_streaming(prompt):
     Args:
         prompt: 질의 내용
     """
-    url = f"{OLLAMA_URL}/api/generate"
-
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": True  # 스트리밍 활성화
-    }
-
     print(f"\n{'='*60}")
     print(f"질문: {prompt}")
     print(f"{'='*60}\n")
@@ -117,30 +99,26 @@ def chat_streaming(prompt):
     start_time = time.time()
 
     try:
-        response = requests.post(url, json=payload, stream=True)
-
-        if response.status_code == 200:
-            full_response = ""
-
-            for line in response.iter_lines():
-                if line:
-                    chunk = json.loads(line)
-                    if 'response' in chunk:
-                        text = chunk['response']
-                        print(text, end="", flush=True)
-                        full_response += text
-
-                    if chunk.get('done', False):
-                        elapsed_time = time.time() - start_time
-                        print(f"\n\n{'─'*60}")
-                        print(f"📊 총 소요 시간: {elapsed_time:.2f}초")
-                        print(f"{'─'*60}")
-                        break
-
-            return full_response
-        else:
-            print(f"\n✗ API 오류: {response.status_code}")
-            return None
+        full_response = ""
+
+        # 스트리밍 활성화
+        for chunk in get_client().generate(prompt, stream=True):
+            if 'response' in chunk:
+                text = chunk['response']
+                print(text, end="", flush=True)
+                full_response += text
+
+            if chunk.get('done', False):
+                elapsed_time = time.time() - start_time
+                print(f"\n\n{'─'*60}")
+                print(f"📊 총 소요 시간: {elapsed_time:.2f}초")
+                print(f"{'─'*60}")
+
+        return full_response
+
+    except OllamaError as e:
+        print(f"\n✗ API 오류: {e.status_code}")
+        return None
 
     except Exception as e:
         print(f"\n✗ 예외 발생: {str(e)}")
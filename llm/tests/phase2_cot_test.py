@@ -4,49 +4,62 @@ Phase 2: Chain of Thought 테스트 스크립트
 프롬프트 품질과 한계를 테스트합니다.
 """
 
-import requests
+import argparse
 import json
+import math
+import sys
 import time
 from datetime import datetime
+from pathlib import Path
 
-OLLAMA_URL = "http://localhost:11434"
-MODEL_NAME = "llama2:7b-chat-q4_0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from src.consistency import DEFAULT_SAMPLES, add_consistency_arguments, sample_options, score_consistency
+from src.eval_runner import EvalRunner, add_runner_arguments
+from src.metrics import add_metrics_arguments, configure_metrics
+from src.ollama_client import OllamaError, get_client
+from src.response_cache import add_cache_arguments, configure_cache, get_cache
+from src.scheduler import BATCH, add_scheduler_arguments, configure_scheduler
 
-def call_llm(prompt, show_response=True):
-    """LLM API 호출"""
-    url = f"{OLLAMA_URL}/api/generate"
 
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False
-    }
+def print_llm_result(prompt, result, elapsed_time):
+    """LLM 응답 출력"""
+    if result is None:
+        return
+
+    print(f"\n{'='*60}")
+    print(f"프롬프트:\n{prompt}")
+    print(f"\n{'─'*60}")
+    print(f"응답:\n{result['response']}")
+    print(f"\n{'─'*60}")
+    print(f"⏱️  소요 시간: {elapsed_time:.2f}초")
+    print(f"📊 토큰: {result.get('eval_count', 'N/A')} tokens")
+    print(f"{'='*60}\n")
+
+
+def call_llm(prompt, show_response=True, client=None, sample=0, options=None):
+    """LLM API 호출 (같은 프롬프트/옵션/샘플 번호면 캐시된 응답 사용)"""
+    client = client or get_client()
+    cache = get_cache()
+    cache_key = cache.make_key(client.model, prompt, options, sample=sample)
 
     start_time = time.time()
 
     try:
-        response = requests.post(url, json=payload)
+        result = cache.get(cache_key)
+        if result is None:
+            result = client.generate(prompt, stream=False, options=options)
+            cache.put(cache_key, result)
         elapsed_time = time.time() - start_time
 
-        if response.status_code == 200:
-            result = response.json()
+        if show_response:
+            print_llm_result(prompt, result, elapsed_time)
 
-            if show_response:
-                print(f"\n{'='*60}")
-                print(f"프롬프트:\n{prompt}")
-                print(f"\n{'─'*60}")
-                print(f"응답:\n{result['response']}")
-                print(f"\n{'─'*60}")
-                print(f"⏱️  소요 시간: {elapsed_time:.2f}초")
-                print(f"📊 토큰: {result.get('eval_count', 'N/A')} tokens")
-                print(f"{'='*60}\n")
-
-            return result, elapsed_time
-        else:
-            print(f"❌ API 오류: {response.status_code}")
-            return None, elapsed_time
+        return result, elapsed_time
 
+    except OllamaError as e:
+        print(f"❌ API 오류: {e.status_code}")
+        return None, time.time() - start_time
     except Exception as e:
         print(f"❌ 예외 발생: {str(e)}")
         return None, time.time() - start_time
@@ -125,8 +138,17 @@ TEST5_CONSISTENCY = """
 """
 
 
-def run_test_suite():
-    """전체 테스트 실행"""
+def run_test_suite(runner, samples=DEFAULT_SAMPLES, seed=None, temperatures=None, vectors="ngram"):
+    """
+    전체 테스트 실행
+
+    Args:
+        runner: 동시 실행 러너
+        samples: Test 5 (일관성) 샘플 수
+        seed: Test 5 기준 시드 (샘플 i는 seed + i)
+        temperatures: Test 5 샘플별 온도 (None이면 서버 기본값)
+        vectors: Test 5 응답 유사도에 쓸 벡터 ("ngram" 또는 "embed")
+    """
 
     print("\n" + "="*60)
     print("Phase 2: 프롬프트 품질 테스트")
@@ -134,15 +156,33 @@ def run_test_suite():
 
     results = {}
 
+    # 모든 프롬프트를 먼저 동시에 실행하고, 출력은 테스트 순서대로 한다
+    prompts = [(TEST1_DIRECT, 0, None), (TEST1_COT, 0, None), (TEST2_KOREAN, 0, None),
+               (TEST3_FACTUAL, 0, None), (TEST4_CONTEXT, 0, None)]
+    # Test 5 샘플은 시드/온도를 샘플마다 정해 동시에 생성 (옵션이 없으면 이전과 같은 캐시 키)
+    prompts += [(TEST5_CONSISTENCY, i, sample_options(i, temperatures, seed) or None) for i in range(samples)]
+    responses = runner.map(
+        lambda item, client: call_llm(item[0], show_response=False, client=client, sample=item[1],
+                                      options=item[2]),
+        prompts
+    )
+    (
+        (result_direct, time_direct),
+        (result_cot, time_cot),
+        (result_korean, time_korean),
+        (result_factual, time_factual),
+        (result_context, time_context),
+    ) = responses[:5]
+
     # Test 1: Direct vs CoT
     print("\n\n📝 Test 1: 직접 질문 vs Chain of Thought")
     print("─"*60)
 
     print("\n[1-A] 직접 질문:")
-    result_direct, time_direct = call_llm(TEST1_DIRECT)
+    print_llm_result(TEST1_DIRECT, result_direct, time_direct)
 
     print("\n[1-B] Chain of Thought:")
-    result_cot, time_cot = call_llm(TEST1_COT)
+    print_llm_result(TEST1_COT, result_cot, time_cot)
 
     results['test1'] = {
         'direct': result_direct,
@@ -154,33 +194,32 @@ def run_test_suite():
     # Test 2: 한국어 처리
     print("\n\n📝 Test 2: 한국어 처리 능력")
     print("─"*60)
-    result_korean, time_korean = call_llm(TEST2_KOREAN)
+    print_llm_result(TEST2_KOREAN, result_korean, time_korean)
     results['test2'] = {'result': result_korean, 'time': time_korean}
 
     # Test 3: Hallucination
     print("\n\n📝 Test 3: Hallucination 테스트")
     print("─"*60)
-    result_factual, time_factual = call_llm(TEST3_FACTUAL)
+    print_llm_result(TEST3_FACTUAL, result_factual, time_factual)
     results['test3'] = {'result': result_factual, 'time': time_factual}
 
     # Test 4: 맥락 이해
     print("\n\n📝 Test 4: 맥락 이해")
     print("─"*60)
-    result_context, time_context = call_llm(TEST4_CONTEXT)
+    print_llm_result(TEST4_CONTEXT, result_context, time_context)
     results['test4'] = {'result': result_context, 'time': time_context}
 
-    # Test 5: 일관성 (3번 반복)
-    print("\n\n📝 Test 5: 일관성 테스트 (3회 반복)")
+    # Test 5: 일관성 (samples번 반복)
+    print(f"\n\n📝 Test 5: 일관성 테스트 ({samples}회 반복)")
     print("─"*60)
     consistency_results = []
-    for i in range(3):
-        print(f"\n[시도 {i+1}/3]")
-        result, exec_time = call_llm(TEST5_CONSISTENCY)
+    for i, (result, exec_time) in enumerate(responses[5:]):
+        print(f"\n[시도 {i+1}/{samples}]")
+        print_llm_result(TEST5_CONSISTENCY, result, exec_time)
         consistency_results.append({
             'result': result,
             'time': exec_time
         })
-        time.sleep(1)  # API 부하 방지
 
     results['test5'] = consistency_results
 
@@ -195,13 +234,26 @@ def run_test_suite():
     print(f"  차이: {abs(time_cot - time_direct):.2f}초")
 
     print(f"\nTest 5 - 일관성:")
-    responses = [r['result']['response'].strip() if r['result'] else 'N/A'
-                 for r in consistency_results]
-    print(f"  응답 1: {responses[0][:50]}...")
-    print(f"  응답 2: {responses[1][:50]}...")
-    print(f"  응답 3: {responses[2][:50]}...")
-    all_same = len(set(responses)) == 1
+    responses = [r['result']['response'].strip() for r in consistency_results if r['result']]
+    for i, response in enumerate(responses[:5], 1):
+        print(f"  응답 {i}: {response[:50]}...")
+    if len(responses) > 5:
+        print(f"  ... 외 {len(responses) - 5}개")
+    scores = score_consistency([responses], vectors=vectors)
+    similarity = scores['similarity'][0]
+    print(f"  샘플: {len(responses)}/{samples}개 성공")
+    print(f"  응답 유사도 ({scores['vectors']}): {'-' if math.isnan(similarity) else f'{similarity:.3f}'}")
+    print(f"  답 일치율: {scores['agreement'][0]:.2f} (최다 답: '{scores['majority'][0]}')")
+    print(f"  답 엔트로피: {scores['entropy'][0]:.2f}비트")
+    all_same = len(set(responses)) == 1 and len(responses) == samples
     print(f"  모두 동일: {'✅' if all_same else '❌'}")
+    results['test5_scores'] = {
+        'samples': len(responses),
+        'similarity': None if math.isnan(similarity) else float(similarity),
+        'agreement': float(scores['agreement'][0]),
+        'entropy': float(scores['entropy'][0]),
+        'answer': scores['majority'][0],
+    }
 
     # 결과 저장
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -226,27 +278,49 @@ def run_test_suite():
 
     print(f"\n💾 결과 저장: {filename}")
 
+    runner.print_summary()
+    get_cache().print_summary()
+
     return results
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Phase 2: Chain of Thought 테스트")
+    add_runner_arguments(parser)
+    add_consistency_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_scheduler_arguments(parser)
+    args = parser.parse_args()
+    configure_cache(args)
+    configure_metrics(args, call_site="phase2_cot")
+    configure_scheduler(args, priority=BATCH)
+
     print("\n🤖 LLM 프롬프트 테스트 스크립트")
     print("="*60)
 
     # Ollama 연결 확인
     try:
-        response = requests.get(f"{OLLAMA_URL}/api/tags")
-        if response.status_code == 200:
-            print("✅ Ollama 서버 연결 성공")
-        else:
-            print("❌ Ollama 서버 응답 오류")
-            exit(1)
-    except:
+        get_client().get_tags()
+        print("✅ Ollama 서버 연결 성공")
+    except OllamaError:
+        print("❌ Ollama 서버 응답 오류")
+        exit(1)
+    except Exception:
         print("❌ Ollama 서버에 연결할 수 없습니다")
         print("   docker-compose up -d 를 실행했는지 확인하세요")
         exit(1)
 
     # 테스트 실행
-    results = run_test_suite()
+    runner = EvalRunner.from_args(args)
+    interrupted = False
+    try:
+        results = run_test_suite(runner, samples=args.samples or DEFAULT_SAMPLES, seed=args.seed,
+                                 temperatures=args.temperatures, vectors=args.consistency_vectors)
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        runner.close(cancel=interrupted)
 
     print("\n✅ 모든 테스트 완료!")
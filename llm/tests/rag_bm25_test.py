@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+BM25 역색인 테스트
+
+흔한 검색어를 후보 청크에서만 찾는 기본 검색이 작은 코퍼스에서 결과 수를 잃지 않고
+정확한 검색(exact=True)과 같은 결과를 내는지, 세그먼트로 저장했다 다시 열어도 같은지 확인합니다.
+Ollama 없이 실행합니다.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.rag.bm25 import BM25Index
+from src.rag.text import term_counts, tokenize
+
+QUERY = "zeta 환각 현상 언어 모델"
+COMMON = ["환각 현상은 언어 모델이 사실이 아닌 내용을 만들어 내는 것입니다.",
+          "언어 모델의 추론 속도는 메모리 대역폭에 좌우됩니다.",
+          "검색 증강 생성은 관련 문서를 찾아 프롬프트에 붙입니다."]
+
+
+def _build(n_docs: int = 2000) -> BM25Index:
+    """"zeta"는 청크 하나에만, 나머지 검색어는 대부분의 청크에 나오는 코퍼스"""
+    bm25 = BM25Index()
+    for doc_id in range(n_docs):
+        text = COMMON[doc_id % len(COMMON)] + f" 문서 번호 {doc_id}"
+        if doc_id == 7:
+            text += " zeta"
+        bm25.add(doc_id, term_counts(text))
+    return bm25
+
+
+def _assert_same(bm25: BM25Index, k: int):
+    ids, scores = bm25.search(tokenize(QUERY), k)
+    exact_ids, exact_scores = bm25.search(tokenize(QUERY), k, exact=True)
+    assert len(ids) == k, f"결과 {len(ids)}개 (기대: {k}개)"
+    assert ids[0] == exact_ids[0] == 7, (ids.tolist(), exact_ids.tolist())
+    # 같은 문장을 쓰는 청크는 점수가 같아 동점끼리 순서가 다를 수 있으므로 점수로 비교
+    assert np.allclose(scores, exact_scores), (scores, exact_scores)
+
+
+def test_bounded_search_matches_exact():
+    """드문 검색어 + 흔한 검색어 질문에서 기본 검색이 exact=True와 같은 k개 반환"""
+    bm25 = _build()
+    for k in (1, 10, 50):
+        _assert_same(bm25, k)
+
+
+def test_bounded_search_matches_exact_after_reopen():
+    """세그먼트로 저장하고 다시 연 뒤에도 (삭제 포함) 기본 검색과 exact=True 결과가 같음"""
+    bm25 = _build()
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = bm25.save(Path(directory), bm25.size)
+        reopened = BM25Index()
+        reopened.load(Path(directory), manifest, bm25.alive[:bm25.size])
+        for doc_id in range(0, 2000, 3):
+            reopened.remove(doc_id)
+        _assert_same(reopened, 10)
+
+
+if __name__ == "__main__":
+    failed = 0
+    for test in (test_bounded_search_matches_exact, test_bounded_search_matches_exact_after_reopen):
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__doc__}: {e}")
+    sys.exit(1 if failed else 0)